@@ -0,0 +1,164 @@
+"""
+Fast Activity Deserialization.
+
+`Activity().deserialize(body)` walks the msrest models by reflection for
+every request. Here the attribute maps of Activity and its members are
+compiled once into readers that build the models directly from the
+decoded JSON (orjson when installed), with the same result: known keys as
+attributes, unknown keys in `additional_properties`.
+
+Entities (mentions, client info...) are only deserialized when a handler
+reads them. `channel_data` and `value` are plain objects in the schema:
+they are kept as decoded, as msrest does.
+"""
+import json
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any, Optional, Union
+from botbuilder.schema import Activity
+from msrest.serialization import Deserializer, Model
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Decodes a JSON document (orjson if available)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _datetime(value: Any) -> Optional[datetime]:
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        # 'Z' suffix or 7 fractional digits (before Python 3.11).
+        return Deserializer.deserialize_iso(value)
+
+
+class _Pending:
+    """Raw JSON of a member not deserialized yet."""
+    __slots__ = ('data', 'converter')
+
+    def __init__(self, data: Any, converter: Optional[Callable]):
+        self.data = data
+        self.converter = converter
+
+    def load(self) -> Any:
+        return self.data if self.converter is None else self.converter(self.data)
+
+
+class ModelReader:
+    """Builds a msrest model from its JSON, compiled from the attribute map.
+
+    Args:
+        cls: model class.
+        models: model classes by name (for the nested members).
+        lazy: attributes stored raw, deserialized on first access (the
+          class must define them with `lazy_member`).
+    """
+    _readers: dict[type, 'ModelReader'] = {}
+
+    def __init__(self, cls: type, models: dict[str, type], lazy: tuple[str, ...] = ()):
+        self.cls = cls
+        self._readers[cls] = self
+        # (json key, attribute, converter)
+        self.fields: list[tuple[str, str, Optional[Callable]]] = []
+        self.lazy = lazy
+        for attr, desc in cls._attribute_map.items():
+            converter = self._converter(desc['type'], models)
+            self.fields.append((desc['key'], attr, converter))
+        self.keys = frozenset(key for key, _, _ in self.fields)
+        # instance attributes of a model built without arguments.
+        self.defaults: dict[str, Any] = dict(vars(cls()))
+
+    def _converter(self, kind: str, models: dict[str, type]) -> Optional[Callable]:
+        if kind.startswith('[') and kind.endswith(']'):
+            item = self._converter(kind[1:-1], models)
+            if item is None:
+                return None
+            return lambda value: None if value is None else [item(v) for v in value]
+        if kind.startswith('{') and kind.endswith('}'):
+            item = self._converter(kind[1:-1], models)
+            if item is None:
+                return None
+            return lambda value: None if value is None else {
+                k: item(v) for k, v in value.items()
+            }
+        if kind == 'iso-8601':
+            return _datetime
+        model = models.get(kind)
+        if model is None:
+            # str, bool, int, float, object: as decoded.
+            return None
+        if not (isinstance(model, type) and issubclass(model, Model)):
+            # enumerations and other types: as msrest does.
+            deserializer = Deserializer(models)
+            return lambda value: deserializer.deserialize_data(value, kind)
+        return lambda value: None if value is None else self._reader(model, models)(value)
+
+    def _reader(self, model: type, models: dict[str, type]) -> 'ModelReader':
+        reader = self._readers.get(model)
+        if reader is None:
+            reader = ModelReader(model, models)
+        return reader
+
+    def __call__(self, data: dict) -> Model:
+        if not isinstance(data, dict):
+            # same errors as msrest.
+            return self.cls().deserialize(data)
+        obj = self.cls.__new__(self.cls)
+        values = obj.__dict__
+        values.update(self.defaults)
+        values['additional_properties'] = {
+            key: value for key, value in data.items() if key not in self.keys
+        }
+        for key, attr, converter in self.fields:
+            if key not in data:
+                continue
+            value = data[key]
+            if attr in self.lazy:
+                values[f"_{attr}"] = _Pending(value, converter)
+            elif converter is None:
+                values[attr] = value
+            else:
+                values[attr] = converter(value)
+        return obj
+
+
+def lazy_member(name: str) -> property:
+    """Model attribute deserialized on first access."""
+    slot = f"_{name}"
+
+    def getter(self):
+        value = self.__dict__.get(slot)
+        if isinstance(value, _Pending):
+            value = self.__dict__[slot] = value.load()
+        return value
+
+    def setter(self, value):
+        self.__dict__[slot] = value
+
+    return property(getter, setter)
+
+
+class IngestedActivity(Activity):
+    """Activity read by `read_activity` (entities are deserialized lazily)."""
+    entities = lazy_member('entities')
+
+
+_activity_reader = ModelReader(
+    IngestedActivity,
+    Activity._infer_class_models(),  # pylint: disable=W0212
+    lazy=('entities',)
+)
+
+
+def read_activity(data: dict) -> Activity:
+    """Activity of a decoded request body."""
+    return _activity_reader(data)
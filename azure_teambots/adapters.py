@@ -1,6 +1,9 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License.
+import asyncio
+import hashlib
 from datetime import datetime
+from functools import partial
 from botbuilder.core import (
     ConversationState,
     TurnContext,
@@ -8,11 +11,17 @@ from botbuilder.core import (
 )
 from botbuilder.integration.aiohttp import (
     CloudAdapter,
-    ConfigurationBotFrameworkAuthentication
+    ConfigurationBotFrameworkAuthentication,
+    ConfigurationServiceClientCredentialFactory
 )
-from botbuilder.schema import ActivityTypes, Activity
+from botbuilder.schema import ActivityTypes, Activity, ResourceResponse
+from botframework.connector import Channels
 from navconfig.logging import logging
 from .config import BotConfig
+from .auth import CachedAuthentication
+from .connectors import connector_pool
+from .exceptions import OutboundQueueFull
+from .outbound import RETRY_STATUS, error_status, get_outbound
 
 
 class AdapterHandler(CloudAdapter):
@@ -26,9 +35,23 @@ class AdapterHandler(CloudAdapter):
     ):
         self.config: BotConfig = config
         self.logger: logging.Logger = logger
-        settings = ConfigurationBotFrameworkAuthentication(
-            self.config,
-            logger=self.logger
+        # credentials and connector clients are shared by the bots
+        # with the same app id (and password).
+        credentials = connector_pool.credentials_factory(
+            ConfigurationServiceClientCredentialFactory(self.config),
+            identity=(
+                config.APP_ID,
+                hashlib.sha256((config.APP_PASSWORD or '').encode()).hexdigest()
+            )
+        )
+        # validated tokens are cached until they expire.
+        settings = CachedAuthentication(
+            ConfigurationBotFrameworkAuthentication(
+                self.config,
+                credentials_factory=credentials,
+                logger=self.logger
+            ),
+            connectors=connector_pool
         )
         self.settings = BotFrameworkAdapterSettings(
             config.APP_ID,
@@ -36,6 +59,40 @@ class AdapterHandler(CloudAdapter):
         )
         super().__init__(settings)
         self._conversation_state = conversation_state
+        # rate limits and throttling of the activities sent.
+        self.outbound = get_outbound(config.APP_ID)
+
+    def warm_up(self, service_urls: list[str]) -> asyncio.Task:
+        """Opens (in background) the connector clients of `service_urls`."""
+        factory = self.bot_framework_authentication.create_connector_factory(
+            self.create_claims_identity(self.config.APP_ID)
+        )
+        return connector_pool.warm_up(factory, service_urls)
+
+    def _is_sent(self, activity: Activity) -> bool:
+        """The activity is posted to the Bot Connector."""
+        if activity.type in ("delay", ActivityTypes.invoke_response):
+            return False
+        if activity.type == ActivityTypes.trace and activity.channel_id != Channels.emulator:
+            return False
+        return activity.conversation is not None
+
+    async def send_activities(
+        self, context: TurnContext, activities: list[Activity]
+    ) -> list[ResourceResponse]:
+        """Sends the activities through the conversation queue."""
+        if not activities:
+            return await super().send_activities(context, activities)
+        responses = []
+        for activity in activities:
+            send = partial(super().send_activities, context, [activity])
+            if self._is_sent(activity):
+                responses.extend(
+                    await self.outbound.send(activity.conversation.id, send)
+                )
+            else:
+                responses.extend(await send())
+        return responses
 
     # Catch-all for errors.
     async def on_error(self, context: TurnContext, error: Exception):
@@ -48,11 +105,14 @@ class AdapterHandler(CloudAdapter):
             exc_info=True
         )
 
+        if isinstance(error, OutboundQueueFull) or error_status(error) in RETRY_STATUS:
+            # the conversation is throttled: nothing else can be sent.
+            await self._conversation_state.delete(context)
+            return
+
         # Send a message to the user
         await context.send_activity(
-            "The bot encountered an error or bug."
-        )
-        await context.send_activity(
+            "The bot encountered an error or bug.\n"
             "To continue to run this bot, please fix the bot source code."
         )
         # Send a trace activity if we're talking to the
@@ -0,0 +1,393 @@
+"""
+Inbound Request Authentication.
+
+Every activity posted by the Bot Connector carries a bearer token that
+botbuilder validates in full (issuer, signature, claims) on each request,
+fetching the OpenID metadata and signing keys (JWKS) with blocking calls
+on the request path when they are missing or a day old.
+
+SigningKeys: signing keys of an OpenID metadata document, fetched with
+  aiohttp and parsed once; installed into the botbuilder token validation.
+SigningKeyStore: refreshes the signing keys in background (started by the
+  bots on the application startup).
+CachedAuthentication: validated tokens, cached by their hash until the
+  token expires (or `ttl`); connector clients shared by a ConnectorPool.
+"""
+import asyncio
+import hashlib
+import random
+import time
+from typing import Optional
+from botbuilder.schema import Activity
+from botframework.connector.auth import (
+    AuthenticationConstants,
+    BotFrameworkAuthentication,
+    ChannelValidation,
+    ClaimsIdentity,
+    ConnectorFactory,
+    JwtTokenExtractor,
+    UserTokenClient,
+)
+from botframework.connector.auth.authenticate_request_result import (
+    AuthenticateRequestResult
+)
+from botframework.connector.skills import BotFrameworkClient
+from jwt.algorithms import RSAAlgorithm
+from navconfig.logging import logging
+from .cache import SingleFlight, TTLCache
+from .connectors import ConnectorPool
+from .exceptions import SigningKeysUnavailable
+from .sessions import get_session
+from .conf import (
+    AZUREBOT_JWT_CACHE_SIZE,
+    AZUREBOT_JWT_CACHE_TTL,
+    AZUREBOT_JWKS_REFRESH_INTERVAL,
+    AZUREBOT_JWKS_MIN_REFRESH,
+)
+
+
+class SigningKey:
+    """Public key (and channel endorsements) of a JWKS entry."""
+    __slots__ = ('public_key', 'endorsements')
+
+    def __init__(self, public_key, endorsements: list):
+        self.public_key = public_key
+        self.endorsements = endorsements
+
+
+class SigningKeys:
+    """Signing keys of an OpenID metadata document.
+
+    Same interface as the botbuilder metadata (`get(key_id)`), but keys are
+    fetched with aiohttp and parsed once per refresh. Keys older than
+    `max_age` are still used while new ones are fetched in background:
+    a request only waits for the fetch when no key was ever loaded or the
+    token is signed by an unknown key (at most once per `min_refresh`).
+
+    Args:
+        url: OpenID metadata url (its `jwks_uri` has the keys).
+        max_age: seconds before the keys are refreshed.
+        min_refresh: minimum seconds between two fetches.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        max_age: float = AZUREBOT_JWKS_REFRESH_INTERVAL,
+        min_refresh: float = AZUREBOT_JWKS_MIN_REFRESH
+    ):
+        self.url: str = url
+        self.max_age: float = max_age
+        self.min_refresh: float = min_refresh
+        self._keys: dict[str, SigningKey] = {}
+        self._updated: float = 0
+        self._attempted: float = 0
+        self._flight = SingleFlight()
+        self._background: Optional[asyncio.Task] = None
+        self._refreshes: int = 0
+        self._failures: int = 0
+        self._unknown: int = 0
+        self.logger = logging.getLogger('AzureBot.Auth')
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def loaded(self) -> bool:
+        return self._updated > 0
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self._updated if self.loaded else float('inf')
+
+    def _can_fetch(self) -> bool:
+        return time.monotonic() - self._attempted >= self.min_refresh
+
+    async def get(self, key_id: str) -> SigningKey:
+        if not self.loaded:
+            await self.refresh()
+            if not self.loaded:
+                raise SigningKeysUnavailable(
+                    f"No signing keys could be fetched from {self.url}"
+                )
+        elif self.age > self.max_age and self._can_fetch() and (
+            self._background is None or self._background.done()
+        ):
+            self._background = asyncio.create_task(self.refresh())
+        key = self._keys.get(key_id)
+        if key is None and self._can_fetch():
+            # rotated keys: fetched again (at most once per min_refresh).
+            await self.refresh()
+            key = self._keys.get(key_id)
+        if key is None:
+            self._unknown += 1
+            raise PermissionError(f"Unknown signing key: {key_id}")
+        return key
+
+    async def refresh(self) -> bool:
+        """Fetches the keys (concurrent calls share the same fetch)."""
+        return await self._flight.do('keys', self._fetch)
+
+    async def _fetch(self) -> bool:
+        self._attempted = time.monotonic()
+        try:
+            session = get_session('auth')
+            async with session.get(self.url) as response:
+                response.raise_for_status()
+                metadata = await response.json(content_type=None)
+            async with session.get(metadata['jwks_uri']) as response:
+                response.raise_for_status()
+                jwks = await response.json(content_type=None)
+        except Exception as exc:  # pylint: disable=W0718
+            self._failures += 1
+            self.logger.error(
+                f"Error fetching signing keys from {self.url}: {exc}"
+            )
+            return False
+        keys = {}
+        for jwk in jwks.get('keys', []):
+            try:
+                keys[jwk['kid']] = SigningKey(
+                    RSAAlgorithm.from_jwk(jwk),
+                    jwk.get('endorsements', [])
+                )
+            except Exception as exc:  # pylint: disable=W0718
+                self.logger.warning(
+                    f"Invalid signing key {jwk.get('kid')} in {self.url}: {exc}"
+                )
+        self._keys = keys
+        self._updated = time.monotonic()
+        self._refreshes += 1
+        return True
+
+    async def close(self) -> None:
+        if self._background is not None and not self._background.done():
+            self._background.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "keys": len(self._keys),
+            "age": int(self.age) if self.loaded else None,
+            "refreshes": self._refreshes,
+            "failures": self._failures,
+            "unknown": self._unknown,
+        }
+
+
+class SigningKeyStore:
+    """Signing keys of the OpenID metadata urls used by the bots.
+
+    The keys are installed into the botbuilder token validation (which
+    then stops fetching them itself) and refreshed in background every
+    `interval` seconds (with a 10% jitter). The store is shared by the
+    bots: every `start` is matched by a `stop`, the refresh stops with
+    the last one.
+
+    Args:
+        interval: seconds between two refreshes.
+        min_refresh: minimum seconds between two fetches of a document.
+    """
+
+    def __init__(
+        self,
+        interval: float = AZUREBOT_JWKS_REFRESH_INTERVAL,
+        min_refresh: float = AZUREBOT_JWKS_MIN_REFRESH
+    ):
+        self.interval: float = interval
+        self.min_refresh: float = min_refresh
+        self._keys: dict[str, SigningKeys] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._users: int = 0
+        self.logger = logging.getLogger('AzureBot.Auth')
+
+    @staticmethod
+    def default_urls() -> list[str]:
+        """Metadata of the Bot Connector (public cloud) and the Emulator."""
+        return [
+            ChannelValidation.open_id_metadata_endpoint
+            or AuthenticationConstants.TO_BOT_FROM_CHANNEL_OPENID_METADATA_URL,
+            AuthenticationConstants.TO_BOT_FROM_EMULATOR_OPENID_METADATA_URL,
+        ]
+
+    def add(self, url: str) -> SigningKeys:
+        """Signing keys of `url`, installed into the token validation."""
+        keys = self._keys.get(url)
+        if keys is None:
+            keys = SigningKeys(
+                url, max_age=self.interval * 2, min_refresh=self.min_refresh
+            )
+            self._keys[url] = keys
+        JwtTokenExtractor.metadataCache[url] = keys
+        return keys
+
+    def get(self, url: str) -> Optional[SigningKeys]:
+        return self._keys.get(url)
+
+    async def refresh(self) -> None:
+        await asyncio.gather(*[keys.refresh() for keys in self._keys.values()])
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as exc:  # pylint: disable=W0718
+                self.logger.error(f"Signing keys refresh error: {exc}")
+            await asyncio.sleep(self.interval * random.uniform(0.9, 1.1))
+
+    async def start(self, urls: Optional[list[str]] = None) -> None:
+        """Installs the keys of `urls` and starts the background refresh."""
+        self._users += 1
+        for url in urls or self.default_urls():
+            self.add(url)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops the background refresh when no other user is left."""
+        self._users = max(self._users - 1, 0)
+        if self._users:
+            return
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for keys in self._keys.values():
+            await keys.close()
+
+    def stats(self) -> dict:
+        return {url: keys.stats() for url, keys in self._keys.items()}
+
+
+## process-wide signing keys.
+signing_keys = SigningKeyStore()
+
+
+class CachedAuthentication(BotFrameworkAuthentication):
+    """Bot Framework authentication with a cache of validated tokens.
+
+    A token validated for a channel and service url is trusted again,
+    without verifying its signature, until it expires (minus `leeway`
+    seconds) or for `ttl` seconds at most. Only successful validations
+    are cached; concurrent requests with the same token are validated once.
+    With `connectors`, the connector factories return the clients of the pool.
+
+    Args:
+        inner: authentication doing the validation.
+        maxsize: maximum number of cached tokens.
+        ttl: maximum seconds a validated token is cached (0 disables it).
+        leeway: seconds before the token expiration the entry expires.
+        connectors: pool of connector clients.
+    """
+
+    def __init__(
+        self,
+        inner: BotFrameworkAuthentication,
+        maxsize: int = AZUREBOT_JWT_CACHE_SIZE,
+        ttl: float = AZUREBOT_JWT_CACHE_TTL,
+        leeway: float = 30,
+        connectors: Optional[ConnectorPool] = None
+    ):
+        self.inner: BotFrameworkAuthentication = inner
+        self.connectors: Optional[ConnectorPool] = connectors
+        self.ttl: float = ttl
+        self.leeway: float = leeway
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._flight = SingleFlight()
+        self._validations: int = 0
+
+    def _ttl(self, claims: dict) -> float:
+        expires = claims.get('exp') if claims else None
+        if not isinstance(expires, (int, float)):
+            # no expiration: not cached.
+            return 0
+        return min(self.ttl, expires - time.time() - self.leeway)
+
+    def _connector_factory(
+        self,
+        factory: Optional[ConnectorFactory],
+        claims_identity: Optional[ClaimsIdentity]
+    ) -> Optional[ConnectorFactory]:
+        if self.connectors is None:
+            return factory
+        return self.connectors.connector_factory(factory, claims_identity)
+
+    async def authenticate_request(
+        self, activity: Activity, auth_header: str
+    ) -> AuthenticateRequestResult:
+        if not auth_header or self.ttl <= 0:
+            result = await self.inner.authenticate_request(activity, auth_header)
+            result.connector_factory = self._connector_factory(
+                result.connector_factory, result.claims_identity
+            )
+            return result
+        key = (
+            hashlib.sha256(auth_header.encode()).digest(),
+            activity.channel_id,
+            activity.service_url
+        )
+        result = self._cache.get(key, None)
+        if result is None:
+            result = await self._flight.do(
+                key, lambda: self._validate(key, activity, auth_header)
+            )
+        # the adapter gets its own copy of the result.
+        copy = AuthenticateRequestResult()
+        copy.claims_identity = result.claims_identity
+        copy.audience = result.audience
+        copy.caller_id = result.caller_id
+        copy.connector_factory = self._connector_factory(
+            result.connector_factory, result.claims_identity
+        )
+        return copy
+
+    async def _validate(
+        self, key: tuple, activity: Activity, auth_header: str
+    ) -> AuthenticateRequestResult:
+        result = await self.inner.authenticate_request(activity, auth_header)
+        self._validations += 1
+        identity = result.claims_identity
+        ttl = self._ttl(identity.claims if identity else None)
+        if ttl > 0:
+            self._cache.set(key, result, ttl)
+        return result
+
+    async def authenticate_streaming_request(
+        self, auth_header: str, channel_id_header: str
+    ) -> AuthenticateRequestResult:
+        return await self.inner.authenticate_streaming_request(
+            auth_header, channel_id_header
+        )
+
+    def create_connector_factory(
+        self, claims_identity: ClaimsIdentity
+    ) -> ConnectorFactory:
+        return self._connector_factory(
+            self.inner.create_connector_factory(claims_identity), claims_identity
+        )
+
+    async def create_user_token_client(
+        self, claims_identity: ClaimsIdentity
+    ) -> UserTokenClient:
+        return await self.inner.create_user_token_client(claims_identity)
+
+    def create_bot_framework_client(self) -> BotFrameworkClient:
+        return self.inner.create_bot_framework_client()
+
+    def get_originating_audience(self) -> str:
+        return self.inner.get_originating_audience()
+
+    async def authenticate_channel_request(self, auth_header: str) -> ClaimsIdentity:
+        return await self.inner.authenticate_channel_request(auth_header)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {
+            **self._cache.stats(),
+            "validations": self._validations,
+            "keys": signing_keys.stats(),
+        }
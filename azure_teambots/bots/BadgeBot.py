@@ -10,6 +10,8 @@ from botbuilder.schema import (
 )
 from .abstract import AbstractBot
 from .dialogs.badge import BadgeDialog
+from ..conf import MS_TENANT_ID
+from ..graph import GraphClient, directory_index
 
 
 class BadgeBot(AbstractBot):
@@ -37,6 +39,23 @@ class BadgeBot(AbstractBot):
             submission_callback=self.process_submission
         )
         self.dialog_set.add(self.badge_dialog)
+        # Local user directory (person lookup for the badge recipient)
+        self.directory = directory_index
+
+    async def on_startup(self, app):
+        await super().on_startup(app)
+        if MS_TENANT_ID:
+            client = GraphClient(self.app_id, self.app_password, MS_TENANT_ID)
+            self.directory.start(client)
+        else:
+            self.logger.warning(
+                "BadgeBot: MS_TENANT_ID is not set, user directory is disabled."
+            )
+
+    async def on_cleanup(self, app):
+        await self.directory.stop()
+        await self.directory.save()
+        await super().on_cleanup(app)
 
     async def on_invoke_activity(self, turn_context: TurnContext):
         print('TRIGGER THIS >> ', turn_context.activity.name)
@@ -83,8 +102,7 @@ class BadgeBot(AbstractBot):
                 # Handle conversation updates or other message activities
                 pass
 
-        await self.conversation_state.save_changes(turn_context)
-        await self.user_state.save_changes(turn_context)
+        await self.save_state_changes(turn_context)
 
     async def process_submission(self, data, turn_context: TurnContext):
         print('RECEIVE DATA > ', data)
@@ -110,5 +110,4 @@ class ChatBot(AbstractBot):
             )
         except Exception as exc:
             print(exc)
-        await self._conversation_state.save_changes(turn_context)
-        await self._user_state.save_changes(turn_context)
+        await self.save_state_changes(turn_context)
@@ -6,21 +6,19 @@ from aiohttp import web
 from navconfig.logging import logging
 from navigator.applications.base import BaseApplication  # pylint: disable=E0611
 from navigator.types import WebApp   # pylint: disable=E0611
-from botbuilder.core.teams import TeamsInfo
 from botbuilder.core import (
     ActivityHandler,
     TurnContext,
     CardFactory,
     MessageFactory,
-    ConversationState,
-    MemoryStorage,
-    UserState,
+    Storage,
 )
 from botbuilder.schema import (
     Activity,
     ActivityTypes,
     ChannelAccount,
-    Attachment
+    Attachment,
+    DeliveryModes
 )
 from botbuilder.schema.teams import TeamsChannelAccount
 from botbuilder.dialogs import Dialog
@@ -29,6 +27,41 @@ from ..models import UserProfile, ConversationData
 from .interfaces.messages import MessageHandler
 from ..config import BotConfig
 from ..adapters import AdapterHandler
+from ..dispatcher import TurnDispatcher
+from ..exceptions import TurnQueueFull
+from ..teams import member_cache, team_cache
+from ..mentions import MentionParser
+from ..commands import CommandError, CommandRouter
+from ..activity import loads, read_activity
+from ..sessions import http_pool
+from ..auth import signing_keys
+from ..connectors import connector_pool
+from ..search import SearchIndex
+from ..cards import card_budget, card_registry
+from ..proactive import (
+    BroadcastEngine,
+    ConversationReferenceStore,
+    conversation_references
+)
+from ..storage import (
+    get_storage,
+    TrackedUserState,
+    TrackedConversationState,
+    WriteBehindStorage,
+)
+from ..conf import (
+    AZUREBOT_STORAGE,
+    AZUREBOT_STATE_WRITE_DELAY,
+    AZUREBOT_ASYNC_TURNS,
+    AZUREBOT_TURN_WORKERS,
+    AZUREBOT_TURN_QUEUE_SIZE,
+    AZUREBOT_TURN_CONVERSATION_QUEUE,
+    AZUREBOT_SEARCH,
+    AZUREBOT_SEARCH_PATH,
+    AZUREBOT_FAST_ACTIVITY,
+    AZUREBOT_BROADCAST_RESUME,
+    AZUREBOT_CONNECTOR_WARMUP,
+)
 
 
 class AbstractBot(ActivityHandler, MessageHandler):
@@ -36,6 +69,10 @@ class AbstractBot(ActivityHandler, MessageHandler):
     Base class for a bot that handles incoming messages from users.
     """
     commands: list = []
+    # commands declared with @command (compiled per class)
+    command_router: CommandRouter = CommandRouter([])
+    DEFER_STATE_KEY: str = 'AzureBot.defer_state'
+    COMMAND_STATE_KEY: str = 'AzureBot.command'
     activity_callback: Optional[Union[Awaitable, Callable]] = None
     commands_callback: Optional[Union[Awaitable, Callable]] = None
     default_message: str = 'Welcome to this Bot.'
@@ -44,6 +81,10 @@ class AbstractBot(ActivityHandler, MessageHandler):
         "You're receiving this because you're using this Agent Bot and joined to this conversation."
     )
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.command_router = CommandRouter.from_class(cls)
+
     def __init__(
         self,
         bot_name: str,
@@ -90,6 +131,42 @@ class AbstractBot(ActivityHandler, MessageHandler):
             raise ValueError(
                 "AzureBot: Missing Microsoft App ID and App Password."
             )
+        # Ack-fast mode: turns are queued and processed by workers.
+        self.async_turns: bool = kwargs.pop('async_turns', AZUREBOT_ASYNC_TURNS)
+        self._dispatcher_options: dict = {
+            "workers": kwargs.pop('turn_workers', AZUREBOT_TURN_WORKERS),
+            "max_pending": kwargs.pop('turn_queue_size', AZUREBOT_TURN_QUEUE_SIZE),
+            "max_per_conversation": kwargs.pop(
+                'turn_conversation_queue', AZUREBOT_TURN_CONVERSATION_QUEUE
+            ),
+        }
+        self._dispatcher: Optional[TurnDispatcher] = None
+        # Teams member profiles, team details and channels (shared caches)
+        self.members = member_cache
+        self.teams = team_cache
+        # Mentions and commands of the messages (parsed once per turn)
+        self.mentions = MentionParser(bot_name)
+        # State Storage backend (memory, redis, sqlite or a Storage instance)
+        self._storage: Union[str, Storage] = kwargs.pop('storage', AZUREBOT_STORAGE)
+        self._storage_options: dict = kwargs.pop('storage_options', {})
+        # Write-behind: seconds to buffer state writes (0 disables it)
+        self._write_delay: float = kwargs.pop(
+            'state_write_delay', AZUREBOT_STATE_WRITE_DELAY
+        )
+        # Full-text search index of the messages seen by the bot
+        search_index = kwargs.pop('search_index', AZUREBOT_SEARCH)
+        self.search_index: Optional[SearchIndex] = None
+        if isinstance(search_index, SearchIndex):
+            self.search_index = search_index
+        elif search_index:
+            self.search_index = SearchIndex(
+                f"{AZUREBOT_SEARCH_PATH}/{self._botid}" if AZUREBOT_SEARCH_PATH else None
+            )
+        # Conversation references (proactive messages and broadcasts)
+        self.references: ConversationReferenceStore = kwargs.pop(
+            'references', conversation_references
+        )
+        self.broadcasts: Optional[BroadcastEngine] = None
         self.kwargs = kwargs
         self._route = route or f"/api/{self._botid}/messages"
         super().__init__()
@@ -108,16 +185,25 @@ class AbstractBot(ActivityHandler, MessageHandler):
             elif isinstance(app, WebApp):
                 self.app = app  # register the app into the Extension
         # Memory and User State Management
-        self._memory = MemoryStorage()
+        self._memory = self.get_storage()
         # Use property setters to initialize accessors
-        self.user_state = UserState(self._memory)
-        self.conversation_state = ConversationState(self._memory)
+        self.user_state = TrackedUserState(self._memory)
+        self.conversation_state = TrackedConversationState(self._memory)
         # Config adapter
         self._adapter = AdapterHandler(
             config=self._config,
             logger=self.logger,
             conversation_state=self.conversation_state
         )
+        self.broadcasts = BroadcastEngine(
+            self._adapter, self.references, self.app_id
+        )
+        if self.async_turns:
+            self._dispatcher = TurnDispatcher(
+                self._process_queued_turn,
+                name=f"TurnDispatcher.{self._botid}",
+                **self._dispatcher_options
+            )
         # adding routes:
         self.app.router.add_post(self._route, self.messages)
         # add bot routes to exception routes
@@ -131,18 +217,80 @@ class AbstractBot(ActivityHandler, MessageHandler):
         # Register Startup and Cleanup handlers
         self.app.on_startup.append(self.on_startup)
         self.app.on_cleanup.append(self.on_cleanup)
+        # Shared outbound HTTP sessions
+        http_pool.setup(self.app)
 
     async def on_startup(self, app):
         """
         Some Authentication backends need to call an Startup.
         """
-        pass
+        # Bot Connector signing keys, fetched and rotated in background.
+        await signing_keys.start()
+        if callable(getattr(self._memory, 'open', None)):
+            await self._memory.open()
+        if self._dispatcher is not None:
+            await self._dispatcher.start()
+        if self.search_index is not None:
+            await self.search_index.open()
+        await self.references.open()
+        await connector_pool.open()
+        if AZUREBOT_CONNECTOR_WARMUP:
+            # connections to the service urls of the known conversations.
+            self._adapter.warm_up(await self.references.service_urls(self.app_id))
+        if AZUREBOT_BROADCAST_RESUME:
+            # broadcasts interrupted by a restart.
+            await self.broadcasts.resume()
 
     async def on_cleanup(self, app):
         """
         Cleanup the processes
         """
-        pass
+        if self._dispatcher is not None:
+            await self._dispatcher.stop()
+        await self.broadcasts.stop()
+        await self.references.close()
+        # shared by the bots: stopped by the last one.
+        await signing_keys.stop()
+        await connector_pool.close()
+        if self.search_index is not None:
+            await self.search_index.close()
+        if callable(getattr(self._memory, 'close', None)):
+            await self._memory.close()
+
+    def stats(self) -> dict:
+        """
+        Live counters of this Bot (state storage, turn queue).
+        """
+        stats = {"id": self._botid, "name": self._bot_name}
+        if callable(getattr(self._memory, 'stats', None)):
+            stats["storage"] = self._memory.stats()
+        if self._dispatcher is not None:
+            stats["dispatcher"] = self._dispatcher.stats()
+        stats["members"] = self.members.stats()
+        stats["teams"] = self.teams.stats()
+        stats["http"] = http_pool.stats()
+        if self._adapter is not None:
+            stats["auth"] = self._adapter.bot_framework_authentication.stats()
+            stats["outbound"] = self._adapter.outbound.stats()
+        stats["connectors"] = connector_pool.stats()
+        stats["references"] = self.references.stats()
+        if self.broadcasts is not None:
+            stats["broadcasts"] = self.broadcasts.stats()
+        stats["cards"] = {**card_budget.stats(), "templates": card_registry.stats()}
+        if self.search_index is not None:
+            stats["search"] = self.search_index.stats()
+        return stats
+
+    def get_storage(self) -> Storage:
+        """
+        Returns the Storage used for User and Conversation State.
+        """
+        options = {"namespace": f"azurebot:{self._botid}"}
+        options.update(self._storage_options)
+        storage = get_storage(self._storage, **options)
+        if self._write_delay:
+            storage = WriteBehindStorage(storage, delay=self._write_delay)
+        return storage
 
     @property
     def user_state(self):
@@ -202,15 +350,10 @@ class AbstractBot(ActivityHandler, MessageHandler):
     async def get_user_profile(self, turn_context: TurnContext) -> TeamsChannelAccount:
         # Check if the channel ID is 'msteams'
         if turn_context.activity.channel_id == 'msteams':
-            try:
-                return await TeamsInfo.get_member(
-                    turn_context,
-                    turn_context.activity.from_property.id
-                )
-            except Exception as exc:
-                self.logger.warning(
-                    f"Error on Teams user's profile: {exc}"
-                )
+            return await self.members.get_member(
+                turn_context,
+                turn_context.activity.from_property.id
+            )
         else:
             self.logger.notice(
                 f"Channel Service: {turn_context.activity.channel_id}"
@@ -252,9 +395,35 @@ class AbstractBot(ActivityHandler, MessageHandler):
                     )
         return attachment_list
 
+    async def dispatch_command(self, turn_context: TurnContext) -> bool:
+        """
+        Runs the @command of the message, at most once per turn.
+
+        Returns True if the message was a command.
+        """
+        if self.COMMAND_STATE_KEY in turn_context.turn_state:
+            return turn_context.turn_state[self.COMMAND_STATE_KEY] is not None
+        message = self.mentions.get(turn_context)
+        cmd = self.command_router.match(message.command)
+        if cmd is not None and not cmd.accepts(message.args):
+            # "help me": a sentence, not the command.
+            cmd = None
+        turn_context.turn_state[self.COMMAND_STATE_KEY] = cmd
+        if cmd is None:
+            return False
+        try:
+            kwargs = cmd.parse(message.args)
+        except CommandError as exc:
+            await turn_context.send_activity(str(exc))
+            return True
+        await cmd.handler(self, turn_context, **kwargs)
+        return True
+
     async def on_message_activity(self, turn_context: TurnContext):
         """Handles incoming message activities."""
         print('=== ON MESSAGE ACTIVITY === ')
+        if self.command_router and await self.dispatch_command(turn_context):
+            return
         # Listen for the command to send a badge
         if turn_context.activity.text:
             if turn_context.activity.text.lower().strip() in self.commands:
@@ -291,6 +460,12 @@ class AbstractBot(ActivityHandler, MessageHandler):
         #     self.conversation_state.create_property("DialogState"),
         # )
 
+    async def on_conversation_update_activity(self, turn_context: TurnContext):
+        if turn_context.activity.channel_id == 'msteams':
+            # keep team and channel metadata up to date.
+            self.teams.update_from_activity(turn_context.activity)
+        return await super().on_conversation_update_activity(turn_context)
+
     async def on_members_added_activity(
         self,
         members_added: list[ChannelAccount],
@@ -337,16 +512,44 @@ class AbstractBot(ActivityHandler, MessageHandler):
                     )
 
     async def save_state_changes(self, turn_context: TurnContext):
-        await self.conversation_state.save_changes(
-            turn_context
-        )
-        await self.user_state.save_changes(
-            turn_context
-        )
+        """
+        Saves User and Conversation State.
+
+        Inside `on_turn` this is deferred: all calls made by the handlers are
+        coalesced into a single flush at the end of the turn.
+        """
+        if turn_context.turn_state.get(self.DEFER_STATE_KEY):
+            return
+        await self.flush_state(turn_context)
+
+    async def flush_state(self, turn_context: TurnContext, force: bool = False):
+        """
+        Writes the changed User and Conversation State in a single Storage write.
+        """
+        states = (self.conversation_state, self.user_state)
+        changes = {}
+        for state in states:
+            changes.update(state.get_changes(turn_context, force))
+        if changes:
+            await self._memory.write(changes)
+            for state in states:
+                state.mark_saved(turn_context)
 
     async def on_turn(self, turn_context: TurnContext):
         ## Get the user's profile on MS Teams:
         print('=== ON TURN === ')
+        # State is saved once, at the end of the turn.
+        turn_context.turn_state[self.DEFER_STATE_KEY] = True
+        if self.search_index is not None:
+            try:
+                self.search_index.add_activity(turn_context.activity)
+            except Exception as exc:  # pylint: disable=W0718
+                self.logger.warning(f"Error indexing activity: {exc}")
+        try:
+            # conversations the bot can message proactively.
+            await self.references.capture(self.app_id, turn_context.activity)
+        except Exception as exc:  # pylint: disable=W0718
+            self.logger.warning(f"Error saving conversation reference: {exc}")
         if turn_context.activity.channel_id == 'msteams':
             user_profile = await self.user_profile_accessor.get(turn_context, UserProfile)
             conversation_data = await self.conversation_data_accessor.get(
@@ -367,20 +570,18 @@ class AbstractBot(ActivityHandler, MessageHandler):
             await self.conversation_data_accessor.set(turn_context, conversation_data)
             # after, fire up the on_message_activity:
             await super().on_turn(turn_context)
-            if turn_context.activity.text and turn_context.activity.text.lower().strip() in self.commands:
-                await self.commands_callback(turn_context, user_profile)
             # Save any state changes that might have occurred during the turn.
-            await self.save_state_changes(turn_context)
+            await self.flush_state(turn_context)
         elif turn_context.activity.channel_id == 'webchat':
             # Howto: Evaluate WebChat
             await super().on_turn(turn_context)
             # Save any state changes that might have occurred during the turn.
-            await self.save_state_changes(turn_context)
+            await self.flush_state(turn_context)
         else:
             # TODO: Evaluate different channels
             await super().on_turn(turn_context)
             # Save any state changes that might have occurred during the turn.
-            await self.save_state_changes(turn_context)
+            await self.flush_state(turn_context)
 
     async def send_adaptive_card(self, turn_context: TurnContext, **kwargs):
         message = Activity(
@@ -407,12 +608,21 @@ class AbstractBot(ActivityHandler, MessageHandler):
         """
         # Main bot message handler.
         if request.content_type.lower() == 'application/json':
-            body = await request.json()
+            body = await request.read()
         else:
             return web.Response(status=HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+        try:
+            body = loads(body)
+        except ValueError:
+            return web.Response(status=HTTPStatus.BAD_REQUEST)
 
-        activity = Activity().deserialize(body)
+        if AZUREBOT_FAST_ACTIVITY:
+            activity = read_activity(body)
+        else:
+            activity = Activity().deserialize(body)
         auth_header = request.headers.get('Authorization', '')
+        if self._dispatcher is not None and self._can_defer(activity):
+            return await self._enqueue_activity(auth_header, activity)
         # TODO: routing to various Bots
         try:
             response = await self._adapter.process_activity(
@@ -431,3 +641,52 @@ class AbstractBot(ActivityHandler, MessageHandler):
             return web.Response(
                 status=HTTPStatus.INTERNAL_SERVER_ERROR
             )
+
+    def _can_defer(self, activity: Activity) -> bool:
+        """
+        Invoke activities and "expectReplies" deliveries need the turn
+        result on the HTTP response, so they are always processed inline.
+        """
+        return (
+            activity.type != ActivityTypes.invoke
+            and activity.delivery_mode != DeliveryModes.expect_replies
+            and activity.conversation is not None
+        )
+
+    async def _enqueue_activity(
+        self,
+        auth_header: str,
+        activity: Activity
+    ) -> web.Response:
+        """
+        Authenticates the activity and queues its turn,
+        answering 202 (Accepted) to the Bot Connector right away.
+        """
+        try:
+            auth_result = await self._adapter.bot_framework_authentication.authenticate_request(
+                activity, auth_header
+            )
+        except PermissionError as exc:
+            self.logger.warning(
+                f"Unauthorized activity: {exc}"
+            )
+            return web.Response(status=HTTPStatus.UNAUTHORIZED)
+        try:
+            self._dispatcher.submit(
+                activity.conversation.id,
+                (auth_result, activity)
+            )
+        except TurnQueueFull as exc:
+            self.logger.warning(str(exc))
+            # the Bot Connector will retry the delivery.
+            return web.Response(
+                status=HTTPStatus.SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"}
+            )
+        return web.Response(status=HTTPStatus.ACCEPTED)
+
+    async def _process_queued_turn(self, item: tuple) -> None:
+        auth_result, activity = item
+        await self._adapter.process_activity(
+            auth_result, activity, self.on_turn
+        )
@@ -1,77 +1,80 @@
-from botbuilder.core.card_factory import CardFactory
 from botbuilder.schema import Activity, ActivityTypes
 from botbuilder.core import (
     TurnContext,
 )
+from ..cards import card_registry
 
 
-class CardBot:
-
-    def create_adaptive_card(self) -> dict:
-        card_data = {
-            "type": "AdaptiveCard",
-            "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
-            "version": "1.3",
-            "body": [
+BADGE_CARD = {
+    "type": "AdaptiveCard",
+    "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
+    "version": "1.3",
+    "body": [
+        {
+            "type": "TextBlock",
+            "text": "Hello!, you are sending a Recognition Badge to someone:"
+        },
+        {
+            "type": "Input.ChoiceSet",
+            "id": "rewardChoice",
+            "style": "compact",
+            "value": "1",
+            "choices": [
                 {
-                    "type": "TextBlock",
-                    "text": "Hello!, you are sending a Recognition Badge to someone:"
+                    "title": "Valuable Reward",
+                    "value": "1"
                 },
                 {
-                    "type": "Input.ChoiceSet",
-                    "id": "rewardChoice",
-                    "style": "compact",
-                    "value": "1",
-                    "choices": [
-                        {
-                            "title": "Valuable Reward",
-                            "value": "1"
-                        },
-                        {
-                            "title": "Assignable Reward",
-                            "value": "2"
-                        },
-                        {
-                            "title": "A very Special Reward",
-                            "value": "3"
-                        }
-                    ]
+                    "title": "Assignable Reward",
+                    "value": "2"
                 },
                 {
-                    "type": "Input.Text",
-                    "id": "receiverEmail",
-                    "placeholder": "Receiver's email"
-                },
-                {
-                    "type": "Input.Text",
-                    "id": "message",
-                    "isMultiline": True,
-                    "maxLength": 300,
-                    "placeholder": "Your message"
-                },
+                    "title": "A very Special Reward",
+                    "value": "3"
+                }
+            ]
+        },
+        {
+            "type": "Input.Text",
+            "id": "receiverEmail",
+            "placeholder": "Receiver's email"
+        },
+        {
+            "type": "Input.Text",
+            "id": "message",
+            "isMultiline": True,
+            "maxLength": 300,
+            "placeholder": "Your message"
+        },
+        {
+            "type": "ActionSet",
+            "actions": [
                 {
-                    "type": "ActionSet",
-                    "actions": [
-                        {
-                            "type": "Action.Submit",
-                            "title": "Send",
-                            "data": {
-                                "action": "submit"
-                            }
-                        }
-                    ]
+                    "type": "Action.Submit",
+                    "title": "Send",
+                    "data": {
+                        "action": "submit"
+                    }
                 }
             ]
         }
-        return card_data
+    ]
+}
+
+card_registry.register('cardbot.badge', BADGE_CARD)
+
+
+class CardBot:
+
+    def create_adaptive_card(self) -> dict:
+        return card_registry.render('cardbot.badge')
 
     async def on_message_activity(self, turn_context: TurnContext):
         if turn_context.activity.text.lower() == '/badge':
-            card_data = self.create_adaptive_card()
             await turn_context.send_activity(
                 Activity(  # Use the imported Activity class
                     type=ActivityTypes.message,
-                    attachments=[CardFactory.adaptive_card(card_data)]
+                    attachments=[card_registry.attachment('cardbot.badge')]
                 )
             )
 
@@ -2,41 +2,35 @@
 from botbuilder.core import TurnContext
 from botbuilder.schema import ActivityTypes
 from botbuilder.schema.teams import TeamInfo, TeamsChannelAccount
-from botbuilder.core.teams import TeamsInfo
 from .abstract import AbstractBot
+from ..commands import command
 
 
 class ChannelBot(AbstractBot):
     """A bot that listens for @ mentions in channels and responds to commands."""
 
     def __init__(self, *args, **kwargs):
-        """Initialize the ChannelBot.
-
-        Set up the bot's command list.
-        """
+        """Initialize the ChannelBot."""
         super().__init__(*args, **kwargs)
-        # Define commands that the bot responds to
-        self.commands = ["help", "info", "status"]
 
     async def on_message_activity(self, turn_context: TurnContext):
         """Handle messages, focusing on those with @ mentions."""
         # Check if this is a channel message with a mention
         if turn_context.activity.channel_data and "team" in turn_context.activity.channel_data:
-            # Get the text without the mention
-            text = self._remove_mention_text(turn_context.activity.text)
+            # Get the text without the mention (parsed once for the turn)
+            message = self.mentions.get(turn_context)
 
             # Log the cleaned message
-            self.logger.info(f"Received channel message: {text}")
-
-            # Check if the text starts with a command
-            command = text.strip().lower().split()[0] if text and text.strip() else ""
+            self.logger.info(f"Received channel message: {message.clean}")
 
-            if command in self.commands:
-                await self._handle_command(command, turn_context)
+            if await self.dispatch_command(turn_context):
+                # Save state after handling command
+                await self.save_state_changes(turn_context)
             else:
                 # If not a recognized command but still mentioned
                 await turn_context.send_activity(
-                    f"I don't recognize that command. Try one of: {', '.join(self.commands)}"
+                    "I don't recognize that command. "
+                    f"Try one of: {', '.join(self.command_router.names())}"
                 )
         else:
             # For direct messages, use the standard behavior
@@ -44,36 +38,70 @@ class ChannelBot(AbstractBot):
 
     def _remove_mention_text(self, text: str) -> str:
         """Remove the @mention part from the message."""
-        if not text:
-            return ""
+        return self.mentions.parse_text(text).clean
+
+    @command()
+    async def help(self, turn_context: TurnContext):
+        """List the available commands"""
+        await turn_context.send_activity(
+            f"Available commands:\n{self.command_router.help()}"
+        )
+
+    @command()
+    async def info(self, turn_context: TurnContext):
+        """Team and channel of this conversation"""
+        # Get team and channel information
+        team_details = await self.teams.get_team_details(turn_context)
+        channel_info = await self.teams.get_channel(turn_context)
+        if channel_info is None:
+            channel_name = 'Unknown'
+        else:
+            # the General channel has no name.
+            channel_name = channel_info.name or 'General'
 
-        # In Teams, mentions are in the format <at>BotName</at>
-        # We'll use a simple string replacement approach
-        parts = text.split(">")
-        if len(parts) > 1:
-            # Return everything after the first mention
-            return "".join(parts[1:]).strip()
-        return text.strip()
+        response = (
+            f"Team: {team_details.name}\n"
+            f"Channel: {channel_name}\n"
+            f"Bot: {self._bot_name}"
+        )
+        await turn_context.send_activity(response)
 
-    async def _handle_command(self, command: str, turn_context: TurnContext):
-        """Handle known commands."""
-        if command == "help":
-            await turn_context.send_activity(
-                f"Available commands: {', '.join(self.commands)}"
-            )
-        elif command == "info":
-            # Get team and channel information
-            team_details = await TeamsInfo.get_team_details(turn_context)
-            channel_info = turn_context.activity.channel_data.get("channel", {})
+    @command()
+    async def status(self, turn_context: TurnContext):
+        """Check the bot is running"""
+        await turn_context.send_activity("I'm up and running!")
 
-            response = (
-                f"Team: {team_details.name}\n"
-                f"Channel: {channel_info.get('name', 'Unknown')}\n"
-                f"Bot: {self._bot_name}"
-            )
-            await turn_context.send_activity(response)
-        elif command == "status":
-            await turn_context.send_activity("I'm up and running!")
+    @command("search", aliases=("find",))
+    async def search_messages(self, turn_context: TurnContext, query: str = ""):
+        """Search the messages of this team (in:channel)"""
+        await self._search(turn_context, query)
 
-        # Save state after handling command
-        await self.save_state_changes(turn_context)
+    async def _search(self, turn_context: TurnContext, query: str):
+        """search <terms> [in:channel]: messages of this team (or chat)."""
+        if self.search_index is None:
+            await turn_context.send_activity("Search is not enabled for this bot.")
+            return
+        # the command itself is not part of the history.
+        self.search_index.delete(turn_context.activity.id)
+        terms = query.split()
+        scope = next((t for t in terms if t.lower().startswith("in:")), "in:team")
+        query = " ".join(t for t in terms if t != scope)
+        if not query:
+            await turn_context.send_activity("Usage: search <terms> [in:channel]")
+            return
+        # never wider than the team (or the chat) of the conversation.
+        team_id, channel_id = self.search_index.scope(
+            turn_context.activity, channel=scope.lower() == "in:channel"
+        )
+        results = self.search_index.search(
+            query, team_id=team_id, channel_id=channel_id, limit=5
+        )
+        if not results:
+            await turn_context.send_activity(f"No messages found for: {query}")
+            return
+        lines = [
+            f"{idx}. **{result['author'] or 'Unknown'}** "
+            f"({(result['timestamp'] or '')[:10]}): {result['snippet']}"
+            for idx, result in enumerate(results, start=1)
+        ]
+        await turn_context.send_activity("\n\n".join(lines))
@@ -12,11 +12,89 @@ from botbuilder.dialogs import (
     DialogTurnResult,
     DialogTurnStatus
 )
-from botbuilder.core import (
-    MessageFactory,
-    CardFactory
-)
+from botbuilder.core import MessageFactory
 from botbuilder.dialogs.choices import Choice
+from ...cards import card_registry
+
+
+BADGE_NAME_CARD = {
+    "type": "AdaptiveCard",
+    "body": [
+        {
+            "type": "TextBlock",
+            "size": "Medium",
+            "weight": "Bolder",
+            "text": "Hello! Please enter the name or email of the awarded person:"
+        },
+        {
+            "type": "Input.Text",
+            "id": "recipientName",
+            "placeholder": "Enter name or email"
+        }
+    ],
+    "actions": [
+        {
+            "type": "Action.Submit",
+            "title": "Submit"
+        }
+    ],
+    "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
+    "version": "1.3"
+}
+
+BADGE_FORM_CARD = {
+    "type": "AdaptiveCard",
+    "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
+    "version": "1.3",
+    "body": [
+        {
+            "type": "TextBlock",
+            "text": "You are sending a Badge to ${name} (${email})."
+        },
+        {
+            "type": "Input.ChoiceSet",
+            "id": "rewardChoice",
+            "style": "compact",
+            "value": "1",
+            "choices": [
+                {
+                    "title": "Valuable Reward",
+                    "value": "1"
+                },
+                {
+                    "title": "Assignable Reward",
+                    "value": "2"
+                },
+                {
+                    "title": "A very Special Reward",
+                    "value": "3"
+                }
+            ]
+        },
+        {
+            "type": "Input.Text",
+            "id": "message",
+            "isMultiline": True,
+            "maxLength": 300,
+            "placeholder": "Your message"
+        },
+        {
+            "type": "ActionSet",
+            "actions": [
+                {
+                    "type": "Action.Submit",
+                    "title": "Send",
+                    "data": {
+                        "action": "submit"
+                    }
+                }
+            ]
+        }
+    ]
+}
+
+card_registry.register('badge.ask_name', BADGE_NAME_CARD)
+card_registry.register('badge.form', BADGE_FORM_CARD)
 
 
 class BadgeDialog(ComponentDialog):
@@ -41,33 +119,8 @@ class BadgeDialog(ComponentDialog):
         self.initial_dialog_id = "WaterfallDialog"
 
     async def ask_for_name_step(self, step_context: WaterfallStepContext):
-        # Define the Adaptive Card content
-        card_content = {
-            "type": "AdaptiveCard",
-            "body": [
-                {
-                    "type": "TextBlock",
-                    "size": "Medium",
-                    "weight": "Bolder",
-                    "text": "Hello! Please enter the name or email of the awarded person:"
-                },
-                {
-                    "type": "Input.Text",
-                    "id": "recipientName",
-                    "placeholder": "Enter name or email"
-                }
-            ],
-            "actions": [
-                {
-                    "type": "Action.Submit",
-                    "title": "Submit"
-                }
-            ],
-            "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
-            "version": "1.3"
-        }
         # Create and send the Adaptive Card
-        card = CardFactory.adaptive_card(card_content)
+        card = card_registry.attachment('badge.ask_name')
         await step_context.context.send_activity(
             MessageFactory.attachment(card)
         )
@@ -76,81 +129,18 @@ class BadgeDialog(ComponentDialog):
             DialogTurnStatus.Waiting
         )
 
-    def get_badge_form(self, person):
-        card_data = {
-            "type": "AdaptiveCard",
-            "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
-            "version": "1.3",
-            "body": [
-                {
-                    "type": "Input.Text",
-                    "id": "message",
-                    "isMultiline": True,
-                    "maxLength": 300,
-                    "placeholder": "Your message"
-                },
-                {
-                    "type": "ActionSet",
-                    "actions": [
-                        {
-                            "type": "Action.Submit",
-                            "title": "Send",
-                            "data": {
-                                "action": "submit"
-                            }
-                        }
-                    ]
-                }
-            ]
-        }
-        name = person["name"]
-        email = person["email"]
-        # Adding the badges (calculated from the database)
-        card_data['body'].insert(
-            0,
-            {
-                "type": "Input.ChoiceSet",
-                "id": "rewardChoice",
-                "style": "compact",
-                "value": "1",
-                "choices": [
-                    {
-                        "title": "Valuable Reward",
-                        "value": "1"
-                    },
-                    {
-                        "title": "Assignable Reward",
-                        "value": "2"
-                    },
-                    {
-                        "title": "A very Special Reward",
-                        "value": "3"
-                    }
-                ]
-            }
-        )
-        # adding the message:
-        card_data["body"].insert(
-            0,
-            {
-                "type": "TextBlock",
-                "text": f"You are sending a Badge to {name} ({email})."
-            }
-        )
-        return card_data
+    def get_badge_form(self, person) -> dict:
+        # badges are still fixed, the card only binds the person.
+        return card_registry.render('badge.form', person)
 
     async def ask_for_badge_step(self, step_context: WaterfallStepContext):
         recipient_info = step_context.context.turn_state.get("BadgeBot.info")
-        # look for person in database:
-        print('RECIPIENT > ', recipient_info)
-        # assuming person was found (sample person):
         step_context.context.turn_state["BadgeBot.receiver"] = recipient_info
-        person = {
-            "name": "Jesus Lara",
-            "username": "jlara",
-            "email": "jlara@trocglobal.com"
-        }
+        # look for person in the local user directory:
+        query = (recipient_info or {}).get("recipientName")
+        person = self.bot.directory.lookup(query) if query else None
         if person:
+            step_context.context.turn_state["BadgeBot.person"] = person
             # Create and send the Adaptive Card
             card_data = self.get_badge_form(person)
             card = self.bot.create_card(card_data)
@@ -1,9 +1,9 @@
-import re
 from botbuilder.core import TurnContext
 from botbuilder.schema import Activity, ActivityTypes
 from botbuilder.schema.teams import TeamsChannelAccount
 from botbuilder.core.teams import TeamsInfo
 from .abstract import AbstractBot
+from ..mentions import MentionParser
 
 
 class EchoBot(AbstractBot):
@@ -39,6 +39,7 @@ class EchoChannelBot(AbstractBot):
     def __init__(self, bot_name, app, **kwargs):
         super().__init__(bot_name, app, **kwargs)
         self.mention_text = kwargs.get('mention_text', 'echo')
+        self.mentions = MentionParser(self._bot_name, trigger=self.mention_text)
 
         # Configure additional properties
         self.debug_mode = kwargs.get('debug_mode', False)
@@ -85,6 +86,11 @@ class EchoChannelBot(AbstractBot):
 
         self.logger.debug("--- End Activity Debug Info ---")
 
+    def _strip_quotes(self, text: str) -> str:
+        if self.strip_quotes and len(text) > 1 and text[0] == text[-1] and text[0] in '"\'':
+            return text[1:-1]
+        return text
+
     def process_teams_mention(self, text):
         """
         Process a message that might contain Teams mentions in the format <at>Name</at>.
@@ -95,31 +101,10 @@ class EchoChannelBot(AbstractBot):
         Returns:
             str: The cleaned message text with mentions and trigger word removed
         """
-        # First, check for mentions in Teams format
-        if "<at>" in text and "</at>" in text:
-            # Extract all mentions
-            mentions = re.findall(r'<at>.*?</at>', text)
-
-            # Remove all mentions
-            cleaned_text = text
-            for mention in mentions:
-                cleaned_text = cleaned_text.replace(mention, "").strip()
-        else:
-            cleaned_text = text
-
-        # Now remove the trigger word if present
-        if self.mention_text.lower() in cleaned_text.lower():
-            parts = cleaned_text.lower().split(self.mention_text.lower(), 1)
-            cleaned_text = parts[1].strip() if len(parts) > 1 else ""
-
-        # Strip quotes if enabled
-        if self.strip_quotes and cleaned_text and (
-            (cleaned_text.startswith('"') and cleaned_text.endswith('"')) or
-            (cleaned_text.startswith("'") and cleaned_text.endswith("'"))
-        ):
-            cleaned_text = cleaned_text[1:-1]
-
-        return cleaned_text
+        message = self.mentions.parse_text(text)
+        if message.triggered is not None:
+            return self._strip_quotes(message.triggered)
+        return self._strip_quotes(message.clean)
 
     async def on_message_activity(self, turn_context: TurnContext):
         """
@@ -138,78 +123,35 @@ class EchoChannelBot(AbstractBot):
             and activity.conversation.conversation_type == 'channel'
         )
 
-        print(f"Is Teams Message: {is_teams_message}, Is Channel Message: {is_channel_message}")
-        self.logger.notice(
+        self.logger.debug(
             f"Is Teams Message: {is_teams_message}, Is Channel Message: {is_channel_message}"
         )
 
+        # mentions, text and trigger word, parsed once for the turn.
+        message = self.mentions.get(turn_context)
+
         if is_teams_message and is_channel_message:
-            # First check if we have a mention tag in the text
-            if "<at>" in activity.text:
-                # Get our bot name
-                bot_name = self._bot_name
-                mention_pattern = f"<at>{bot_name}</at>"
-
-                # Check if our bot was the one mentioned
-                if mention_pattern in activity.text:
-                    self.logger.debug(
-                        f"Bot '{bot_name}' was explicitly mentioned in the message"
-                    )
-
-                    # Process the message to extract content after mention and trigger word
-                    message_text = activity.text
-                    processed_message = self.process_teams_mention(message_text)
-
-                    # Check if the trigger word is in the original message
-                    if self.mention_text.lower() in message_text.lower():
-                        # Reply with an echo of the processed message
-                        self.logger.debug(f"Processed message: '{processed_message}'")
-                        await turn_context.send_activity(f"Echo: {processed_message}")
-
-                        # Save state and return
-                        await self.save_state_changes(turn_context)
-                        return
-
-            # Fallback: try with the entity-based approach
-            if await self.was_bot_mentioned(turn_context):
-                self.logger.debug("Bot was mentioned via entity detection")
-
-                # Extract the actual message content
-                message_without_mentions = self.remove_mentions_from_text(turn_context)
-
-                # Check if the trigger word is in the message
-                if self.mention_text.lower() in message_without_mentions.lower():
-                    # Process to get content after trigger word
-                    processed_message = self.process_teams_mention(message_without_mentions)
-
-                    # Reply with an echo
-                    await turn_context.send_activity(f"Echo: {processed_message}")
-                    self.logger.debug("Sent echo response via entity detection")
-
-                    # Save state and return
-                    await self.save_state_changes(turn_context)
-                    return
+            # Reply when the bot was mentioned (<at> tag or mention entity)
+            # with the trigger word.
+            if message.bot_mentioned and message.triggered is not None:
+                processed_message = self._strip_quotes(message.triggered)
+                self.logger.debug(f"Processed message: '{processed_message}'")
+                await turn_context.send_activity(f"Echo: {processed_message}")
+
+                # Save state and return
+                await self.save_state_changes(turn_context)
+                return
 
         # Handle direct messages to the bot (could be in Teams or other channels)
         elif is_teams_message and not is_channel_message:
             # For direct messages in Teams, check if the message contains our trigger word
-            if self.mention_text.lower() in activity.text.lower():
-                # Process the message to extract content after the trigger word
-                parts = activity.text.lower().split(self.mention_text.lower(), 1)
-                if len(parts) > 1:
-                    message_content = parts[1].strip()
-
-                    # Strip quotes if needed
-                    if self.strip_quotes and message_content and (
-                        (message_content.startswith('"') and message_content.endswith('"')) or
-                        (message_content.startswith("'") and message_content.endswith("'"))
-                    ):
-                        message_content = message_content[1:-1]
-
-                    # Send echo response
-                    await turn_context.send_activity(f"Echo: {message_content}")
-                    await self.save_state_changes(turn_context)
-                    return
+            if message.triggered is not None:
+                # Send echo response
+                await turn_context.send_activity(
+                    f"Echo: {self._strip_quotes(message.triggered)}"
+                )
+                await self.save_state_changes(turn_context)
+                return
 
             # If no trigger word, just echo back the message as is
             user_message = activity.text
@@ -238,36 +180,13 @@ class EchoChannelBot(AbstractBot):
         Returns:
             bool: True if the bot was mentioned, False otherwise.
         """
-        # If the channel is Teams, we can use the TeamsInfo to check for mentions
-        if turn_context.activity.channel_id == "msteams":
-            # Get the bot's ID
-            bot_id = turn_context.activity.recipient.id
-
-            # For Teams, the mention is usually in the text with <at>BotName</at>
-            # We'll first check if our bot name is in the message with at-tags
-            if f"<at>{self._bot_name}</at>" in turn_context.activity.text:
-                return True
-
-            # Check for bot ID in mentions (safer way to check)
-            if hasattr(turn_context.activity, 'entities') and turn_context.activity.entities:
-                for entity in turn_context.activity.entities:
-                    # Debug information about entity structure
-                    self.logger.debug(f"Entity type: {entity.type}, Entity properties: {vars(entity)}")
-
-                    # Check if this is a mention entity (different implementations might have different structures)
-                    if entity.type == "mention":
-                        # Check if mentioned ID matches bot ID
-                        if hasattr(entity, 'mentioned') and hasattr(entity.mentioned, 'id') and entity.mentioned.id == bot_id:  # noqa: E501
-                            return True
-                        # If entity has direct ID property
-                        elif hasattr(entity, 'id') and entity.id == bot_id:
-                            return True
-                        # If entity has text that contains the bot name (fallback)
-                        elif hasattr(entity, 'text') and self._bot_name.lower() in entity.text.lower():
-                            return True
-
-        # For other channels or as a fallback, check if the bot's name is in the message
-        return self._bot_name.lower() in turn_context.activity.text.lower()
+        message = self.mentions.get(turn_context)
+        if message.bot_mentioned:
+            return True
+        # For other channels (no mention entities), look for the bot name.
+        if turn_context.activity.channel_id != "msteams":
+            return self._bot_name.lower() in message.text.lower()
+        return False
 
     def remove_mentions_from_text(self, turn_context: TurnContext) -> str:
         """
@@ -276,30 +195,4 @@ class EchoChannelBot(AbstractBot):
         Returns:
             str: Message text with mentions removed.
         """
-        text = turn_context.activity.text
-
-        # In Teams, mentions appear as <at>BotName</at> in the text
-        # First try to remove this format
-        if turn_context.activity.channel_id == "msteams":
-            # Try to find the bot name in an at-mention tag
-            at_mention = f"<at>{self._bot_name}</at>"
-            if at_mention in text:
-                text = text.replace(at_mention, "").strip()
-
-        # If there are entities, try to process them too
-        if hasattr(turn_context.activity, 'entities') and turn_context.activity.entities:
-            # Process each mention entity if it has start/end indices
-            for entity in turn_context.activity.entities:
-                if entity.type == "mention":
-                    try:
-                        # Try to remove by indices if available
-                        if hasattr(entity, 'start_index') and hasattr(entity, 'end_index'):
-                            mention_text = text[entity.start_index:entity.end_index]
-                            text = text.replace(mention_text, "").strip()
-                        # Fallback: if entity has text property, try to remove it directly
-                        elif hasattr(entity, 'text'):
-                            text = text.replace(entity.text, "").strip()
-                    except Exception as e:
-                        self.logger.warning(f"Error removing mention: {str(e)}")
-
-        return text
+        return self.mentions.get(turn_context).clean
@@ -1,8 +1,8 @@
 # Create a new file: azure_teambots/bots/file_bot.py
 import os
 import base64
-import aiohttp
 import tempfile
+import aiohttp
 from botbuilder.core import TurnContext, CardFactory
 from botbuilder.schema import (
     ActivityTypes,
@@ -14,13 +14,15 @@ from botbuilder.schema import (
     CardImage
 )
 from .abstract import AbstractBot
+from ..commands import command
+from ..conf import AZUREBOT_DOWNLOAD_TIMEOUT
+from ..sessions import get_session
 
 class FileBot(AbstractBot):
     """A bot that can handle file uploads and send files."""
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.commands = ["upload", "sendimage", "help"]
         self.default_message = "I can help with file uploads and downloads. Type 'help' for more information."
         # Create a temp directory for file storage if needed
         self.temp_dir = tempfile.mkdtemp()
@@ -33,22 +35,10 @@ class FileBot(AbstractBot):
             return
 
         # Handle text commands
-        if turn_context.activity.text:
-            text = turn_context.activity.text.lower().strip()
-
-            if text == "help":
-                await self._send_help(turn_context)
-            elif text == "upload":
-                await self._prompt_for_upload(turn_context)
-            elif text.startswith("sendimage"):
-                # Extract image name if provided
-                parts = text.split(maxsplit=1)
-                image_name = parts[1] if len(parts) > 1 else "sample.png"
-                await self._send_image(turn_context, image_name)
-            else:
-                await turn_context.send_activity(
-                    "I don't understand that command. Type 'help' to see what I can do."
-                )
+        if turn_context.activity.text and not await self.dispatch_command(turn_context):
+            await turn_context.send_activity(
+                "I don't understand that command. Type 'help' to see what I can do."
+            )
 
         # Save state
         await self.save_state_changes(turn_context)
@@ -111,20 +101,22 @@ class FileBot(AbstractBot):
         file_path = os.path.join(self.temp_dir, safe_filename)
 
         # Download the file
-        async with aiohttp.ClientSession() as session:
-            async with session.get(content_url) as response:
-                if response.status == 200:
-                    with open(file_path, 'wb') as f:
-                        while True:
-                            chunk = await response.content.read(1024)
-                            if not chunk:
-                                break
-                            f.write(chunk)
-                else:
-                    raise Exception(f"Failed to download file: HTTP {response.status}")
+        session = get_session()
+        timeout = aiohttp.ClientTimeout(total=AZUREBOT_DOWNLOAD_TIMEOUT)
+        async with session.get(content_url, timeout=timeout) as response:
+            if response.status == 200:
+                with open(file_path, 'wb') as f:
+                    while True:
+                        chunk = await response.content.read(1024)
+                        if not chunk:
+                            break
+                        f.write(chunk)
+            else:
+                raise Exception(f"Failed to download file: HTTP {response.status}")
 
         return file_path
 
+    @command("help")
     async def _send_help(self, turn_context: TurnContext):
         """Send help information about file capabilities."""
         help_text = (
@@ -136,12 +128,14 @@ class FileBot(AbstractBot):
         )
         await turn_context.send_activity(help_text)
 
+    @command("upload")
     async def _prompt_for_upload(self, turn_context: TurnContext):
         """Send a message prompting the user to upload a file."""
         await turn_context.send_activity(
             "Please upload a file by clicking the attachment button in your chat window."
         )
 
+    @command("sendimage")
     async def _send_image(self, turn_context: TurnContext, image_name: str = "sample.png"):
         """Send an image to the user."""
         # For demo purposes, we'll generate a simple image
@@ -1,7 +1,10 @@
+import json
+from typing import Optional, Union
 from botbuilder.core import (
     CardFactory, MessageFactory, TurnContext
 )
 from botbuilder.schema import Attachment, Activity, ActivityTypes
+from ...cards import card_budget
 
 
 class MessageHandler:
@@ -43,8 +46,32 @@ class MessageHandler:
         """
         await turn_context.send_activity(message)
 
-    def get_card(self, card_data: str) -> CardFactory:
-        return CardFactory.adaptive_card(card_data)
+    def get_card(self, card_data: Union[str, dict], name: Optional[str] = None) -> Attachment:
+        if isinstance(card_data, str):
+            card_data = json.loads(card_data)
+        return self.create_card(card_data, name=name)
 
-    def create_card(self, card_data) -> Attachment:
-        return CardFactory.adaptive_card(card_data)
+    def create_card(self, card_data: dict, name: Optional[str] = None) -> Attachment:
+        """
+        Adaptive Card attachment, minified and within the size budget.
+
+        Raises CardTooLarge before any connector call if the card is over
+        budget (use `send_card` to split it).
+        """
+        return CardFactory.adaptive_card(
+            card_budget.prepare(card_data, name=name)
+        )
+
+    async def send_card(
+        self,
+        card_data: dict,
+        turn_context: TurnContext,
+        name: Optional[str] = None
+    ):
+        """
+        Send an Adaptive Card, split into several messages if too large.
+        """
+        for card in card_budget.split(card_data, name=name):
+            await turn_context.send_activity(
+                MessageFactory.attachment(CardFactory.adaptive_card(card))
+            )
@@ -1,18 +1,84 @@
-from botbuilder.core import TurnContext
+from typing import Optional
+from botbuilder.core import Storage, TurnContext
 from botbuilder.schema import ActivityTypes, ChannelAccount
-# from msgraph_core import GraphClient
-# from azure.identity.aio import ClientSecretCredential
 from botbuilder.schema.teams import TeamsChannelAccount, TeamInfo
-from botbuilder.core.teams import TeamsInfo
 from .abstract import AbstractBot
+from ..graph import GraphClient
+from ..ingestion import (
+    BatchedSink,
+    ChannelIngestor,
+    JSONLinesWriter,
+    MessageWriter,
+)
+from ..storage import get_storage
 from azure_teambots.conf import (
     MS_TENANT_ID,
     BOTDEV_CLIENT_ID,
     BOTDEV_CLIENT_SECRET,
+    AZUREBOT_INGEST_PATH,
+    AZUREBOT_INGEST_CURSORS_PATH,
 )
 
 
 class TeamsChannelBot(AbstractBot):
+    """Bot listening the Teams channels where it is mentioned.
+
+    Channels the bot sees are tracked by the ChannelIngestor, which
+    backfills and syncs their whole message history into `message_sink`
+    (a coroutine receiving batches of messages), into a JSON-lines file
+    under AZUREBOT_INGEST_PATH, or into the bot search index.
+    Ingestion cursors are kept in `cursor_storage` (by default a SQLite
+    database at AZUREBOT_INGEST_CURSORS_PATH), not in the bot state.
+    """
+
+    def __init__(
+        self,
+        *args,
+        message_sink: Optional[MessageWriter] = None,
+        cursor_storage: Optional[Storage] = None,
+        **kwargs
+    ):
+        super().__init__(*args, **kwargs)
+        self.ingestor: Optional[ChannelIngestor] = None
+        self._cursor_storage = cursor_storage
+        self._message_sink = message_sink
+        if self._message_sink is None and AZUREBOT_INGEST_PATH:
+            self._message_sink = JSONLinesWriter(
+                f"{AZUREBOT_INGEST_PATH}/{self.id}.jsonl"
+            )
+        elif self._message_sink is None and self.search_index is not None:
+            # channel history is searchable.
+            self._message_sink = self.search_index.add_messages
+
+    async def on_startup(self, app):
+        await super().on_startup(app)
+        if not MS_TENANT_ID or self._message_sink is None:
+            self.logger.info("TeamsChannelBot: channel ingestion is disabled.")
+            return
+        client = GraphClient(
+            BOTDEV_CLIENT_ID or self.app_id,
+            BOTDEV_CLIENT_SECRET or self.app_password,
+            MS_TENANT_ID
+        )
+        cursors = self._cursor_storage or get_storage(
+            'sqlite', path=AZUREBOT_INGEST_CURSORS_PATH, namespace=self.id
+        )
+        self.ingestor = ChannelIngestor(
+            client, cursors, BatchedSink(self._message_sink)
+        )
+        await self.ingestor.start()
+
+    async def on_cleanup(self, app):
+        if self.ingestor is not None:
+            await self.ingestor.stop()
+        await super().on_cleanup(app)
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        if self.ingestor is not None:
+            stats["ingestion"] = self.ingestor.stats()
+        return stats
+
     async def on_message_activity(self, turn_context: TurnContext):
         print(':: Channel Bot :: ')
         # Check if the message is from a Teams channel
@@ -29,46 +95,25 @@ class TeamsChannelBot(AbstractBot):
             print("Team ID: ", team_id)
             print("Channel ID: ", channel_id)
 
-            # # Authenticate with Microsoft Graph
-            # credential = ClientSecretCredential(
-            #     tenant_id=MS_TENANT_ID,
-            #     client_id=BOTDEV_CLIENT_ID,
-            #     client_secret=BOTDEV_CLIENT_SECRET,
-            # )
-
-            # graph_client = GraphClient(credential=credential)
-
-            # Get messages from the channel
-            # response = await graph_client.get(
-            #     f'/teams/{team_id}/channels/{channel_id}/messages'
-            # )
-
-            # messages = await response.json()
-
-            # # Process messages
-            # for message in messages.get('value', []):
-            #     self.logger.info(
-            #         f"Message from {message['from']['user']['displayName']}: {message['body']['content']}"
-            #     )
-
-            # print(':: Channel Bot Messages :: ')
-            # print(messages)
-
             # Gets the details for the given team id.
-            team_details = await TeamsInfo.get_team_details(turn_context)
+            team_details = await self.teams.get_team_details(turn_context)
             team_name = team_details.name
-            try:
-                sender: TeamsChannelAccount = await TeamsInfo.get_member(
-                    turn_context, turn_context.activity.from_property.id
+
+            # Channel history is synced in background by the ingestor
+            # (Graph addresses the team by its AAD group id).
+            if self.ingestor is not None:
+                await self.ingestor.track(
+                    team_id, channel_id, team_details.aad_group_id
                 )
+            sender: TeamsChannelAccount = await self.members.get_member(
+                turn_context, turn_context.activity.from_property.id
+            )
+            if sender is not None:
                 user_id = sender.id
                 display_name = sender.name
                 username = sender.user_principal_name
                 user_role = sender.user_role
-            except Exception as e:
-                self.logger.error(
-                    f"Error getting user profile: {e}"
-                )
+            else:
                 # Use available information from the activity
                 sender = turn_context.activity.from_property
 
@@ -1,8 +1,175 @@
 # Create a new file: azure_teambots/bots/wizard_bot.py
-from botbuilder.core import TurnContext, CardFactory
+from botbuilder.core import TurnContext
 from botbuilder.schema import ActivityTypes, Activity, Attachment
 from .abstract import AbstractBot
 from ..models import ConversationData
+from ..cards import card_registry
+
+
+## Wizard cards, compiled once (`${name}` binds the wizard data).
+WIZARD_STEP1_CARD = {
+    "type": "AdaptiveCard",
+    "version": "1.0",
+    "body": [
+        {
+            "type": "TextBlock",
+            "text": "Step 1: Basic Information",
+            "weight": "bolder",
+            "size": "medium"
+        },
+        {
+            "type": "TextBlock",
+            "text": "Please provide your name and department",
+            "wrap": True
+        },
+        {
+            "type": "Input.Text",
+            "id": "name",
+            "placeholder": "Your name",
+            "label": "Name"
+        },
+        {
+            "type": "Input.ChoiceSet",
+            "id": "department",
+            "label": "Department",
+            "choices": [
+                {"title": "IT", "value": "IT"},
+                {"title": "HR", "value": "HR"},
+                {"title": "Finance", "value": "Finance"},
+                {"title": "Marketing", "value": "Marketing"},
+                {"title": "Operations", "value": "Operations"}
+            ],
+            "style": "compact"
+        }
+    ],
+    "actions": [
+        {
+            "type": "Action.Submit",
+            "title": "Next",
+            "data": {
+                "step": 1
+            }
+        }
+    ]
+}
+
+WIZARD_STEP2_CARD = {
+    "type": "AdaptiveCard",
+    "version": "1.0",
+    "body": [
+        {
+            "type": "TextBlock",
+            "text": "Step 2: Request Details",
+            "weight": "bolder",
+            "size": "medium"
+        },
+        {
+            "type": "TextBlock",
+            "text": "Hi ${name}, please specify your request type",
+            "wrap": True
+        },
+        {
+            "type": "Input.ChoiceSet",
+            "id": "requestType",
+            "label": "Request Type",
+            "choices": [
+                {"title": "Access Request", "value": "Access"},
+                {"title": "Hardware Issue", "value": "Hardware"},
+                {"title": "Software Issue", "value": "Software"},
+                {"title": "Other", "value": "Other"}
+            ],
+            "style": "expanded"
+        },
+        {
+            "type": "Input.ChoiceSet",
+            "id": "priority",
+            "label": "Priority",
+            "choices": [
+                {"title": "Low", "value": "Low"},
+                {"title": "Medium", "value": "Medium"},
+                {"title": "High", "value": "High"},
+                {"title": "Critical", "value": "Critical"}
+            ],
+            "style": "compact"
+        }
+    ],
+    "actions": [
+        {
+            "type": "Action.Submit",
+            "title": "Next",
+            "data": {
+                "step": 2
+            }
+        }
+    ]
+}
+
+WIZARD_STEP3_CARD = {
+    "type": "AdaptiveCard",
+    "version": "1.0",
+    "body": [
+        {
+            "type": "TextBlock",
+            "text": "Step 3: Additional Information",
+            "weight": "bolder",
+            "size": "medium"
+        },
+        {
+            "type": "TextBlock",
+            "text": "Request Type: ${requestType} (Priority: ${priority})",
+            "wrap": True
+        },
+        {
+            "type": "Input.Text",
+            "id": "description",
+            "placeholder": "Please describe your request in detail",
+            "label": "Description",
+            "isMultiline": True
+        }
+    ],
+    "actions": [
+        {
+            "type": "Action.Submit",
+            "title": "Submit",
+            "data": {
+                "step": 3
+            }
+        }
+    ]
+}
+
+WIZARD_COMPLETE_CARD = {
+    "type": "AdaptiveCard",
+    "version": "1.0",
+    "body": [
+        {
+            "type": "TextBlock",
+            "text": "Request Submitted Successfully",
+            "weight": "bolder",
+            "size": "large"
+        },
+        {
+            "type": "TextBlock",
+            "text": "Thank you for completing the wizard.",
+            "wrap": True
+        }
+    ],
+    "actions": [
+        {
+            "type": "Action.Submit",
+            "title": "Start Another Request",
+            "data": {
+                "action": "restart_wizard"
+            }
+        }
+    ]
+}
+
+card_registry.register('wizard.step1', WIZARD_STEP1_CARD)
+card_registry.register('wizard.step2', WIZARD_STEP2_CARD)
+card_registry.register('wizard.step3', WIZARD_STEP3_CARD)
+card_registry.register('wizard.complete', WIZARD_COMPLETE_CARD)
+
 
 class WizardBot(AbstractBot):
     """A bot that guides users through a multi-step process using Adaptive Cards."""
@@ -95,7 +262,7 @@ class WizardBot(AbstractBot):
         if card:
             message = Activity(
                 type=ActivityTypes.message,
-                attachments=[CardFactory.adaptive_card(card)]
+                attachments=[card]
             )
             await turn_context.send_activity(message)
 
@@ -117,175 +284,25 @@ class WizardBot(AbstractBot):
         await turn_context.send_activity(summary)
 
         # Create completion card
-        completion_card = {
-            "type": "AdaptiveCard",
-            "version": "1.0",
-            "body": [
-                {
-                    "type": "TextBlock",
-                    "text": "Request Submitted Successfully",
-                    "weight": "bolder",
-                    "size": "large"
-                },
-                {
-                    "type": "TextBlock",
-                    "text": "Thank you for completing the wizard.",
-                    "wrap": True
-                }
-            ],
-            "actions": [
-                {
-                    "type": "Action.Submit",
-                    "title": "Start Another Request",
-                    "data": {
-                        "action": "restart_wizard"
-                    }
-                }
-            ]
-        }
+        completion_card = card_registry.attachment('wizard.complete')
 
         message = Activity(
             type=ActivityTypes.message,
-            attachments=[CardFactory.adaptive_card(completion_card)]
+            attachments=[completion_card]
         )
         await turn_context.send_activity(message)
 
         # Reset wizard state
         conversation_data.wizard_step = 0
 
-    def _create_step1_card(self):
+    def _create_step1_card(self) -> Attachment:
         """Create the first step card for collecting basic information."""
-        return {
-            "type": "AdaptiveCard",
-            "version": "1.0",
-            "body": [
-                {
-                    "type": "TextBlock",
-                    "text": "Step 1: Basic Information",
-                    "weight": "bolder",
-                    "size": "medium"
-                },
-                {
-                    "type": "TextBlock",
-                    "text": "Please provide your name and department",
-                    "wrap": True
-                },
-                {
-                    "type": "Input.Text",
-                    "id": "name",
-                    "placeholder": "Your name",
-                    "label": "Name"
-                },
-                {
-                    "type": "Input.ChoiceSet",
-                    "id": "department",
-                    "label": "Department",
-                    "choices": [
-                        {"title": "IT", "value": "IT"},
-                        {"title": "HR", "value": "HR"},
-                        {"title": "Finance", "value": "Finance"},
-                        {"title": "Marketing", "value": "Marketing"},
-                        {"title": "Operations", "value": "Operations"}
-                    ],
-                    "style": "compact"
-                }
-            ],
-            "actions": [
-                {
-                    "type": "Action.Submit",
-                    "title": "Next",
-                    "data": {
-                        "step": 1
-                    }
-                }
-            ]
-        }
+        return card_registry.attachment('wizard.step1')
 
-    def _create_step2_card(self, previous_data):
+    def _create_step2_card(self, previous_data) -> Attachment:
         """Create the second step card for collecting request details."""
-        return {
-            "type": "AdaptiveCard",
-            "version": "1.0",
-            "body": [
-                {
-                    "type": "TextBlock",
-                    "text": "Step 2: Request Details",
-                    "weight": "bolder",
-                    "size": "medium"
-                },
-                {
-                    "type": "TextBlock",
-                    "text": f"Hi {previous_data.get('name', '')}, please specify your request type",
-                    "wrap": True
-                },
-                {
-                    "type": "Input.ChoiceSet",
-                    "id": "requestType",
-                    "label": "Request Type",
-                    "choices": [
-                        {"title": "Access Request", "value": "Access"},
-                        {"title": "Hardware Issue", "value": "Hardware"},
-                        {"title": "Software Issue", "value": "Software"},
-                        {"title": "Other", "value": "Other"}
-                    ],
-                    "style": "expanded"
-                },
-                {
-                    "type": "Input.ChoiceSet",
-                    "id": "priority",
-                    "label": "Priority",
-                    "choices": [
-                        {"title": "Low", "value": "Low"},
-                        {"title": "Medium", "value": "Medium"},
-                        {"title": "High", "value": "High"},
-                        {"title": "Critical", "value": "Critical"}
-                    ],
-                    "style": "compact"
-                }
-            ],
-            "actions": [
-                {
-                    "type": "Action.Submit",
-                    "title": "Next",
-                    "data": {
-                        "step": 2
-                    }
-                }
-            ]
-        }
+        return card_registry.attachment('wizard.step2', previous_data)
 
-    def _create_step3_card(self, previous_data):
+    def _create_step3_card(self, previous_data) -> Attachment:
         """Create the third step card for collecting additional details."""
-        return {
-            "type": "AdaptiveCard",
-            "version": "1.0",
-            "body": [
-                {
-                    "type": "TextBlock",
-                    "text": "Step 3: Additional Information",
-                    "weight": "bolder",
-                    "size": "medium"
-                },
-                {
-                    "type": "TextBlock",
-                    "text": f"Request Type: {previous_data.get('requestType', '')} (Priority: {previous_data.get('priority', '')})",
-                    "wrap": True
-                },
-                {
-                    "type": "Input.Text",
-                    "id": "description",
-                    "placeholder": "Please describe your request in detail",
-                    "label": "Description",
-                    "isMultiline": True
-                }
-            ],
-            "actions": [
-                {
-                    "type": "Action.Submit",
-                    "title": "Submit",
-                    "data": {
-                        "step": 3
-                    }
-                }
-            ]
-        }
+        return card_registry.attachment('wizard.step3', previous_data)
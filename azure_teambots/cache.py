@@ -0,0 +1,130 @@
+"""
+In-process caching primitives.
+
+TTLCache: LRU-bounded dictionary with per-entry expiration.
+SingleFlight: deduplicates concurrent calls sharing the same key.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, Optional
+
+
+MISSING = object()
+
+
+class TTLCache:
+    """LRU cache with per-entry time-to-live.
+
+    Args:
+        maxsize: maximum number of entries (least recently used are evicted).
+        ttl: default time-to-live in seconds of an entry.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300):
+        self.maxsize: int = maxsize
+        self.ttl: float = ttl
+        # key -> (value, expires_at)
+        self._data: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._hits: int = 0
+        self._misses: int = 0
+        self._evictions: int = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not MISSING
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self._misses += 1
+            return default
+        value, expires = entry
+        if expires < time.monotonic():
+            del self._data[key]
+            self._misses += 1
+            return default
+        self._data.move_to_end(key)
+        self._hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (value, expires)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self._evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._data),
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+        }
+
+
+class _Abandoned(Exception):
+    """The caller running a shared call was cancelled."""
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time.
+
+    Concurrent callers asking for the same key await the result
+    (or the exception) of the call already in flight. If the caller
+    running it is cancelled, one of the waiters runs the call again.
+    """
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Future] = {}
+        self._shared: int = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]) -> Any:
+        future = self._calls.get(key)
+        if future is not None:
+            self._shared += 1
+        while future is not None:
+            try:
+                return await asyncio.shield(future)
+            except _Abandoned:
+                future = self._calls.get(key)
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # the waiters were not cancelled: one of them takes over.
+            future.set_exception(_Abandoned())
+            future.exception()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # retrieve it, so unshared failures are not reported as never retrieved.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        return {
+            "inflight": len(self._calls),
+            "shared": self._shared,
+        }
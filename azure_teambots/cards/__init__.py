@@ -0,0 +1,15 @@
+"""
+Adaptive Card templates.
+"""
+from .template import CardTemplate
+from .registry import CardRegistry, card_registry
+from .budget import CardBudget, card_budget, minify
+
+__all__ = (
+    'CardBudget',
+    'card_budget',
+    'minify',
+    'CardTemplate',
+    'CardRegistry',
+    'card_registry',
+)
@@ -0,0 +1,256 @@
+"""
+Adaptive Card payload budget.
+
+Cards are minified (compact JSON, without the properties set to their
+schema default) and measured before being sent: Teams rejects messages
+over ~28 KB. A card over budget can be split at its long TextBlocks into
+several cards, sent as consecutive activities.
+"""
+import json
+from typing import Any, Optional
+from ..conf import AZUREBOT_CARD_MAX_BYTES, AZUREBOT_CARD_MINIFY
+from ..exceptions import CardTooLarge
+
+
+## data of the actions: sent back as-is by the client.
+_USER_DATA = ('data',)
+
+## properties every element has, and their default.
+_COMMON_DEFAULTS: dict[str, Any] = {
+    "spacing": "default",
+    "separator": False,
+    "isVisible": True,
+    "height": "auto",
+}
+
+## schema defaults by element type (not the properties inherited from
+## the parent, ex: horizontalAlignment, a container style).
+DEFAULTS: dict[str, dict[str, Any]] = {
+    "TextBlock": {
+        "wrap": False,
+        "size": "default",
+        "weight": "default",
+        "color": "default",
+        "isSubtle": False,
+        "maxLines": 0,
+        "fontType": "default",
+    },
+    "RichTextBlock": {},
+    "Image": {"size": "auto", "style": "default"},
+    "Container": {"bleed": False},
+    "ColumnSet": {"bleed": False},
+    "Column": {"bleed": False},
+    "FactSet": {},
+    "ActionSet": {},
+    "Input.Text": {"isMultiline": False, "style": "text", "isRequired": False},
+    "Input.ChoiceSet": {"isMultiSelect": False, "style": "compact", "isRequired": False},
+    "Input.Number": {"isRequired": False},
+    "Input.Date": {"isRequired": False},
+    "Input.Time": {"isRequired": False},
+    "Input.Toggle": {"valueOn": "true", "valueOff": "false", "isRequired": False},
+    "Action.Submit": {"style": "default", "isEnabled": True, "mode": "primary"},
+    "Action.OpenUrl": {"style": "default", "isEnabled": True, "mode": "primary"},
+    "Action.ShowCard": {"style": "default", "isEnabled": True, "mode": "primary"},
+    "Action.Execute": {"style": "default", "isEnabled": True, "mode": "primary"},
+}
+
+
+def _is_default(defaults: dict, key: str, value: Any) -> bool:
+    if key not in defaults:
+        return False
+    default = defaults[key]
+    if isinstance(default, str) and isinstance(value, str):
+        return value.lower() == default
+    return type(value) is type(default) and value == default
+
+
+def minify(node: Any) -> Any:
+    """Copy of a card without null values and default-valued properties.
+
+    The `data` of the actions is user data, left untouched.
+    """
+    if isinstance(node, list):
+        return [minify(item) for item in node]
+    if not isinstance(node, dict):
+        return node
+    element = node.get("type")
+    defaults = DEFAULTS.get(element) if isinstance(element, str) else None
+    result = {}
+    for key, value in node.items():
+        if key in _USER_DATA and isinstance(element, str) and element.startswith('Action.'):
+            result[key] = value
+            continue
+        if value is None:
+            continue
+        if defaults is not None and (
+            _is_default(defaults, key, value) or _is_default(_COMMON_DEFAULTS, key, value)
+        ):
+            continue
+        result[key] = minify(value)
+    return result
+
+
+def dumps(card: Any) -> str:
+    return json.dumps(card, separators=(',', ':'), ensure_ascii=False)
+
+
+def measure(card: Any) -> int:
+    """Size in bytes of the serialized card."""
+    return len(dumps(card).encode('utf-8'))
+
+
+def _fits(text: str, limit: int) -> bool:
+    return len(text.encode('utf-8')) <= limit
+
+
+def split_text(text: str, limit: int) -> list[str]:
+    """Chunks of at most `limit` bytes, cut at lines, then words."""
+    chunks: list[str] = []
+    current = ''
+    for line in text.split('\n'):
+        candidate = f"{current}\n{line}" if current else line
+        if _fits(candidate, limit):
+            current = candidate
+            continue
+        if current:
+            chunks.append(current)
+        current = ''
+        # line too long: by words, then by characters.
+        for word in line.split(' '):
+            candidate = f"{current} {word}" if current else word
+            if _fits(candidate, limit):
+                current = candidate
+                continue
+            if current:
+                chunks.append(current)
+            while not _fits(word, limit):
+                cut = limit
+                while not _fits(word[:cut], limit):
+                    cut -= 1
+                chunks.append(word[:cut])
+                word = word[cut:]
+            current = word
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class CardBudget:
+    """Minifies, measures and splits the cards sent by the bots.
+
+    Sizes are recorded by card name (`stats()`).
+
+    Args:
+        max_bytes: size budget of a serialized card.
+        strip_defaults: minify the cards before measuring.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = AZUREBOT_CARD_MAX_BYTES,
+        strip_defaults: bool = AZUREBOT_CARD_MINIFY
+    ):
+        self.max_bytes: int = max_bytes
+        self.strip_defaults: bool = strip_defaults
+        self._cards: dict[str, dict[str, int]] = {}
+        self._rejected: int = 0
+        self._splits: int = 0
+
+    def _record(self, name: str, original: int, size: int, parts: int = 1) -> None:
+        entry = self._cards.setdefault(
+            name, {"count": 0, "bytes": 0, "max_bytes": 0, "saved": 0, "parts": 0}
+        )
+        entry["count"] += 1
+        entry["bytes"] += size
+        entry["max_bytes"] = max(entry["max_bytes"], size)
+        entry["saved"] += original - size
+        entry["parts"] += parts
+
+    def _prepare(self, card: dict) -> tuple[dict, int, int]:
+        original = measure(card)
+        if self.strip_defaults:
+            card = minify(card)
+            return card, original, measure(card)
+        return card, original, original
+
+    def _too_large(self, name: str, size: int) -> CardTooLarge:
+        self._rejected += 1
+        return CardTooLarge(
+            f"Card {name} is {size} bytes, over the {self.max_bytes} bytes budget",
+            size=size,
+            limit=self.max_bytes
+        )
+
+    def prepare(self, card: dict, name: Optional[str] = None) -> dict:
+        """The card ready to send (raises CardTooLarge if over budget)."""
+        name = name or 'card'
+        card, original, size = self._prepare(card)
+        if size > self.max_bytes:
+            raise self._too_large(name, size)
+        self._record(name, original, size)
+        return card
+
+    def split(self, card: dict, name: Optional[str] = None) -> list[dict]:
+        """The card as one or more cards within budget.
+
+        Body elements keep their order: long TextBlocks are cut into
+        several TextBlocks with the same style, and the elements are packed
+        into consecutive cards. Actions go with the last card. Raises
+        CardTooLarge when an element cannot be split to fit.
+        """
+        name = name or 'card'
+        card, original, size = self._prepare(card)
+        if size <= self.max_bytes:
+            self._record(name, original, size)
+            return [card]
+        body = card.get("body") or []
+        envelope = {k: v for k, v in card.items() if k not in ("body", "actions")}
+        actions = {"actions": card["actions"]} if card.get("actions") else {}
+        overhead = measure({**envelope, **actions, "body": []})
+        room = self.max_bytes - overhead
+        pieces: list[dict] = []
+        for element in body:
+            element_size = measure(element) + 1
+            if element_size <= room:
+                pieces.append(element)
+            elif element.get("type") == "TextBlock" and element.get("text"):
+                text = element["text"]
+                # escaping makes the serialized text larger than the text.
+                limit = room - measure({**element, "text": ""}) - 1
+                limit -= measure(text) - len(text.encode('utf-8')) + 2
+                if limit <= 0:
+                    raise self._too_large(name, size)
+                pieces.extend(
+                    {**element, "text": chunk} for chunk in split_text(text, limit)
+                )
+            else:
+                raise self._too_large(name, size)
+        cards: list[dict] = []
+        current: list[dict] = []
+        used = 0
+        for piece in pieces:
+            piece_size = measure(piece) + 1
+            if current and used + piece_size > room:
+                cards.append({**envelope, "body": current})
+                current, used = [], 0
+            current.append(piece)
+            used += piece_size
+        cards.append({**envelope, "body": current, **actions})
+        sizes = [measure(part) for part in cards]
+        if max(sizes) > self.max_bytes:
+            raise self._too_large(name, max(sizes))
+        self._splits += 1
+        self._record(name, original, sum(sizes), parts=len(cards))
+        return cards
+
+    def stats(self) -> dict:
+        return {
+            "max_bytes": self.max_bytes,
+            "rejected": self._rejected,
+            "splits": self._splits,
+            "cards": {name: dict(entry) for name, entry in self._cards.items()},
+        }
+
+
+## shared by all bots.
+card_budget = CardBudget()
@@ -0,0 +1,67 @@
+"""
+Registry of the Adaptive Card templates.
+"""
+import json
+from pathlib import Path
+from typing import Any, Union
+from botbuilder.schema import Attachment
+from ..conf import AZUREBOT_CARD_MINIFY
+from .budget import minify
+from .template import CardTemplate
+
+
+class CardRegistry:
+    """Named card templates, minified and compiled when registered."""
+
+    def __init__(self, strip_defaults: bool = AZUREBOT_CARD_MINIFY):
+        self.strip_defaults: bool = strip_defaults
+        self._templates: dict[str, CardTemplate] = {}
+        self._renders: int = 0
+        self._static: int = 0
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._templates
+
+    def register(self, name: str, card: dict) -> CardTemplate:
+        if self.strip_defaults:
+            card = minify(card)
+        template = CardTemplate(name, card)
+        self._templates[name] = template
+        return template
+
+    def load(self, directory: Union[str, Path]) -> None:
+        """Registers every JSON card of a directory (named by file)."""
+        for path in sorted(Path(directory).glob('*.json')):
+            self.register(path.stem, json.loads(path.read_text()))
+
+    def get(self, name: str) -> CardTemplate:
+        try:
+            return self._templates[name]
+        except KeyError as exc:
+            raise ValueError(f"Unknown card template: {name}") from exc
+
+    def render(self, name: str, data: Any = None) -> dict:
+        template = self.get(name)
+        self._count(template)
+        return template.render(data)
+
+    def attachment(self, name: str, data: Any = None) -> Attachment:
+        template = self.get(name)
+        self._count(template)
+        return template.attachment(data)
+
+    def _count(self, template: CardTemplate) -> None:
+        self._renders += 1
+        if template.static:
+            self._static += 1
+
+    def stats(self) -> dict:
+        return {
+            "templates": len(self._templates),
+            "renders": self._renders,
+            "static": self._static,
+        }
+
+
+## shared by all bots.
+card_registry = CardRegistry()
@@ -0,0 +1,141 @@
+"""
+Compiled Adaptive Card Templates.
+
+A template is an Adaptive Card (dict) with `${path}` data bindings. It is
+parsed once: bindings are compiled to the list of paths where a value has
+to be spliced, and the card is pre-serialized around them.
+"""
+import json
+import re
+from collections.abc import Callable
+from typing import Any, Optional
+from botbuilder.core import CardFactory
+from botbuilder.schema import Attachment
+
+
+_BINDING = re.compile(r'\$\{([^}]+)\}')
+_SLOT = '\x00slot{}\x00'
+_SLOT_JSON = re.compile(r'"\\u0000slot(\d+)\\u0000"')
+
+
+def _getter(expression: str) -> Callable[[Any], Any]:
+    keys = expression.strip().split('.')
+
+    def get(data: Any) -> Any:
+        for key in keys:
+            if data is None:
+                return None
+            data = data.get(key) if isinstance(data, dict) else getattr(data, key, None)
+        return data
+
+    return get
+
+
+def _compile_value(value: str) -> Optional[Callable[[Any], Any]]:
+    """Function rendering a string with bindings (None if it has none)."""
+    parts = _BINDING.split(value)
+    if len(parts) == 1:
+        return None
+    if len(parts) == 3 and not parts[0] and not parts[2]:
+        # "${name}": the value as-is (it can be a list, a number...).
+        get = _getter(parts[1])
+
+        def whole(data: Any) -> Any:
+            result = get(data)
+            return '' if result is None else result
+
+        return whole
+    pieces = [
+        _getter(part) if idx % 2 else part
+        for idx, part in enumerate(parts)
+    ]
+
+    def interpolate(data: Any) -> str:
+        return ''.join(
+            piece if isinstance(piece, str) else (
+                '' if (result := piece(data)) is None else str(result)
+            )
+            for piece in pieces
+        )
+
+    return interpolate
+
+
+class CardTemplate:
+    """Adaptive Card template.
+
+    Rendering copies only the containers on the path of a binding: the rest
+    of the card is shared between renders and must not be mutated. Cards
+    without bindings are rendered once, as a cached Attachment.
+
+    Args:
+        name: template name.
+        card: Adaptive Card with `${path}` bindings (`path` is a dotted path
+          into the data: `${person.name}`).
+    """
+
+    def __init__(self, name: str, card: dict):
+        self.name = name
+        self.card = card
+        # (path, render function)
+        self.slots: list[tuple[tuple, Callable[[Any], Any]]] = []
+        self._compile(card, ())
+        self.static: bool = not self.slots
+        self._chunks, self._order = self._serialize()
+        self._attachment: Optional[Attachment] = (
+            CardFactory.adaptive_card(card) if self.static else None
+        )
+
+    def _compile(self, node: Any, path: tuple) -> None:
+        items = node.items() if isinstance(node, dict) else enumerate(node)
+        for key, value in items:
+            if isinstance(value, (dict, list)):
+                self._compile(value, (*path, key))
+            elif isinstance(value, str):
+                render = _compile_value(value)
+                if render is not None:
+                    self.slots.append(((*path, key), render))
+
+    def _serialize(self) -> tuple[list[str], list[int]]:
+        """Compact JSON of the card, split around the bindings."""
+        skeleton = self.render({}, values=[_SLOT.format(i) for i in range(len(self.slots))])
+        text = json.dumps(skeleton, separators=(',', ':'), ensure_ascii=False)
+        parts = _SLOT_JSON.split(text)
+        return parts[0::2], [int(idx) for idx in parts[1::2]]
+
+    def render(self, data: Any = None, values: Optional[list] = None) -> dict:
+        """The card with the values of `data` spliced in."""
+        if self.static:
+            return self.card
+        if values is None:
+            values = [render(data) for _, render in self.slots]
+        result = dict(self.card)
+        copied = {id(result)}
+        for (path, _), value in zip(self.slots, values):
+            node = result
+            for key in path[:-1]:
+                child = node[key]
+                if id(child) not in copied:
+                    child = dict(child) if isinstance(child, dict) else list(child)
+                    node[key] = child
+                    copied.add(id(child))
+                node = child
+            node[path[-1]] = value
+        return result
+
+    def render_json(self, data: Any = None) -> str:
+        """Compact JSON of the rendered card, from the pre-serialized skeleton."""
+        if self.static:
+            return self._chunks[0]
+        values = [render(data) for _, render in self.slots]
+        out = [self._chunks[0]]
+        for idx, chunk in zip(self._order, self._chunks[1:]):
+            out.append(json.dumps(values[idx], ensure_ascii=False, separators=(',', ':')))
+            out.append(chunk)
+        return ''.join(out)
+
+    def attachment(self, data: Any = None) -> Attachment:
+        """Adaptive Card attachment (cached for static cards)."""
+        if self._attachment is not None:
+            return self._attachment
+        return CardFactory.adaptive_card(self.render(data))
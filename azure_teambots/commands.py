@@ -0,0 +1,227 @@
+"""
+Bot Commands.
+
+Commands are declared on the bot class with the `@command` decorator:
+
+    class MyBot(AbstractBot):
+        @command(aliases=("?",))
+        async def help(self, turn_context: TurnContext):
+            ...
+
+        @command()
+        async def remind(self, turn_context: TurnContext, minutes: int, text: str):
+            ...
+
+The commands of a class are compiled into a lookup table when the class is
+created: names and aliases map to their command, and so do unambiguous
+prefixes (of at least MIN_PREFIX characters) of the commands declared with
+`prefix=True`: ordinary words ("he said...") must not run a command.
+Arguments are parsed from the text after the command and converted to the
+annotated types; the last `str` argument receives the rest of the text, as
+written. A command without arguments only matches when it is the whole
+message ("help me" is not the `help` command).
+"""
+import inspect
+import re
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any, Optional
+from .exceptions import BotException
+
+
+_TOKENS = re.compile(r'"([^"]*)"|\'([^\']*)\'|(\S+)')
+_TRUE = frozenset(('1', 'true', 'yes', 'y', 'on'))
+_FALSE = frozenset(('0', 'false', 'no', 'n', 'off'))
+
+## shortest prefix calling a command.
+MIN_PREFIX: int = 3
+
+
+class CommandError(BotException):
+    """
+    Raised when the arguments of a command are invalid.
+    """
+    pass
+
+
+def _to_bool(value: str) -> bool:
+    value = value.lower()
+    if value in _TRUE:
+        return True
+    if value in _FALSE:
+        return False
+    raise ValueError(value)
+
+
+_CONVERTERS: dict[Any, Callable[[str], Any]] = {
+    str: str,
+    int: int,
+    float: float,
+    bool: _to_bool,
+}
+
+
+@dataclass
+class Argument:
+    name: str
+    type: Any = str
+    default: Any = inspect.Parameter.empty
+
+    @property
+    def required(self) -> bool:
+        return self.default is inspect.Parameter.empty
+
+    def convert(self, value: str) -> Any:
+        converter = _CONVERTERS.get(self.type, self.type)
+        try:
+            return converter(value)
+        except (TypeError, ValueError) as exc:
+            name = getattr(self.type, '__name__', str(self.type))
+            raise CommandError(f"Invalid value for {self.name} ({name}): {value}") from exc
+
+
+@dataclass
+class Command:
+    """A bot command (the handler is a method of the bot)."""
+    name: str
+    handler: Callable[..., Awaitable]
+    aliases: tuple[str, ...] = ()
+    help: str = ''
+    prefix: bool = False
+    arguments: list[Argument] = field(default_factory=list)
+
+    @property
+    def usage(self) -> str:
+        args = ' '.join(
+            f"<{arg.name}>" if arg.required else f"[{arg.name}]"
+            for arg in self.arguments
+        )
+        return f"{self.name} {args}".strip()
+
+    def accepts(self, text: str) -> bool:
+        """The text after the command can be its arguments."""
+        return bool(self.arguments) or not (text or '').strip()
+
+    def parse(self, text: str) -> dict[str, Any]:
+        """Keyword arguments of the handler, from the text after the command."""
+        tokens = list(_TOKENS.finditer(text or ''))
+        kwargs = {}
+        last = len(self.arguments) - 1
+        for idx, arg in enumerate(self.arguments):
+            if idx >= len(tokens):
+                if arg.required:
+                    raise CommandError(f"Usage: {self.usage}")
+                continue
+            token = tokens[idx]
+            if idx == last and arg.type is str:
+                # the rest of the text, as written.
+                kwargs[arg.name] = text[token.start():].strip()
+            else:
+                value = next(group for group in token.groups() if group is not None)
+                kwargs[arg.name] = arg.convert(value)
+        if len(tokens) > len(self.arguments) and (
+            not self.arguments or self.arguments[-1].type is not str
+        ):
+            raise CommandError(f"Usage: {self.usage}")
+        return kwargs
+
+
+def command(
+    name: Optional[str] = None,
+    *,
+    aliases: tuple[str, ...] = (),
+    help: Optional[str] = None,  # pylint: disable=W0622
+    prefix: bool = False
+):
+    """Declares a bot method as a command.
+
+    Args:
+        name: command name (default: the method name).
+        aliases: other names of the command.
+        help: help line (default: first line of the docstring).
+        prefix: the command can be called by an unambiguous prefix
+          (of MIN_PREFIX characters at least).
+    """
+    def decorator(func: Callable[..., Awaitable]) -> Callable[..., Awaitable]:
+        signature = inspect.signature(func, eval_str=True)
+        # (self, turn_context, *arguments)
+        arguments = [
+            Argument(
+                param.name,
+                str if param.annotation is inspect.Parameter.empty else param.annotation,
+                param.default
+            )
+            for param in list(signature.parameters.values())[2:]
+            if param.kind in (param.POSITIONAL_OR_KEYWORD, param.KEYWORD_ONLY)
+        ]
+        doc = (inspect.getdoc(func) or '').strip().splitlines()
+        func.__command__ = Command(
+            name=(name or func.__name__).lower(),
+            handler=func,
+            aliases=tuple(alias.lower() for alias in aliases),
+            help=help if help is not None else (doc[0] if doc else ''),
+            prefix=prefix,
+            arguments=arguments
+        )
+        return func
+    return decorator
+
+
+class CommandRouter:
+    """Lookup table of the commands of a bot class.
+
+    Names and aliases match exactly; a prefix of a command name (declared
+    with `prefix=True`) matches when it has MIN_PREFIX characters at least
+    and no other command starts with it.
+    """
+
+    def __init__(self, commands: list[Command]):
+        self.commands: list[Command] = commands
+        self._table: dict[str, Command] = {}
+        # every prefix of the names, with the commands sharing it.
+        prefixes: dict[str, list[Command]] = {}
+        for cmd in commands:
+            if cmd.prefix:
+                for end in range(MIN_PREFIX, len(cmd.name)):
+                    prefixes.setdefault(cmd.name[:end], []).append(cmd)
+        for key, matches in prefixes.items():
+            # ambiguous prefixes match nothing.
+            if len(matches) == 1:
+                self._table[key] = matches[0]
+        # exact names and aliases win over prefixes.
+        for cmd in commands:
+            for key in (cmd.name, *cmd.aliases):
+                self._table[key] = cmd
+
+    @classmethod
+    def from_class(cls, klass: type) -> 'CommandRouter':
+        """Commands declared on a class and its bases (overrides win)."""
+        commands: dict[str, Command] = {}
+        seen: set[str] = set()
+        for base in klass.__mro__:
+            for attr, value in vars(base).items():
+                if attr in seen:
+                    continue
+                seen.add(attr)
+                cmd = getattr(value, '__command__', None)
+                if isinstance(cmd, Command):
+                    commands.setdefault(cmd.name, cmd)
+        return cls(list(commands.values()))
+
+    def __bool__(self) -> bool:
+        return bool(self.commands)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._table
+
+    def match(self, name: str) -> Optional[Command]:
+        return self._table.get(name.lower()) if name else None
+
+    def names(self) -> list[str]:
+        return [cmd.name for cmd in self.commands]
+
+    def help(self) -> str:
+        return "\n".join(
+            f"- {cmd.usage}: {cmd.help}" if cmd.help else f"- {cmd.usage}"
+            for cmd in self.commands
+        )
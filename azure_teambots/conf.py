@@ -14,3 +14,159 @@ MS_CLIENT_SECRET = config.get('MS_CLIENT_SECRET')
 
 BOTDEV_CLIENT_ID = config.get('BOTDEV_CLIENT_ID')
 BOTDEV_CLIENT_SECRET = config.get('BOTDEV_CLIENT_SECRET')
+
+## Turn Dispatcher (ack-fast mode)
+AZUREBOT_ASYNC_TURNS = config.getboolean('AZUREBOT_ASYNC_TURNS', fallback=False)
+AZUREBOT_TURN_WORKERS = config.getint('AZUREBOT_TURN_WORKERS', fallback=4)
+AZUREBOT_TURN_QUEUE_SIZE = config.getint('AZUREBOT_TURN_QUEUE_SIZE', fallback=1000)
+AZUREBOT_TURN_CONVERSATION_QUEUE = config.getint(
+    'AZUREBOT_TURN_CONVERSATION_QUEUE', fallback=50
+)
+
+## Bot State Storage
+AZUREBOT_STORAGE = config.get('AZUREBOT_STORAGE', fallback='memory')
+AZUREBOT_REDIS_URL = config.get(
+    'AZUREBOT_REDIS_URL', fallback='redis://localhost:6379/0'
+)
+AZUREBOT_SQLITE_PATH = config.get(
+    'AZUREBOT_SQLITE_PATH', fallback=BASE_DIR.joinpath('azurebot_state.db')
+)
+AZUREBOT_STATE_WRITE_DELAY = float(
+    config.get('AZUREBOT_STATE_WRITE_DELAY', fallback=0)
+)
+
+## In-Memory State limits (idle TTL in seconds, 0 disables a limit)
+AZUREBOT_MEMORY_TTL = config.getint('AZUREBOT_MEMORY_TTL', fallback=86400)
+AZUREBOT_MEMORY_MAX_ENTRIES = config.getint(
+    'AZUREBOT_MEMORY_MAX_ENTRIES', fallback=10000
+)
+AZUREBOT_MEMORY_MAX_BYTES = config.getint('AZUREBOT_MEMORY_MAX_BYTES', fallback=0)
+
+## Teams Member profiles cache (seconds)
+AZUREBOT_MEMBER_CACHE_SIZE = config.getint('AZUREBOT_MEMBER_CACHE_SIZE', fallback=50000)
+AZUREBOT_MEMBER_TTL = config.getint('AZUREBOT_MEMBER_TTL', fallback=3600)
+AZUREBOT_MEMBER_NEGATIVE_TTL = config.getint(
+    'AZUREBOT_MEMBER_NEGATIVE_TTL', fallback=60
+)
+
+## Teams details and channels cache (seconds)
+AZUREBOT_TEAM_CACHE_SIZE = config.getint('AZUREBOT_TEAM_CACHE_SIZE', fallback=5000)
+AZUREBOT_TEAM_TTL = config.getint('AZUREBOT_TEAM_TTL', fallback=86400)
+
+## Outbound HTTP (session pool)
+AZUREBOT_HTTP_LIMIT = config.getint('AZUREBOT_HTTP_LIMIT', fallback=100)
+AZUREBOT_HTTP_LIMIT_PER_HOST = config.getint('AZUREBOT_HTTP_LIMIT_PER_HOST', fallback=20)
+AZUREBOT_HTTP_DNS_TTL = config.getint('AZUREBOT_HTTP_DNS_TTL', fallback=300)
+AZUREBOT_HTTP_KEEPALIVE = config.getint('AZUREBOT_HTTP_KEEPALIVE', fallback=30)
+AZUREBOT_HTTP_TIMEOUT = config.getint('AZUREBOT_HTTP_TIMEOUT', fallback=30)
+## file downloads (aiohttp default: 5 minutes)
+AZUREBOT_DOWNLOAD_TIMEOUT = config.getint('AZUREBOT_DOWNLOAD_TIMEOUT', fallback=300)
+
+## Microsoft Graph $batch
+AZUREBOT_GRAPH_BATCH_SIZE = config.getint('AZUREBOT_GRAPH_BATCH_SIZE', fallback=20)
+AZUREBOT_GRAPH_BATCH_WINDOW = float(
+    config.get('AZUREBOT_GRAPH_BATCH_WINDOW', fallback=0.01)
+)
+
+## Microsoft Graph GET coalescing and result cache (0 TTL: coalescing only)
+AZUREBOT_GRAPH_CACHE_SIZE = config.getint('AZUREBOT_GRAPH_CACHE_SIZE', fallback=1000)
+AZUREBOT_GRAPH_CACHE_TTL = float(config.get('AZUREBOT_GRAPH_CACHE_TTL', fallback=5))
+
+## Microsoft Graph throttling (per tenant)
+AZUREBOT_GRAPH_CONCURRENCY = config.getint('AZUREBOT_GRAPH_CONCURRENCY', fallback=8)
+AZUREBOT_GRAPH_RATE = float(config.get('AZUREBOT_GRAPH_RATE', fallback=20))
+AZUREBOT_GRAPH_BURST = config.getint('AZUREBOT_GRAPH_BURST', fallback=40)
+AZUREBOT_GRAPH_MAX_RETRIES = config.getint('AZUREBOT_GRAPH_MAX_RETRIES', fallback=4)
+AZUREBOT_GRAPH_BACKOFF = float(config.get('AZUREBOT_GRAPH_BACKOFF', fallback=1))
+AZUREBOT_GRAPH_MAX_BACKOFF = float(
+    config.get('AZUREBOT_GRAPH_MAX_BACKOFF', fallback=60)
+)
+
+## User photo cache (no directory: memory only)
+AZUREBOT_PHOTO_CACHE_DIR = config.get('AZUREBOT_PHOTO_CACHE_DIR', fallback=None)
+AZUREBOT_PHOTO_DISK_BYTES = config.getint(
+    'AZUREBOT_PHOTO_DISK_BYTES', fallback=256 * 1024 * 1024
+)
+AZUREBOT_PHOTO_MEMORY_BYTES = config.getint(
+    'AZUREBOT_PHOTO_MEMORY_BYTES', fallback=32 * 1024 * 1024
+)
+AZUREBOT_PHOTO_MAX_ENTRIES = config.getint('AZUREBOT_PHOTO_MAX_ENTRIES', fallback=50000)
+AZUREBOT_PHOTO_TTL = config.getint('AZUREBOT_PHOTO_TTL', fallback=3600)
+AZUREBOT_PHOTO_NEGATIVE_TTL = config.getint('AZUREBOT_PHOTO_NEGATIVE_TTL', fallback=600)
+AZUREBOT_PHOTO_WORKERS = config.getint('AZUREBOT_PHOTO_WORKERS', fallback=2)
+
+## Local user directory (Graph delta sync, no path: memory only)
+AZUREBOT_DIRECTORY_PATH = config.get('AZUREBOT_DIRECTORY_PATH', fallback=None)
+AZUREBOT_DIRECTORY_SYNC_INTERVAL = config.getint(
+    'AZUREBOT_DIRECTORY_SYNC_INTERVAL', fallback=900
+)
+
+## Channel message ingestion (no path: disabled unless a sink is given)
+AZUREBOT_INGEST_PATH = config.get('AZUREBOT_INGEST_PATH', fallback=None)
+AZUREBOT_INGEST_BATCH_SIZE = config.getint('AZUREBOT_INGEST_BATCH_SIZE', fallback=500)
+AZUREBOT_INGEST_FLUSH_INTERVAL = float(
+    config.get('AZUREBOT_INGEST_FLUSH_INTERVAL', fallback=5)
+)
+AZUREBOT_INGEST_INTERVAL = config.getint('AZUREBOT_INGEST_INTERVAL', fallback=300)
+AZUREBOT_INGEST_CHECKPOINT = config.getint('AZUREBOT_INGEST_CHECKPOINT', fallback=10)
+# items kept by the sink while its writer fails (older ones are dropped).
+AZUREBOT_INGEST_MAX_BUFFER = config.getint('AZUREBOT_INGEST_MAX_BUFFER', fallback=20000)
+# ingestion cursors, kept apart from the bot state (SQLite database).
+AZUREBOT_INGEST_CURSORS_PATH = config.get(
+    'AZUREBOT_INGEST_CURSORS_PATH', fallback=BASE_DIR.joinpath('azurebot_ingestion.db')
+)
+
+## Full-text search (no path: in-memory index)
+AZUREBOT_SEARCH = config.getboolean('AZUREBOT_SEARCH', fallback=False)
+AZUREBOT_SEARCH_PATH = config.get('AZUREBOT_SEARCH_PATH', fallback=None)
+AZUREBOT_SEARCH_FLUSH_DOCS = config.getint('AZUREBOT_SEARCH_FLUSH_DOCS', fallback=1000)
+AZUREBOT_SEARCH_MAX_SEGMENTS = config.getint('AZUREBOT_SEARCH_MAX_SEGMENTS', fallback=8)
+
+## Adaptive Cards (Teams rejects messages over ~28 KB)
+AZUREBOT_CARD_MAX_BYTES = config.getint('AZUREBOT_CARD_MAX_BYTES', fallback=27000)
+AZUREBOT_CARD_MINIFY = config.getboolean('AZUREBOT_CARD_MINIFY', fallback=True)
+
+## Inbound activities: compiled deserializer (False: msrest models)
+AZUREBOT_FAST_ACTIVITY = config.getboolean('AZUREBOT_FAST_ACTIVITY', fallback=True)
+
+## Inbound token validation (validated tokens cache and signing keys refresh)
+AZUREBOT_JWT_CACHE_SIZE = config.getint('AZUREBOT_JWT_CACHE_SIZE', fallback=10000)
+AZUREBOT_JWT_CACHE_TTL = config.getint('AZUREBOT_JWT_CACHE_TTL', fallback=600)
+AZUREBOT_JWKS_REFRESH_INTERVAL = config.getint(
+    'AZUREBOT_JWKS_REFRESH_INTERVAL', fallback=6 * 3600
+)
+AZUREBOT_JWKS_MIN_REFRESH = config.getint('AZUREBOT_JWKS_MIN_REFRESH', fallback=300)
+
+## Outbound activities (Teams: ~7 msgs/sec per conversation, 50 per bot)
+AZUREBOT_SEND_RATE = float(config.get('AZUREBOT_SEND_RATE', fallback=1))
+AZUREBOT_SEND_BURST = config.getint('AZUREBOT_SEND_BURST', fallback=6)
+AZUREBOT_SEND_BOT_RATE = float(config.get('AZUREBOT_SEND_BOT_RATE', fallback=50))
+AZUREBOT_SEND_BOT_BURST = config.getint('AZUREBOT_SEND_BOT_BURST', fallback=50)
+AZUREBOT_SEND_MAX_PENDING = config.getint('AZUREBOT_SEND_MAX_PENDING', fallback=100)
+AZUREBOT_SEND_MAX_RETRIES = config.getint('AZUREBOT_SEND_MAX_RETRIES', fallback=4)
+AZUREBOT_SEND_BACKOFF = float(config.get('AZUREBOT_SEND_BACKOFF', fallback=1))
+AZUREBOT_SEND_MAX_BACKOFF = float(config.get('AZUREBOT_SEND_MAX_BACKOFF', fallback=30))
+
+## Proactive messages (conversation references and broadcast journal)
+# ":memory:" keeps them in memory: lost on a restart.
+AZUREBOT_REFERENCES_PATH = config.get(
+    'AZUREBOT_REFERENCES_PATH', fallback=BASE_DIR.joinpath('azurebot_references.db')
+)
+AZUREBOT_REFERENCES_TOUCH = config.getint('AZUREBOT_REFERENCES_TOUCH', fallback=3600)
+AZUREBOT_BROADCAST_CONCURRENCY = config.getint(
+    'AZUREBOT_BROADCAST_CONCURRENCY', fallback=16
+)
+AZUREBOT_BROADCAST_CHECKPOINT = config.getint('AZUREBOT_BROADCAST_CHECKPOINT', fallback=50)
+AZUREBOT_BROADCAST_RESUME = config.getboolean('AZUREBOT_BROADCAST_RESUME', fallback=True)
+# seconds a worker owns a running broadcast without renewing it.
+AZUREBOT_BROADCAST_LEASE = config.getint('AZUREBOT_BROADCAST_LEASE', fallback=300)
+# passes over the throttled targets of a broadcast.
+AZUREBOT_BROADCAST_RETRIES = config.getint('AZUREBOT_BROADCAST_RETRIES', fallback=5)
+
+## Bot Connector clients (shared by app id and service url)
+AZUREBOT_CONNECTOR_MAX_CLIENTS = config.getint('AZUREBOT_CONNECTOR_MAX_CLIENTS', fallback=1000)
+AZUREBOT_CONNECTOR_POOL_SIZE = config.getint('AZUREBOT_CONNECTOR_POOL_SIZE', fallback=20)
+AZUREBOT_CONNECTOR_TIMEOUT = config.getint('AZUREBOT_CONNECTOR_TIMEOUT', fallback=30)
+# seconds an evicted client stays open for the turns still using it.
+AZUREBOT_CONNECTOR_CLOSE_DELAY = config.getint('AZUREBOT_CONNECTOR_CLOSE_DELAY', fallback=300)
+AZUREBOT_CONNECTOR_WARMUP = config.getboolean('AZUREBOT_CONNECTOR_WARMUP', fallback=True)
@@ -0,0 +1,318 @@
+"""
+Bot Connector Clients.
+
+botbuilder creates new app credentials and a new ConnectorClient for
+every turn and proactive message: the access token is requested again
+(on the event loop) and every client opens its own connections, never
+closed. ConnectorPool shares them process-wide: credentials by app id and
+audience, clients by (app id, service url, audience), with keep-alive
+connections, a bounded number of clients and a warm-up of the service
+urls seen before.
+"""
+import asyncio
+import weakref
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Optional
+from botframework.connector.aio import ConnectorClient
+from botframework.connector.auth import (
+    AppCredentials,
+    AuthenticationConstants,
+    ClaimsIdentity,
+    ConnectorFactory,
+    ServiceClientCredentialsFactory,
+)
+from navconfig.logging import logging
+from requests.adapters import HTTPAdapter
+from .cache import SingleFlight
+from .conf import (
+    AZUREBOT_CONNECTOR_MAX_CLIENTS,
+    AZUREBOT_CONNECTOR_POOL_SIZE,
+    AZUREBOT_CONNECTOR_TIMEOUT,
+    AZUREBOT_CONNECTOR_CLOSE_DELAY,
+)
+
+
+def claims_app_id(claims_identity: Optional[ClaimsIdentity]) -> Optional[str]:
+    """App id the connector clients of a turn are created for."""
+    if claims_identity is None:
+        return None
+    return claims_identity.get_claim_value(
+        AuthenticationConstants.AUDIENCE_CLAIM
+    ) or claims_identity.get_claim_value(AuthenticationConstants.APP_ID_CLAIM)
+
+
+class PooledCredentialFactory(ServiceClientCredentialsFactory):
+    """Credentials factory sharing the credentials of the pool.
+
+    Args:
+        inner: factory creating the credentials.
+        pool: connector pool.
+        identity: what makes two factories equivalent (ex: app id and
+          a digest of the password).
+    """
+
+    def __init__(
+        self,
+        inner: ServiceClientCredentialsFactory,
+        pool: 'ConnectorPool',
+        identity: Hashable
+    ):
+        self.inner = inner
+        self.pool = pool
+        self.identity = identity
+
+    async def is_valid_app_id(self, app_id: str) -> bool:
+        return await self.inner.is_valid_app_id(app_id)
+
+    async def is_authentication_disabled(self) -> bool:
+        return await self.inner.is_authentication_disabled()
+
+    async def create_credentials(
+        self,
+        app_id: str,
+        oauth_scope: str,
+        login_endpoint: str,
+        validate_authority: bool
+    ) -> AppCredentials:
+        return await self.pool.credentials(
+            (self.identity, app_id, oauth_scope, login_endpoint, validate_authority),
+            lambda: self.inner.create_credentials(
+                app_id, oauth_scope, login_endpoint, validate_authority
+            )
+        )
+
+
+class PooledConnectorFactory(ConnectorFactory):
+    """Connector factory returning the clients of the pool."""
+
+    def __init__(self, inner: ConnectorFactory, pool: 'ConnectorPool', app_id: str):
+        self.inner = inner
+        self.pool = pool
+        self.app_id = app_id
+
+    async def create(self, service_url: str, audience: str = None) -> ConnectorClient:
+        return await self.pool.client(
+            (self.app_id, service_url, audience),
+            lambda: self.inner.create(service_url, audience)
+        )
+
+
+class ConnectorPool:
+    """Process-wide pool of Bot Connector clients.
+
+    Clients are kept per (app id, service url, audience). Over
+    `max_clients` the least recently used one is evicted: turns may still
+    hold it, so it is closed `close_delay` seconds later (and taken back
+    if its key is asked for again meanwhile). Their HTTP sessions keep
+    `pool_size` connections alive per host. The pool is shared by the
+    bots: every `open` is matched by a `close`, the clients are closed
+    with the last one.
+
+    Args:
+        max_clients: maximum number of clients.
+        pool_size: keep-alive connections per host (and HTTP session).
+        timeout: timeout (in seconds) of a request.
+        close_delay: seconds before an evicted client is closed.
+    """
+
+    def __init__(
+        self,
+        max_clients: int = AZUREBOT_CONNECTOR_MAX_CLIENTS,
+        pool_size: int = AZUREBOT_CONNECTOR_POOL_SIZE,
+        timeout: float = AZUREBOT_CONNECTOR_TIMEOUT,
+        close_delay: float = AZUREBOT_CONNECTOR_CLOSE_DELAY
+    ):
+        self.max_clients: int = max_clients
+        self.pool_size: int = pool_size
+        self.timeout: float = timeout
+        self.close_delay: float = close_delay
+        self._clients: OrderedDict[Hashable, ConnectorClient] = OrderedDict()
+        # evicted clients, closed once the delay is over.
+        self._retired: dict[Hashable, tuple[ConnectorClient, asyncio.TimerHandle]] = {}
+        self._credentials: dict[Hashable, AppCredentials] = {}
+        self._sessions: weakref.WeakSet = weakref.WeakSet()
+        self._flight = SingleFlight()
+        self._tasks: set[asyncio.Task] = set()
+        self._users: int = 0
+        self._created: int = 0
+        self._reused: int = 0
+        self._evicted: int = 0
+        self._closed: int = 0
+        self._warmed: int = 0
+        self.logger = logging.getLogger('AzureBot.Connectors')
+
+    def credentials_factory(
+        self,
+        inner: ServiceClientCredentialsFactory,
+        identity: Optional[Hashable] = None
+    ) -> PooledCredentialFactory:
+        return PooledCredentialFactory(
+            inner, self, identity if identity is not None else id(inner)
+        )
+
+    def connector_factory(
+        self,
+        inner: Optional[ConnectorFactory],
+        claims_identity: Optional[ClaimsIdentity]
+    ) -> Optional[ConnectorFactory]:
+        if inner is None or isinstance(inner, PooledConnectorFactory):
+            return inner
+        return PooledConnectorFactory(inner, self, claims_app_id(claims_identity))
+
+    async def credentials(
+        self,
+        key: Hashable,
+        create: Callable[[], Awaitable[AppCredentials]]
+    ) -> AppCredentials:
+        credentials = self._credentials.get(key)
+        if credentials is None:
+            credentials = await self._flight.do(('credentials', key), create)
+            self._credentials.setdefault(key, credentials)
+        return self._credentials[key]
+
+    def _configure_session(self, session, config, kwargs, **requests_kwargs) -> dict:
+        """msrest session callback: keep-alive pools of `pool_size`."""
+        if session not in self._sessions:
+            retries = session.adapters['https://'].max_retries
+            for prefix in ('https://', 'http://'):
+                session.mount(prefix, HTTPAdapter(
+                    pool_connections=self.pool_size,
+                    pool_maxsize=self.pool_size,
+                    max_retries=retries
+                ))
+            self._sessions.add(session)
+        return requests_kwargs
+
+    async def _create(self, create: Callable[[], Awaitable[ConnectorClient]]) -> ConnectorClient:
+        client = await create()
+        client.config.connection.timeout = self.timeout
+        client.config.session_configuration_callback = self._configure_session
+        self._created += 1
+        return client
+
+    async def client(
+        self,
+        key: Hashable,
+        create: Callable[[], Awaitable[ConnectorClient]]
+    ) -> ConnectorClient:
+        """The client of `key`, created with `create` if needed."""
+        client = self._clients.get(key)
+        if client is not None:
+            self._clients.move_to_end(key)
+            self._reused += 1
+            return client
+        retired = self._retired.pop(key, None)
+        if retired is not None:
+            # evicted but not closed yet: taken back.
+            client, timer = retired
+            timer.cancel()
+            self._reused += 1
+        else:
+            client = await self._flight.do(('client', key), lambda: self._create(create))
+        if key not in self._clients:
+            self._clients[key] = client
+            while len(self._clients) > self.max_clients:
+                self._evict(*self._clients.popitem(last=False))
+        return self._clients[key]
+
+    def _evict(self, key: Hashable, client: ConnectorClient) -> None:
+        self._evicted += 1
+        timer = asyncio.get_running_loop().call_later(
+            self.close_delay, self._expire, key, client
+        )
+        self._retired[key] = (client, timer)
+
+    def _expire(self, key: Hashable, client: ConnectorClient) -> None:
+        retired = self._retired.get(key)
+        if retired is not None and retired[0] is client:
+            del self._retired[key]
+            self._spawn(self._close_client(client))
+
+    async def _close_client(self, client: ConnectorClient) -> None:
+        try:
+            await client.__aexit__(None, None, None)
+            self._closed += 1
+        except Exception as exc:  # pylint: disable=W0718
+            self.logger.warning(f"Error closing connector client: {exc}")
+
+    def _spawn(self, coro: Awaitable) -> asyncio.Task:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _warm(self, factory: ConnectorFactory, service_url: str) -> None:
+        try:
+            client = await factory.create(service_url)
+            credentials = client.config.credentials
+            if isinstance(credentials, AppCredentials) and credentials.microsoft_app_id:
+                # the token request blocks: off the event loop.
+                await asyncio.get_running_loop().run_in_executor(
+                    None, credentials.get_access_token
+                )
+            # a first request opens the connection (its answer does not matter).
+            await client.conversations.get_conversations()
+        except Exception as exc:  # pylint: disable=W0718
+            self.logger.debug(f"Warm-up of {service_url}: {exc}")
+        self._warmed += 1
+
+    def warm_up(
+        self,
+        factory: ConnectorFactory,
+        service_urls: list[str],
+        concurrency: int = 4
+    ) -> asyncio.Task:
+        """Creates (in background) the clients of `service_urls`, with
+        their access token and a first connection."""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def warm(url: str) -> None:
+            async with semaphore:
+                await self._warm(factory, url)
+
+        async def run() -> None:
+            await asyncio.gather(*[warm(url) for url in service_urls])
+        return self._spawn(run())
+
+    async def open(self) -> None:
+        self._users += 1
+
+    async def close(self) -> None:
+        """Closes the clients when no other user is left."""
+        self._users = max(self._users - 1, 0)
+        if self._users:
+            return
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        clients = list(self._clients.values())
+        for client, timer in self._retired.values():
+            timer.cancel()
+            clients.append(client)
+        self._retired.clear()
+        self._clients.clear()
+        self._credentials.clear()
+        for client in clients:
+            await self._close_client(client)
+
+    def stats(self) -> dict:
+        return {
+            "clients": len(self._clients),
+            "credentials": len(self._credentials),
+            "created": self._created,
+            "reused": self._reused,
+            "evicted": self._evicted,
+            "retired": len(self._retired),
+            "closed": self._closed,
+            "warmed": self._warmed,
+        }
+
+
+## process-wide connector clients.
+connector_pool = ConnectorPool()
+
+
+def get_connector_pool() -> ConnectorPool:
+    return connector_pool
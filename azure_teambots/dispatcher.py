@@ -0,0 +1,161 @@
+"""
+Turn Dispatcher.
+
+Runs bot turns out of band of the HTTP request that delivered them:
+activities are queued per conversation and a pool of workers consumes them,
+keeping strict FIFO order inside a conversation while different
+conversations are processed in parallel.
+"""
+import asyncio
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import Any, Optional
+from navconfig.logging import logging
+from .exceptions import TurnQueueFull
+
+
+class TurnDispatcher:
+    """Per-conversation ordered work queue backed by a pool of workers.
+
+    Every conversation owns a FIFO of pending items. A conversation key is
+    placed on the ``ready`` queue only when it has work and no worker is
+    currently running one of its items, so two turns of the same
+    conversation never run concurrently.
+
+    Args:
+        handler: coroutine function called with every submitted item.
+        workers: number of concurrent workers.
+        max_pending: maximum number of queued items (all conversations).
+        max_per_conversation: maximum number of queued items per conversation.
+        name: name used for logging and worker task names.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Any], Awaitable],
+        workers: int = 4,
+        max_pending: int = 1000,
+        max_per_conversation: int = 50,
+        name: str = 'TurnDispatcher'
+    ):
+        if workers < 1:
+            raise ValueError(
+                "TurnDispatcher: at least one worker is required."
+            )
+        self._handler = handler
+        self._workers: int = workers
+        self.max_pending: int = max_pending
+        self.max_per_conversation: int = max_per_conversation
+        self.name: str = name
+        self._pending: dict[str, deque] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._tasks: list[asyncio.Task] = []
+        self._size: int = 0
+        self._idle: Optional[asyncio.Event] = None
+        self._processed: int = 0
+        self._failed: int = 0
+        self._rejected: int = 0
+        self.logger = logging.getLogger(f'AzureBot.{name}')
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def __len__(self) -> int:
+        return self._size
+
+    async def start(self) -> None:
+        """Start the worker pool (no-op if already started)."""
+        if self._tasks:
+            return
+        self._ready = asyncio.Queue()
+        self._idle = asyncio.Event()
+        if not self._size:
+            self._idle.set()
+        for key in self._pending:
+            # items submitted before start.
+            self._ready.put_nowait(key)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"{self.name}-{i}")
+            for i in range(self._workers)
+        ]
+        self.logger.debug(
+            f"{self.name}: started {self._workers} workers."
+        )
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Stop the workers, waiting up to `timeout` for pending turns."""
+        if not self._tasks:
+            return
+        if self._size:
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                self.logger.warning(
+                    f"{self.name}: stopping with {self._size} pending turns."
+                )
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, key: str, item: Any) -> None:
+        """Queue an item at the tail of the `key` conversation.
+
+        Raises:
+            TurnQueueFull: when a queue bound would be exceeded.
+        """
+        queue = self._pending.get(key)
+        if self._size >= self.max_pending or (
+            queue is not None and len(queue) >= self.max_per_conversation
+        ):
+            self._rejected += 1
+            raise TurnQueueFull(
+                f"{self.name}: queue is full ({self._size} pending turns)."
+            )
+        self._size += 1
+        if self._idle is not None:
+            self._idle.clear()
+        if queue is None:
+            self._pending[key] = deque([item])
+            if self._ready is not None:
+                self._ready.put_nowait(key)
+        else:
+            # the conversation is already scheduled or being processed.
+            queue.append(item)
+
+    async def _worker(self) -> None:
+        while True:
+            key = await self._ready.get()
+            queue = self._pending[key]
+            item = queue.popleft()
+            try:
+                await self._handler(item)
+                self._processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # pylint: disable=W0718
+                self._failed += 1
+                self.logger.error(
+                    f"{self.name}: error processing turn for {key}: {exc}",
+                    exc_info=True
+                )
+            finally:
+                self._size -= 1
+                if queue:
+                    # re-schedule at the back, giving other conversations a turn.
+                    self._ready.put_nowait(key)
+                else:
+                    del self._pending[key]
+                if not self._size:
+                    self._idle.set()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self._workers,
+            "pending": self._size,
+            "conversations": len(self._pending),
+            "processed": self._processed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+        }
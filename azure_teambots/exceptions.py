@@ -3,3 +3,41 @@ class BotException(Exception):
     Base exception class for bot-related errors.
     """
     pass
+
+
+class TurnQueueFull(BotException):
+    """
+    Raised when the turn dispatcher cannot accept more activities.
+    """
+    pass
+
+
+class CardTooLarge(BotException):
+    """
+    Raised when an Adaptive Card does not fit the message size budget.
+    """
+    def __init__(self, message: str, size: int = 0, limit: int = 0):
+        super().__init__(message)
+        self.size = size
+        self.limit = limit
+
+
+class SigningKeysUnavailable(BotException):
+    """
+    Raised when the signing keys of the Bot Connector cannot be fetched.
+    """
+    pass
+
+
+class OutboundQueueFull(BotException):
+    """
+    Raised when a conversation has too many activities waiting to be sent.
+    """
+    pass
+
+
+class BroadcastBusy(BotException):
+    """
+    Raised when a broadcast is being run by another worker.
+    """
+    pass
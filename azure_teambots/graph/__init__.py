@@ -0,0 +1,23 @@
+"""
+Microsoft Graph helpers.
+"""
+from .tokens import TokenProvider, get_token_provider
+from .response import GraphResponse
+from .batch import GraphBatcher
+from .pager import GraphPager
+from .photos import PhotoCache, photo_cache
+from .client import GraphClient
+from .directory import DirectoryIndex, directory_index
+
+__all__ = (
+    'DirectoryIndex',
+    'GraphBatcher',
+    'GraphClient',
+    'GraphPager',
+    'GraphResponse',
+    'PhotoCache',
+    'photo_cache',
+    'TokenProvider',
+    'directory_index',
+    'get_token_provider',
+)
@@ -0,0 +1,181 @@
+"""
+Microsoft Graph JSON Batching.
+
+Packs individual Graph calls into `$batch` requests (up to 20 sub-requests
+each) and hands every response back to the caller awaiting it.
+"""
+import asyncio
+import base64
+import json
+from typing import Any, Optional, TYPE_CHECKING
+from navconfig.logging import logging
+from ..conf import (
+    AZUREBOT_GRAPH_BATCH_SIZE,
+    AZUREBOT_GRAPH_BATCH_WINDOW,
+)
+from .response import GraphResponse
+if TYPE_CHECKING:
+    from .client import GraphClient
+
+
+## maximum number of sub-requests accepted by Graph in a single $batch.
+MAX_BATCH_SIZE = 20
+
+
+class GraphBatcher:
+    """Collects Graph calls and sends them as `$batch` requests.
+
+    A batch is sent as soon as `max_size` calls are pending, or `window`
+    seconds after the first call of the batch was submitted, whichever
+    happens first. Throttled sub-requests (429/503) are retried in a later
+    batch, following the client's scheduler policy.
+
+    Args:
+        client: GraphClient used to send the batches.
+        max_size: maximum number of sub-requests per batch (20 at most).
+        window: seconds to wait for more calls before sending a batch.
+    """
+
+    def __init__(
+        self,
+        client: "GraphClient",
+        max_size: int = AZUREBOT_GRAPH_BATCH_SIZE,
+        window: float = AZUREBOT_GRAPH_BATCH_WINDOW
+    ):
+        self.client = client
+        self.max_size: int = max(1, min(max_size, MAX_BATCH_SIZE))
+        self.window: float = window
+        # (sub-request, awaiting future, attempt)
+        self._pending: list[tuple[dict, asyncio.Future, int]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+        self._batches: int = 0
+        self._requests: int = 0
+        self._failures: int = 0
+        self.logger = logging.getLogger("AzureBot.GraphClient.Batch")
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def submit(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[dict] = None,
+        body: Any = None
+    ) -> Optional[GraphResponse]:
+        """Queues a sub-request and waits for its response.
+
+        `url` is relative to the Graph version (ex: "/users/{upn}").
+        Returns None if the batch could not be sent.
+        """
+        request = {"method": method.upper(), "url": url}
+        if headers:
+            request["headers"] = headers
+        if body is not None:
+            request["body"] = body
+            request.setdefault("headers", {}).setdefault(
+                "Content-Type", "application/json"
+            )
+        future = asyncio.get_running_loop().create_future()
+        self._enqueue(request, future)
+        return await future
+
+    def _enqueue(self, request: dict, future: asyncio.Future, attempt: int = 0) -> None:
+        if future.done():
+            return
+        self._pending.append((request, future, attempt))
+        if len(self._pending) >= self.max_size:
+            self._send_pending()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.window, self._send_pending
+            )
+
+    async def flush(self) -> None:
+        """Sends the pending sub-requests now and waits for every batch."""
+        self._send_pending()
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def _send_pending(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = self._pending[:self.max_size]
+            del self._pending[:self.max_size]
+            task = asyncio.create_task(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: list[tuple[dict, asyncio.Future, int]]) -> None:
+        requests = []
+        futures = {}
+        for idx, (request, future, attempt) in enumerate(batch, start=1):
+            if future.done():
+                # caller went away (ex: cancelled).
+                continue
+            futures[str(idx)] = (request, future, attempt)
+            requests.append({"id": str(idx), **request})
+        if not requests:
+            return
+        self._batches += 1
+        self._requests += len(requests)
+        try:
+            response = await self.client.request(
+                "POST", "$batch", json={"requests": requests}
+            )
+        except Exception as exc:  # pylint: disable=W0718
+            self.logger.error(f"Exception during Graph $batch call: {exc}")
+            response = None
+        results = {}
+        if response is not None and response.status == 200:
+            for item in (response.json() or {}).get("responses", []):
+                results[str(item.get("id"))] = self.to_response(item)
+        else:
+            self._failures += 1
+            self.logger.error(
+                f"Graph $batch failed: {response.text() if response else 'no response'}"
+            )
+        scheduler = self.client.scheduler
+        loop = asyncio.get_running_loop()
+        for request_id, (request, future, attempt) in futures.items():
+            if future.done():
+                continue
+            result = results.get(request_id)
+            # sub-requests are throttled individually: retry them in a later batch.
+            delay = scheduler.should_retry(result, attempt)
+            if delay is not None:
+                loop.call_later(delay, self._enqueue, request, future, attempt + 1)
+            else:
+                future.set_result(result)
+
+    @staticmethod
+    def to_response(item: dict) -> GraphResponse:
+        """Builds a GraphResponse from a $batch sub-response."""
+        headers = item.get("headers") or {}
+        body = item.get("body")
+        if body is None:
+            content = b''
+        elif isinstance(body, str):
+            content_type = headers.get("Content-Type", "")
+            if "json" in content_type or "text" in content_type:
+                content = body.encode('utf-8')
+            else:
+                # binary content (ex: photos) is returned base64-encoded.
+                content = base64.b64decode(body)
+        else:
+            content = json.dumps(body).encode('utf-8')
+        return GraphResponse(int(item.get("status", 500)), headers, content)
+
+    async def close(self) -> None:
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "batches": self._batches,
+            "requests": self._requests,
+            "failures": self._failures,
+        }
@@ -0,0 +1,306 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Dict, Any, Optional
+import aiohttp
+from navconfig.logging import logging
+from ..cache import TTLCache, SingleFlight, MISSING
+from ..conf import (
+    AZUREBOT_GRAPH_CACHE_SIZE,
+    AZUREBOT_GRAPH_CACHE_TTL,
+)
+from ..sessions import get_session
+from .batch import GraphBatcher
+from .pager import GraphPager
+from .photos import PhotoCache, photo_cache
+from .response import GraphResponse
+from .scheduler import GraphScheduler, get_scheduler
+from .tokens import get_token_provider
+
+
+GRAPH_URL = "https://graph.microsoft.com/v1.0"
+
+
+class GraphClient:
+    """Helper class for Microsoft Graph API interactions."""
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        tenant_id: str,
+        base_url: str = GRAPH_URL,
+        batch_size: Optional[int] = None,
+        batch_window: Optional[float] = None,
+        scheduler: Optional[GraphScheduler] = None,
+        photos: Optional[PhotoCache] = None,
+        cache_size: int = AZUREBOT_GRAPH_CACHE_SIZE,
+        cache_ttl: float = AZUREBOT_GRAPH_CACHE_TTL,
+        **kwargs
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.tenant_id = tenant_id
+        self.base_url = base_url.rstrip('/')
+        # shared with other clients of the same tenant and client id.
+        self.tokens = get_token_provider(
+            tenant_id, client_id, client_secret, **kwargs
+        )
+        batch_args = {}
+        if batch_size is not None:
+            batch_args['max_size'] = batch_size
+        if batch_window is not None:
+            batch_args['window'] = batch_window
+        self.batcher = GraphBatcher(self, **batch_args)
+        # concurrency and rate limits are shared by every client of the tenant.
+        self.scheduler = scheduler or get_scheduler(tenant_id)
+        self.photos = photos or photo_cache
+        # identical concurrent GETs share one call, results live `cache_ttl` seconds.
+        self._flight = SingleFlight()
+        self._results = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self.logger = logging.getLogger("AzureBot.GraphClient")
+
+    @property
+    def access_token(self) -> Optional[str]:
+        return self.tokens.token
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        return get_session('graph')
+
+    async def get_access_token(self) -> str:
+        """Get an access token for Microsoft Graph API."""
+        return await self.tokens.get_token()
+
+    def url(self, path: str) -> str:
+        if path.startswith('http'):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        headers: Optional[dict] = None,
+        cache: bool = True,
+        **kwargs
+    ) -> Optional[GraphResponse]:
+        """Calls the Graph API using the shared HTTP session.
+
+        Calls go through the tenant scheduler: throttled calls (429/503)
+        are retried honoring Retry-After. Identical concurrent GETs are
+        coalesced into a single call and their result cached for a short
+        while, unless `cache` is False (ex: the pages of a collection).
+        Returns None if no token could be acquired or the call failed.
+        """
+        async def send() -> Optional[GraphResponse]:
+            return await self.scheduler.run(
+                lambda: self._send(method, path, headers=headers, **kwargs)
+            )
+
+        if kwargs or not cache:
+            return await send()
+        return await self._shared(method, path, headers, send)
+
+    async def _shared(
+        self,
+        method: str,
+        path: str,
+        headers: Optional[dict],
+        send: Callable[[], Awaitable[Optional[GraphResponse]]]
+    ) -> Optional[GraphResponse]:
+        """Single-flight and short-lived result cache for GET calls."""
+        if method.upper() != 'GET':
+            return await send()
+        key = (self.url(path), tuple(sorted((headers or {}).items())))
+        result = self._results.get(key)
+        if result is not MISSING:
+            return result
+
+        async def call() -> Optional[GraphResponse]:
+            response = await send()
+            if response is not None and response.ok and self._results.ttl > 0:
+                self._results.set(key, response)
+            return response
+
+        return await self._flight.do(key, call)
+
+    def clear_cache(self) -> None:
+        self._results.clear()
+
+    async def _send(
+        self,
+        method: str,
+        path: str,
+        headers: Optional[dict] = None,
+        **kwargs
+    ) -> Optional[GraphResponse]:
+        token = await self.get_access_token()
+        if not token:
+            return None
+        _headers = {"Authorization": f"Bearer {token}"}
+        if headers:
+            _headers.update(headers)
+        try:
+            async with self.session.request(
+                method, self.url(path), headers=_headers, **kwargs
+            ) as response:
+                result = GraphResponse(
+                    response.status,
+                    dict(response.headers),
+                    await response.read()
+                )
+        except Exception as e:
+            self.logger.error(f"Exception during Graph API call: {str(e)}")
+            return None
+        if result.status == 401:
+            self.tokens.invalidate()
+        return result
+
+    async def batch_request(
+        self,
+        method: str,
+        path: str,
+        headers: Optional[dict] = None,
+        body: Any = None
+    ) -> Optional[GraphResponse]:
+        """Calls the Graph API as part of a `$batch` request.
+
+        Calls done concurrently are packed together (up to 20 per batch);
+        absolute URLs outside of the Graph API are called directly.
+        """
+        url = self.url(path)
+        if not url.startswith(self.base_url):
+            return await self.request(method, url, headers=headers, json=body)
+
+        async def send() -> Optional[GraphResponse]:
+            return await self.batcher.submit(
+                method, url[len(self.base_url):] or '/', headers=headers, body=body
+            )
+
+        if body is not None:
+            return await send()
+        return await self._shared(method, url, headers, send)
+
+    async def _call(
+        self,
+        method: str,
+        path: str,
+        batch: bool = False,
+        headers: Optional[dict] = None
+    ) -> Optional[GraphResponse]:
+        if batch:
+            return await self.batch_request(method, path, headers=headers)
+        return await self.request(method, path, headers=headers)
+
+    def pager(self, path: str, **kwargs) -> GraphPager:
+        """Async iterator over the items of a Graph collection.
+
+        See GraphPager for the options ($select, $top, read-ahead, limits).
+        """
+        return GraphPager(self, path, **kwargs)
+
+    def get_channel_messages(
+        self,
+        team_id: str,
+        channel_id: str,
+        top: int = 50,
+        **kwargs
+    ) -> GraphPager:
+        """Messages of a channel (most recent first), page by page."""
+        return self.pager(
+            f"teams/{team_id}/channels/{channel_id}/messages", top=top, **kwargs
+        )
+
+    def get_team_members(self, team_id: str, **kwargs) -> GraphPager:
+        """Members of a team, page by page."""
+        return self.pager(f"teams/{team_id}/members", **kwargs)
+
+    async def get_user_by_upn(
+        self,
+        upn: str,
+        batch: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """Get user information from Graph API by UPN."""
+        response = await self._call(
+            "GET",
+            f"users/{upn}",
+            batch=batch,
+            headers={"Content-Type": "application/json"}
+        )
+        if response is None:
+            return None
+        if response.status == 200:
+            return response.json()
+        self.logger.error(f"Error fetching user {upn}: {response.text()}")
+        return None
+
+    async def get_user_manager(
+        self,
+        upn: str,
+        batch: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """Get user's manager information."""
+        response = await self._call(
+            "GET",
+            f"users/{upn}/manager",
+            batch=batch,
+            headers={"Content-Type": "application/json"}
+        )
+        if response is None:
+            return None
+        if response.status == 200:
+            return response.json()
+        self.logger.error(f"Error fetching manager for {upn}: {response.text()}")
+        return None
+
+    async def get_user_photo(
+        self,
+        upn: str,
+        batch: bool = False
+    ) -> Optional[bytes]:
+        """Get user's profile photo (cached, revalidated by ETag)."""
+        async def fetch(etag: Optional[str]) -> Optional[GraphResponse]:
+            headers = {"If-None-Match": etag} if etag else None
+            response = await self._call(
+                "GET", f"users/{upn}/photo/$value", batch=batch, headers=headers
+            )
+            if response is not None and response.status not in (200, 304):
+                self.logger.warning(
+                    f"No photo found for user {upn} (Status: {response.status})"
+                )
+            return response
+
+        return await self.photos.get(f"{self.tenant_id}/{upn.lower()}", fetch)
+
+    async def get_user_thumbnail(self, upn: str, size: int = 96) -> Optional[bytes]:
+        """Get a downscaled (PNG) copy of the user's profile photo."""
+        async def fetch(etag: Optional[str]) -> Optional[GraphResponse]:
+            headers = {"If-None-Match": etag} if etag else None
+            return await self._call(
+                "GET", f"users/{upn}/photo/$value", headers=headers
+            )
+
+        return await self.photos.thumbnail(
+            f"{self.tenant_id}/{upn.lower()}", fetch, size=size
+        )
+
+    async def get_user_info(self, upn: str) -> Dict[str, Any]:
+        """Get user, manager and photo of a user in a single round trip."""
+        user, manager, photo = await asyncio.gather(
+            self.get_user_by_upn(upn, batch=True),
+            self.get_user_manager(upn, batch=True),
+            self.get_user_photo(upn, batch=True),
+        )
+        return {"user": user, "manager": manager, "photo": photo}
+
+    async def close(self) -> None:
+        await self.batcher.close()
+
+    def stats(self) -> dict:
+        return {
+            "tokens": self.tokens.stats(),
+            "batch": self.batcher.stats(),
+            "scheduler": self.scheduler.stats(),
+            "photos": self.photos.stats(),
+            "cache": {**self._results.stats(), **self._flight.stats()},
+        }
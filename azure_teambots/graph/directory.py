@@ -0,0 +1,402 @@
+"""
+Local User Directory.
+
+In-memory index of the tenant users, kept in sync with Microsoft Graph delta
+queries (`/users/delta`), for person lookups by name prefix, email or
+fuzzy (trigram) matching without calling Graph.
+"""
+import asyncio
+import json
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+from typing import Optional, Union, TYPE_CHECKING
+from navconfig.logging import logging
+from ..conf import (
+    AZUREBOT_DIRECTORY_PATH,
+    AZUREBOT_DIRECTORY_SYNC_INTERVAL,
+)
+if TYPE_CHECKING:
+    from .client import GraphClient
+
+
+DELTA_URL = "users/delta?$select=id,displayName,mail,userPrincipalName,jobTitle"
+
+## Graph property -> column
+_FIELDS = {
+    "displayName": "name",
+    "mail": "email",
+    "userPrincipalName": "upn",
+    "jobTitle": "title",
+}
+
+
+def normalize(value: Optional[str]) -> str:
+    """Lowercase, without accents."""
+    if not value:
+        return ''
+    value = unicodedata.normalize('NFKD', value.lower())
+    return ''.join(c for c in value if not unicodedata.combining(c)).strip()
+
+
+def trigrams(value: str) -> set[str]:
+    value = f"  {value} "
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+class DirectoryIndex:
+    """Columnar index of the users of a tenant.
+
+    Users are stored column by column (one list per attribute, one row per
+    user); deleted users are tombstoned until the next rebuild. Lookups use
+    three secondary indexes rebuilt after every sync: a sorted list of name
+    tokens (prefix), an email/UPN map (exact) and a trigram posting list
+    (fuzzy).
+
+    Args:
+        path: JSON file where the users and the delta link are saved
+          (None keeps the directory in memory only).
+        interval: seconds between two delta syncs.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = AZUREBOT_DIRECTORY_PATH,
+        interval: float = AZUREBOT_DIRECTORY_SYNC_INTERVAL
+    ):
+        self.path: Optional[Path] = Path(path) if path else None
+        self.interval: float = interval
+        self.delta_link: Optional[str] = None
+        # columns
+        self._ids: list[str] = []
+        self._names: list[str] = []
+        self._emails: list[str] = []
+        self._upns: list[str] = []
+        self._titles: list[str] = []
+        self._alive = bytearray()
+        self._rows: dict[str, int] = {}
+        # secondary indexes
+        self._prefix_keys: list[str] = []
+        self._prefix_rows = array('I')
+        self._exact: dict[str, int] = {}
+        self._grams: dict[str, array] = {}
+        self._gram_counts = array('I')
+        self._task: Optional[asyncio.Task] = None
+        self._loaded: bool = False
+        self._syncs: int = 0
+        self._changes: int = 0
+        self._lookups: int = 0
+        self.logger = logging.getLogger("AzureBot.GraphClient.Directory")
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def ready(self) -> bool:
+        return bool(self._rows)
+
+    ## Columns
+    def _upsert(self, user: dict) -> None:
+        row = self._rows.get(user['id'])
+        if row is None:
+            row = len(self._ids)
+            self._rows[user['id']] = row
+            self._ids.append(user['id'])
+            self._names.append('')
+            self._emails.append('')
+            self._upns.append('')
+            self._titles.append('')
+            self._alive.append(1)
+        # delta updates only carry the changed properties.
+        for prop, column in _FIELDS.items():
+            if prop in user:
+                getattr(self, f"_{column}s")[row] = user[prop] or ''
+
+    def _remove(self, user_id: str) -> None:
+        row = self._rows.pop(user_id, None)
+        if row is not None:
+            self._alive[row] = 0
+
+    def clear(self) -> None:
+        self.delta_link = None
+        self._rows = {}
+        self._alive = bytearray()
+        self._ids, self._names, self._emails = [], [], []
+        self._upns, self._titles = [], []
+        # indexes point to rows: they go with the columns.
+        self._prefix_keys, self._prefix_rows = [], array('I')
+        self._exact, self._grams, self._gram_counts = {}, {}, array('I')
+
+    def _replace(self, other: "DirectoryIndex") -> None:
+        """Takes the users (columns and indexes) of another index."""
+        for attr in (
+            'delta_link', '_ids', '_names', '_emails', '_upns', '_titles',
+            '_alive', '_rows', '_prefix_keys', '_prefix_rows', '_exact',
+            '_grams', '_gram_counts'
+        ):
+            setattr(self, attr, getattr(other, attr))
+
+    ## Secondary indexes
+    @staticmethod
+    def _build(names: list[str], emails: list[str], upns: list[str]) -> tuple:
+        prefix = []
+        exact = {}
+        grams: dict[str, list[int]] = {}
+        counts = array('I')
+        for row, name in enumerate(names):
+            name = normalize(name)
+            keys = set(name.split())
+            if name:
+                keys.add(name)
+            for address in (normalize(emails[row]), normalize(upns[row])):
+                if address:
+                    exact.setdefault(address, row)
+                    keys.add(address)
+            prefix.extend((key, row) for key in keys)
+            row_grams = trigrams(name) if name else set()
+            counts.append(len(row_grams))
+            for gram in row_grams:
+                grams.setdefault(gram, []).append(row)
+        prefix.sort()
+        return (
+            [key for key, _ in prefix],
+            array('I', [row for _, row in prefix]),
+            exact,
+            {gram: array('I', rows) for gram, rows in grams.items()},
+            counts,
+        )
+
+    async def rebuild(self) -> None:
+        """Drops the tombstoned rows and rebuilds the lookup indexes.
+
+        Indexes are built off the event loop, on a compacted copy of the
+        columns; columns and indexes are swapped together.
+        """
+        keep = [row for row in range(len(self._ids)) if self._alive[row]]
+        columns = {
+            column: [getattr(self, column)[row] for row in keep]
+            for column in ('_ids', '_names', '_emails', '_upns', '_titles')
+        }
+        indexes = await asyncio.get_running_loop().run_in_executor(
+            None,
+            self._build,
+            columns['_names'],
+            columns['_emails'],
+            columns['_upns']
+        )
+        for column, values in columns.items():
+            setattr(self, column, values)
+        self._alive = bytearray(b'\x01' * len(keep))
+        self._rows = {user_id: row for row, user_id in enumerate(self._ids)}
+        (
+            self._prefix_keys,
+            self._prefix_rows,
+            self._exact,
+            self._grams,
+            self._gram_counts
+        ) = indexes
+
+    ## Lookups
+    def _person(self, row: int) -> dict:
+        upn = self._upns[row]
+        return {
+            "id": self._ids[row],
+            "name": self._names[row],
+            "email": self._emails[row] or upn,
+            "username": upn.split('@')[0] if upn else None,
+            "title": self._titles[row],
+        }
+
+    def _valid(self, row: int) -> bool:
+        # rows can be tombstoned between two rebuilds.
+        return row < len(self._alive) and self._alive[row] == 1
+
+    def find_by_email(self, email: str) -> Optional[dict]:
+        row = self._exact.get(normalize(email))
+        if row is None or not self._valid(row):
+            return None
+        return self._person(row)
+
+    def find_by_prefix(self, prefix: str, limit: int = 10) -> list[dict]:
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        found: list[int] = []
+        idx = bisect_left(self._prefix_keys, prefix)
+        while idx < len(self._prefix_keys) and len(found) < limit:
+            if not self._prefix_keys[idx].startswith(prefix):
+                break
+            row = self._prefix_rows[idx]
+            if row not in found and self._valid(row):
+                found.append(row)
+            idx += 1
+        return [self._person(row) for row in found]
+
+    def find_similar(
+        self,
+        value: str,
+        limit: int = 10,
+        threshold: float = 0.4
+    ) -> list[dict]:
+        """Fuzzy lookup by name (trigram similarity)."""
+        value = normalize(value)
+        query = trigrams(value) if value else set()
+        if not query:
+            return []
+        hits = Counter()
+        for gram in query:
+            rows = self._grams.get(gram)
+            if rows is not None:
+                hits.update(rows)
+        scored = []
+        for row, shared in hits.items():
+            # Dice coefficient.
+            score = 2 * shared / (len(query) + self._gram_counts[row])
+            if score >= threshold and self._valid(row):
+                scored.append((score, row))
+        scored.sort(key=lambda item: -item[0])
+        return [self._person(row) for _, row in scored[:limit]]
+
+    def search(self, query: str, limit: int = 10) -> list[dict]:
+        """Email, then name prefix, then fuzzy lookup."""
+        self._lookups += 1
+        query = (query or '').strip()
+        if not query:
+            return []
+        if '@' in query:
+            person = self.find_by_email(query)
+            if person:
+                return [person]
+        return self.find_by_prefix(query, limit) or self.find_similar(query, limit)
+
+    def lookup(self, query: str) -> Optional[dict]:
+        """Best match for a typed name or email."""
+        result = self.search(query, limit=1)
+        return result[0] if result else None
+
+    ## Graph delta sync
+    async def sync(self, client: "GraphClient") -> int:
+        """Applies the changes since the last sync, returns how many.
+
+        A full resync (expired delta token) is loaded into a new index,
+        swapped in once complete: lookups keep using the current users.
+        """
+        await self.load()
+        url = self.delta_link or DELTA_URL
+        target = self
+        changes = 0
+        while url:
+            response = await client.request("GET", url, cache=False)
+            if response is not None and response.status == 410:
+                # delta token expired: full resync.
+                self.logger.warning("Directory delta token expired, resyncing")
+                target = DirectoryIndex(path=None, interval=self.interval)
+                url = DELTA_URL
+                changes = 0
+                continue
+            if response is None or response.status != 200:
+                self.logger.error(
+                    f"Directory sync failed: {response.text() if response else 'no response'}"
+                )
+                if target is not self:
+                    # incomplete resync: retried on the next sync.
+                    return 0
+                break
+            page = response.json() or {}
+            for user in page.get('value', []):
+                if '@removed' in user:
+                    target._remove(user['id'])
+                else:
+                    target._upsert(user)
+                changes += 1
+            url = page.get('@odata.nextLink')
+            if not url and page.get('@odata.deltaLink'):
+                target.delta_link = page['@odata.deltaLink']
+        self._syncs += 1
+        if target is not self:
+            await target.rebuild()
+            self._replace(target)
+            self._changes += changes
+            await self.save()
+        elif changes:
+            self._changes += changes
+            await self.rebuild()
+            await self.save()
+        return changes
+
+    async def _run(self, client: "GraphClient") -> None:
+        while True:
+            try:
+                await self.sync(client)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # pylint: disable=W0718
+                self.logger.error(f"Directory sync error: {exc}")
+            await asyncio.sleep(self.interval)
+
+    def start(self, client: "GraphClient") -> None:
+        """Starts the periodic background sync."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(client))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    ## Persistence
+    async def load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            data = await asyncio.get_running_loop().run_in_executor(
+                None, lambda: json.loads(self.path.read_text())
+            )
+        except ValueError:
+            self.logger.warning(f"Invalid directory file {self.path}, ignored")
+            return
+        for values in data.get('users', []):
+            self._upsert(dict(zip(('id', *_FIELDS), values)))
+        self.delta_link = data.get('delta_link')
+        await self.rebuild()
+
+    async def save(self) -> None:
+        if self.path is None:
+            return
+        data = {
+            "delta_link": self.delta_link,
+            "users": [
+                [self._ids[row], self._names[row], self._emails[row],
+                 self._upns[row], self._titles[row]]
+                for row in self._rows.values()
+            ],
+        }
+
+        def write():
+            tmp = self.path.with_suffix('.tmp')
+            tmp.write_text(json.dumps(data))
+            tmp.replace(self.path)
+
+        await asyncio.get_running_loop().run_in_executor(None, write)
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._rows),
+            "syncs": self._syncs,
+            "changes": self._changes,
+            "lookups": self._lookups,
+            "delta": self.delta_link is not None,
+        }
+
+
+## shared by all bots.
+directory_index = DirectoryIndex()
@@ -0,0 +1,154 @@
+"""
+Microsoft Graph Collection Pager.
+
+Streams the pages of a Graph collection (following `@odata.nextLink`)
+without loading the whole collection in memory.
+"""
+import asyncio
+from collections.abc import AsyncIterator
+from typing import Optional, Union, TYPE_CHECKING
+from urllib.parse import urlencode
+from navconfig.logging import logging
+if TYPE_CHECKING:
+    from .client import GraphClient
+
+
+_DONE = object()
+
+
+class GraphPager:
+    """Async iterator over a Graph collection.
+
+    Pages are requested lazily: at most `prefetch` pages are read ahead
+    while the current one is being processed (0 disables the read-ahead).
+    Leaving the loop early (break, `max_items`, `max_pages`) stops the
+    pending requests.
+
+    Usage:
+        async for user in client.pager('users', select=['id', 'mail']):
+            ...
+
+    Args:
+        client: GraphClient.
+        path: collection path (ex: "teams/{id}/channels/{id}/messages").
+        select: properties to return ($select).
+        top: page size ($top).
+        params: other query parameters ($filter, $orderby...).
+        prefetch: pages read ahead.
+        max_pages: stop after this number of pages.
+        max_items: stop after this number of items.
+    """
+
+    def __init__(
+        self,
+        client: "GraphClient",
+        path: str,
+        select: Optional[Union[list, str]] = None,
+        top: Optional[int] = None,
+        params: Optional[dict] = None,
+        prefetch: int = 1,
+        max_pages: Optional[int] = None,
+        max_items: Optional[int] = None
+    ):
+        self.client = client
+        self.prefetch: int = max(prefetch, 0)
+        self.max_pages: Optional[int] = max_pages
+        self.max_items: Optional[int] = max_items
+        query = dict(params or {})
+        if select:
+            query['$select'] = select if isinstance(select, str) else ','.join(select)
+        if top:
+            query['$top'] = top
+        self.url: str = path
+        if query:
+            sep = '&' if '?' in path else '?'
+            self.url = f"{path}{sep}{urlencode(query, safe='$,')}"
+        # set once the collection was read until the end.
+        self.delta_link: Optional[str] = None
+        # next page after the last page fetched (resume point without read-ahead).
+        self.next_link: Optional[str] = None
+        # status of the failed request (None if no request failed).
+        self.error: Optional[int] = None
+        self.pages_read: int = 0
+        self.items_read: int = 0
+        self.logger = logging.getLogger("AzureBot.GraphClient.Pager")
+
+    async def _fetch(self, url: str) -> tuple[Optional[list], Optional[str]]:
+        response = await self.client.request("GET", url, cache=False)
+        if response is None or response.status != 200:
+            self.error = response.status if response is not None else 0
+            self.logger.error(
+                f"Error reading {url}: {response.text() if response else 'no response'}"
+            )
+            return None, None
+        page = response.json() or {}
+        if '@odata.deltaLink' in page:
+            self.delta_link = page['@odata.deltaLink']
+        self.next_link = page.get('@odata.nextLink')
+        return page.get('value', []), self.next_link
+
+    async def _read_ahead(self, queue: asyncio.Queue) -> None:
+        url = self.url
+        try:
+            while url:
+                items, url = await self._fetch(url)
+                if items is None:
+                    break
+                await queue.put(items)
+        except Exception as exc:  # pylint: disable=W0718
+            self.error = 0
+            self.logger.error(f"Exception reading {url}: {exc}")
+        await queue.put(_DONE)
+
+    async def _pages(self) -> AsyncIterator[list]:
+        if self.prefetch == 0:
+            url = self.url
+            while url:
+                items, url = await self._fetch(url)
+                if items is None:
+                    return
+                yield items
+            return
+        queue = asyncio.Queue(maxsize=self.prefetch)
+        task = asyncio.create_task(self._read_ahead(queue))
+        try:
+            while (items := await queue.get()) is not _DONE:
+                yield items
+        finally:
+            if not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+    async def pages(self) -> AsyncIterator[list]:
+        """Pages (lists of items) of the collection."""
+        pages = self._pages()
+        try:
+            async for items in pages:
+                self.pages_read += 1
+                if self.max_items is not None:
+                    items = items[:self.max_items - self.items_read]
+                self.items_read += len(items)
+                yield items
+                if self.max_pages is not None and self.pages_read >= self.max_pages:
+                    return
+                if self.max_items is not None and self.items_read >= self.max_items:
+                    return
+        finally:
+            # stops the read-ahead.
+            await pages.aclose()
+
+    async def items(self) -> AsyncIterator[dict]:
+        """Items of the collection, one by one."""
+        pages = self.pages()
+        try:
+            async for items in pages:
+                for item in items:
+                    yield item
+        finally:
+            await pages.aclose()
+
+    def __aiter__(self) -> AsyncIterator[dict]:
+        return self.items()
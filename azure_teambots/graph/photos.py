@@ -0,0 +1,333 @@
+"""
+User Photo Cache.
+
+Content-addressed cache of Microsoft Graph profile photos: a memory LRU in
+front of an (optional) size-capped on-disk store, revalidated with
+conditional requests (If-None-Match) so unchanged photos cost a 304.
+"""
+import asyncio
+import hashlib
+import io
+import json
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Optional, Union
+from aiohttp import web
+from navconfig.logging import logging
+from ..cache import SingleFlight
+from ..conf import (
+    AZUREBOT_PHOTO_CACHE_DIR,
+    AZUREBOT_PHOTO_DISK_BYTES,
+    AZUREBOT_PHOTO_MEMORY_BYTES,
+    AZUREBOT_PHOTO_MAX_ENTRIES,
+    AZUREBOT_PHOTO_TTL,
+    AZUREBOT_PHOTO_NEGATIVE_TTL,
+    AZUREBOT_PHOTO_WORKERS,
+)
+from .response import GraphResponse
+
+
+@dataclass
+class PhotoEntry:
+    """Photo of a user: Graph ETag and digest of the content."""
+    etag: Optional[str]
+    digest: Optional[str]  # None: the user has no photo.
+    checked: float
+
+
+class PhotoCache:
+    """Cache of user photos.
+
+    Photos are stored once per content digest; the index maps every user to
+    the ETag and digest of its current photo. Entries are served without
+    network for `ttl` seconds, then revalidated with `If-None-Match`.
+
+    Args:
+        directory: on-disk store (None keeps photos in memory only).
+        disk_bytes: maximum size of the on-disk store.
+        memory_bytes: maximum size of the photos kept in memory.
+        max_entries: maximum number of users in the index.
+        ttl: seconds a photo is served before being revalidated.
+        negative_ttl: seconds a missing photo is remembered.
+        workers: threads used to generate the thumbnails.
+    """
+    index_file: str = 'index.json'
+
+    def __init__(
+        self,
+        directory: Optional[Union[str, Path]] = AZUREBOT_PHOTO_CACHE_DIR,
+        disk_bytes: int = AZUREBOT_PHOTO_DISK_BYTES,
+        memory_bytes: int = AZUREBOT_PHOTO_MEMORY_BYTES,
+        max_entries: int = AZUREBOT_PHOTO_MAX_ENTRIES,
+        ttl: float = AZUREBOT_PHOTO_TTL,
+        negative_ttl: float = AZUREBOT_PHOTO_NEGATIVE_TTL,
+        workers: int = AZUREBOT_PHOTO_WORKERS
+    ):
+        self.directory: Optional[Path] = Path(directory) if directory else None
+        self.disk_bytes: int = disk_bytes
+        self.memory_bytes: int = memory_bytes
+        self.max_entries: int = max_entries
+        self.ttl: float = ttl
+        self.negative_ttl: float = negative_ttl
+        self.workers: int = workers
+        self._index: OrderedDict[str, PhotoEntry] = OrderedDict()
+        # digest -> content
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_size: int = 0
+        # digest -> size (least recently used first)
+        self._disk: OrderedDict[str, int] = OrderedDict()
+        self._disk_size: int = 0
+        self._loaded: bool = False
+        self._lock = asyncio.Lock()
+        self._flight = SingleFlight()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._apps: set[int] = set()
+        self._hits: int = 0
+        self._revalidated: int = 0
+        self._downloads: int = 0
+        self._thumbnails: int = 0
+        self.logger = logging.getLogger("AzureBot.GraphClient.Photos")
+
+    def setup(self, app: web.Application) -> None:
+        """Saves the index on the aiohttp application cleanup (idempotent)."""
+        if id(app) in self._apps:
+            return
+        self._apps.add(id(app))
+        app.on_cleanup.append(self.on_cleanup)
+
+    async def on_cleanup(self, app: web.Application) -> None:
+        await self.close()
+
+    async def open(self) -> None:
+        """Loads the index and the on-disk store (once)."""
+        async with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if self.directory is None:
+                return
+            await asyncio.get_running_loop().run_in_executor(None, self._load_disk)
+
+    def _load_disk(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = [
+            f for f in self.directory.iterdir()
+            if f.is_file() and f.name != self.index_file and f.suffix != '.tmp'
+        ]
+        for f in sorted(files, key=lambda f: f.stat().st_mtime):
+            size = f.stat().st_size
+            self._disk[f.name] = size
+            self._disk_size += size
+        index = self.directory.joinpath(self.index_file)
+        if index.exists():
+            try:
+                data = json.loads(index.read_text())
+            except ValueError:
+                self.logger.warning(f"Invalid photo cache index {index}, ignored")
+                data = {}
+            for key, entry in data.items():
+                if entry.get('digest') is None or entry['digest'] in self._disk:
+                    self._index[key] = PhotoEntry(**entry)
+
+    async def close(self) -> None:
+        if self.directory is not None and self._loaded:
+            index = {key: asdict(entry) for key, entry in self._index.items()}
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._write_file, self.index_file, json.dumps(index).encode()
+            )
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _write_file(self, name: str, data: bytes) -> None:
+        path = self.directory.joinpath(name)
+        tmp = path.with_suffix('.tmp')
+        tmp.write_bytes(data)
+        tmp.replace(path)
+
+    def _read_file(self, name: str) -> Optional[bytes]:
+        path = self.directory.joinpath(name)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        path.touch()
+        return data
+
+    def _remove_file(self, name: str) -> None:
+        self.directory.joinpath(name).unlink(missing_ok=True)
+
+    def _remember(self, digest: str, data: bytes) -> None:
+        if digest in self._memory:
+            self._memory.move_to_end(digest)
+            return
+        if len(data) > self.memory_bytes:
+            return
+        self._memory[digest] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, old = self._memory.popitem(last=False)
+            self._memory_size -= len(old)
+
+    async def load(self, digest: str) -> Optional[bytes]:
+        """Content of a photo by digest (None if it is no longer stored)."""
+        data = self._memory.get(digest)
+        if data is not None:
+            self._memory.move_to_end(digest)
+            return data
+        if self.directory is None or digest not in self._disk:
+            return None
+        data = await asyncio.get_running_loop().run_in_executor(
+            None, self._read_file, digest
+        )
+        if data is None:
+            self._disk_size -= self._disk.pop(digest, 0)
+            return None
+        self._disk.move_to_end(digest)
+        self._remember(digest, data)
+        return data
+
+    async def store(self, data: bytes, digest: Optional[str] = None) -> str:
+        """Stores a photo, returning its digest."""
+        digest = digest or hashlib.sha256(data).hexdigest()
+        self._remember(digest, data)
+        if self.directory is None or digest in self._disk:
+            return digest
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._write_file, digest, data)
+        self._disk[digest] = len(data)
+        self._disk_size += len(data)
+        while self._disk_size > self.disk_bytes and len(self._disk) > 1:
+            old, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            await loop.run_in_executor(None, self._remove_file, old)
+        return digest
+
+    def _set_entry(self, key: str, entry: PhotoEntry) -> None:
+        self._index[key] = entry
+        self._index.move_to_end(key)
+        while len(self._index) > self.max_entries:
+            self._index.popitem(last=False)
+
+    async def get(
+        self,
+        key: str,
+        fetch: Callable[[Optional[str]], Awaitable[Optional[GraphResponse]]]
+    ) -> Optional[bytes]:
+        """Returns the photo of `key` (None if the user has no photo).
+
+        `fetch(etag)` downloads the photo, sending `If-None-Match: etag`
+        when an ETag is given.
+        """
+        await self.open()
+        entry = self._index.get(key)
+        if entry is not None:
+            fresh = self.ttl if entry.digest else self.negative_ttl
+            if time.time() - entry.checked < fresh:
+                if entry.digest is None:
+                    self._hits += 1
+                    return None
+                data = await self.load(entry.digest)
+                if data is not None:
+                    self._hits += 1
+                    return data
+        return await self._flight.do(key, lambda: self._refresh(key, fetch))
+
+    async def _refresh(
+        self,
+        key: str,
+        fetch: Callable[[Optional[str]], Awaitable[Optional[GraphResponse]]]
+    ) -> Optional[bytes]:
+        entry = self._index.get(key)
+        cached = None
+        if entry is not None and entry.digest:
+            cached = await self.load(entry.digest)
+        etag = entry.etag if cached is not None else None
+        response = await fetch(etag)
+        if response is None:
+            # Graph is not reachable: serve the stale photo.
+            return cached
+        if response.status == 304 and cached is not None:
+            self._revalidated += 1
+            entry.checked = time.time()
+            self._index.move_to_end(key)
+            return cached
+        if response.status == 200:
+            self._downloads += 1
+            digest = await self.store(response.body)
+            self._set_entry(
+                key, PhotoEntry(response.header('ETag'), digest, time.time())
+            )
+            return response.body
+        if response.status == 404:
+            self._set_entry(key, PhotoEntry(None, None, time.time()))
+            return None
+        return cached
+
+    def invalidate(self, key: str) -> None:
+        self._index.pop(key, None)
+
+    async def thumbnail(
+        self,
+        key: str,
+        fetch: Callable[[Optional[str]], Awaitable[Optional[GraphResponse]]],
+        size: int = 96
+    ) -> Optional[bytes]:
+        """Returns a downscaled (PNG) copy of the photo of `key`.
+
+        Thumbnails are generated in a worker pool and cached like photos.
+        Requires Pillow (`pip install azure_teambots[photos]`).
+        """
+        data = await self.get(key, fetch)
+        if data is None:
+            return None
+        digest = self._index[key].digest
+        name = f"{digest}_{size}.png"
+        thumb = await self.load(name)
+        if thumb is not None:
+            return thumb
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix='azurebot-photos'
+            )
+        thumb = await asyncio.get_running_loop().run_in_executor(
+            self._executor, make_thumbnail, data, size
+        )
+        self._thumbnails += 1
+        await self.store(thumb, digest=name)
+        return thumb
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._index),
+            "memory_bytes": self._memory_size,
+            "disk_files": len(self._disk),
+            "disk_bytes": self._disk_size,
+            "hits": self._hits,
+            "revalidated": self._revalidated,
+            "downloads": self._downloads,
+            "thumbnails": self._thumbnails,
+        }
+
+
+def make_thumbnail(data: bytes, size: int) -> bytes:
+    """Downscales an image to fit in a `size` x `size` box (PNG)."""
+    try:
+        from PIL import Image  # pylint: disable=C0415
+    except ImportError as exc:
+        raise RuntimeError(
+            "Photo thumbnails require Pillow: pip install azure_teambots[photos]"
+        ) from exc
+    with Image.open(io.BytesIO(data)) as image:
+        image.thumbnail((size, size))
+        output = io.BytesIO()
+        image.save(output, format='PNG')
+        return output.getvalue()
+
+
+## shared by all Graph clients.
+photo_cache = PhotoCache()
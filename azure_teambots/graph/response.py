@@ -0,0 +1,34 @@
+"""
+Microsoft Graph Responses.
+"""
+import json
+from typing import Any, Optional
+
+
+class GraphResponse:
+    """Status, headers and body of a Microsoft Graph response."""
+
+    __slots__ = ('status', 'headers', 'body')
+
+    def __init__(self, status: int, headers: dict, body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    def json(self) -> Any:
+        return json.loads(self.body) if self.body else None
+
+    def text(self) -> str:
+        return self.body.decode('utf-8', errors='replace') if self.body else ''
+
+    def header(self, name: str) -> Optional[str]:
+        """Case-insensitive header lookup."""
+        name = name.lower()
+        for key, value in self.headers.items():
+            if key.lower() == name:
+                return value
+        return None
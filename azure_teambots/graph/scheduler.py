@@ -0,0 +1,178 @@
+"""
+Microsoft Graph Request Scheduler.
+
+Throttling-aware execution of Graph calls: per-tenant concurrency cap and
+rate limit, Retry-After handling and jittered exponential backoff on
+429 (Too Many Requests) and 503 (Service Unavailable).
+"""
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable
+from typing import Optional
+from navconfig.logging import logging
+from ..conf import (
+    AZUREBOT_GRAPH_CONCURRENCY,
+    AZUREBOT_GRAPH_RATE,
+    AZUREBOT_GRAPH_BURST,
+    AZUREBOT_GRAPH_MAX_RETRIES,
+    AZUREBOT_GRAPH_BACKOFF,
+    AZUREBOT_GRAPH_MAX_BACKOFF,
+)
+from ..ratelimit import TokenBucket, parse_retry_after
+from .response import GraphResponse
+
+
+RETRY_STATUS = (429, 503)
+
+
+def retry_after(response: GraphResponse) -> Optional[float]:
+    """Seconds requested by the Retry-After header (None if missing)."""
+    return parse_retry_after(response.header('Retry-After'))
+
+
+class GraphScheduler:
+    """Schedules the Graph calls of a tenant.
+
+    At most `max_concurrency` calls are in flight and calls are started at
+    `rate` per second (bursts of `burst`). Throttled calls are retried up to
+    `max_retries` times, waiting what Retry-After asks (pausing every call
+    of the tenant meanwhile) or a jittered exponential backoff otherwise.
+
+    Args:
+        max_concurrency: maximum number of calls in flight.
+        rate: calls started per second (0 disables the limit).
+        burst: maximum burst of calls.
+        max_retries: retries of a throttled call.
+        backoff: base delay (in seconds) of the exponential backoff.
+        max_backoff: maximum delay (in seconds) between retries.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = AZUREBOT_GRAPH_CONCURRENCY,
+        rate: float = AZUREBOT_GRAPH_RATE,
+        burst: int = AZUREBOT_GRAPH_BURST,
+        max_retries: int = AZUREBOT_GRAPH_MAX_RETRIES,
+        backoff: float = AZUREBOT_GRAPH_BACKOFF,
+        max_backoff: float = AZUREBOT_GRAPH_MAX_BACKOFF
+    ):
+        self.max_concurrency: int = max_concurrency
+        self.max_retries: int = max_retries
+        self.backoff: float = backoff
+        self.max_backoff: float = max_backoff
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._bucket = TokenBucket(rate, burst)
+        self._paused_until: float = 0
+        self._waiting: int = 0
+        self._active: int = 0
+        self._requests: int = 0
+        self._throttled: int = 0
+        self._retries: int = 0
+        self._exhausted: int = 0
+        self.logger = logging.getLogger("AzureBot.GraphClient.Scheduler")
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter."""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def retry_delay(self, response: GraphResponse, attempt: int) -> float:
+        delay = retry_after(response)
+        if delay is None:
+            return self.backoff_delay(attempt)
+        # every call of the tenant honors the server's Retry-After.
+        self.pause(delay)
+        return min(delay, self.max_backoff)
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    @property
+    def paused_for(self) -> float:
+        return max(self._paused_until - time.monotonic(), 0)
+
+    def is_throttled(self, response: Optional[GraphResponse]) -> bool:
+        return response is not None and response.status in RETRY_STATUS
+
+    async def run(
+        self,
+        send: Callable[[], Awaitable[Optional[GraphResponse]]]
+    ) -> Optional[GraphResponse]:
+        """Runs `send` under the tenant limits, retrying throttled calls."""
+        attempt = 0
+        while True:
+            response = await self._execute(send)
+            delay = self.should_retry(response, attempt)
+            if delay is None:
+                return response
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def should_retry(
+        self,
+        response: Optional[GraphResponse],
+        attempt: int
+    ) -> Optional[float]:
+        """Seconds to wait before retrying a throttled call.
+
+        None if the call was not throttled or ran out of retries.
+        """
+        if not self.is_throttled(response):
+            return None
+        self._throttled += 1
+        if attempt >= self.max_retries:
+            self._exhausted += 1
+            self.logger.warning(
+                f"Graph call still throttled after {attempt} retries "
+                f"(Status: {response.status})"
+            )
+            return None
+        self._retries += 1
+        return self.retry_delay(response, attempt)
+
+    async def _execute(
+        self,
+        send: Callable[[], Awaitable[Optional[GraphResponse]]]
+    ) -> Optional[GraphResponse]:
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        try:
+            while (paused := self.paused_for) > 0:
+                await asyncio.sleep(paused)
+            await self._bucket.acquire()
+            self._active += 1
+            self._requests += 1
+            try:
+                return await send()
+            finally:
+                self._active -= 1
+        finally:
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._waiting,
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "requests": self._requests,
+            "throttled": self._throttled,
+            "retries": self._retries,
+            "exhausted": self._exhausted,
+            "paused_for": round(self.paused_for, 2),
+            "rate_limit": self._bucket.stats(),
+        }
+
+
+_schedulers: dict[str, GraphScheduler] = {}
+
+
+def get_scheduler(tenant_id: str, **kwargs) -> GraphScheduler:
+    """Returns the GraphScheduler shared by every client of the tenant."""
+    scheduler = _schedulers.get(tenant_id)
+    if scheduler is None:
+        scheduler = GraphScheduler(**kwargs)
+        _schedulers[tenant_id] = scheduler
+    return scheduler
@@ -0,0 +1,143 @@
+"""
+Microsoft Graph Access Tokens.
+
+Client-credentials tokens with an expiry-aware lifecycle, shared by every
+GraphClient using the same tenant and client id.
+"""
+import asyncio
+import time
+from typing import Optional
+from navconfig.logging import logging
+from ..cache import SingleFlight
+from ..sessions import get_session
+
+
+GRAPH_SCOPE = "https://graph.microsoft.com/.default"
+TOKEN_URL = "https://login.microsoftonline.com/{tenant_id}/oauth2/v2.0/token"
+
+
+class TokenProvider:
+    """Access Token for a (tenant, client id) pair.
+
+    The token is cached until it expires. Once inside the refresh window
+    (`refresh_margin` seconds before expiration) the current token is still
+    returned while a new one is requested in background, so callers only
+    wait for the token endpoint when there is no valid token at all.
+    Concurrent refreshes are deduplicated.
+
+    Args:
+        tenant_id: Azure AD tenant.
+        client_id: Application (client) id.
+        client_secret: Application secret.
+        scope: requested scope.
+        refresh_margin: seconds before expiration to refresh the token.
+        token_url: token endpoint (defaults to the Azure AD v2.0 endpoint).
+    """
+
+    def __init__(
+        self,
+        tenant_id: str,
+        client_id: str,
+        client_secret: str,
+        scope: str = GRAPH_SCOPE,
+        refresh_margin: float = 300,
+        token_url: Optional[str] = None
+    ):
+        self.tenant_id = tenant_id
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.scope = scope
+        self.refresh_margin: float = refresh_margin
+        self.token_url = token_url or TOKEN_URL.format(tenant_id=tenant_id)
+        self._token: Optional[str] = None
+        self._expires_at: float = 0
+        self._flight = SingleFlight()
+        self._background: Optional[asyncio.Task] = None
+        self._refreshes: int = 0
+        self.logger = logging.getLogger("AzureBot.GraphClient.Tokens")
+
+    @property
+    def token(self) -> Optional[str]:
+        return self._token if self.is_valid() else None
+
+    @property
+    def expires_in(self) -> float:
+        return max(self._expires_at - time.monotonic(), 0)
+
+    def is_valid(self) -> bool:
+        return self._token is not None and self.expires_in > 0
+
+    async def get_token(self) -> Optional[str]:
+        """Returns a valid access token (None if it cannot be acquired)."""
+        if self.is_valid():
+            if self.expires_in <= self.refresh_margin and (
+                self._background is None or self._background.done()
+            ):
+                self._background = asyncio.create_task(self.refresh())
+            return self._token
+        return await self.refresh()
+
+    async def refresh(self) -> Optional[str]:
+        """Requests a new token (concurrent calls share the same request)."""
+        return await self._flight.do('token', self._fetch_token)
+
+    def invalidate(self) -> None:
+        """Discards the cached token (ex: after a 401 from Graph)."""
+        self._token = None
+        self._expires_at = 0
+
+    async def _fetch_token(self) -> Optional[str]:
+        payload = {
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "scope": self.scope,
+            "grant_type": "client_credentials"
+        }
+        try:
+            session = get_session('graph')
+            async with session.post(self.token_url, data=payload) as response:
+                if response.status == 200:
+                    result = await response.json()
+                else:
+                    error_text = await response.text()
+                    self.logger.error(f"Error getting access token: {error_text}")
+                    return self.token
+        except Exception as e:
+            self.logger.error(f"Exception during token acquisition: {str(e)}")
+            return self.token
+        self._token = result.get("access_token")
+        self._expires_at = time.monotonic() + int(result.get("expires_in", 3599))
+        self._refreshes += 1
+        return self._token
+
+    async def close(self) -> None:
+        if self._background is not None and not self._background.done():
+            self._background.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "valid": self.is_valid(),
+            "expires_in": int(self.expires_in),
+            "refreshes": self._refreshes,
+        }
+
+
+_providers: dict[tuple, TokenProvider] = {}
+
+
+def get_token_provider(
+    tenant_id: str,
+    client_id: str,
+    client_secret: str,
+    scope: str = GRAPH_SCOPE,
+    **kwargs
+) -> TokenProvider:
+    """Returns the TokenProvider shared by (tenant, client id, scope)."""
+    key = (tenant_id, client_id, scope)
+    provider = _providers.get(key)
+    if provider is None or provider.client_secret != client_secret:
+        provider = TokenProvider(
+            tenant_id, client_id, client_secret, scope=scope, **kwargs
+        )
+        _providers[key] = provider
+    return provider
@@ -0,0 +1,339 @@
+"""
+Channel Message Ingestion.
+
+Backfills and then incrementally syncs the messages of Teams channels
+(Microsoft Graph `messages/delta`), with a persisted cursor per channel,
+writing them through a batched asynchronous sink.
+"""
+import asyncio
+import json
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Optional, Union
+from botbuilder.core import Storage
+from navconfig.logging import logging
+from .conf import (
+    AZUREBOT_INGEST_BATCH_SIZE,
+    AZUREBOT_INGEST_FLUSH_INTERVAL,
+    AZUREBOT_INGEST_INTERVAL,
+    AZUREBOT_INGEST_CHECKPOINT,
+    AZUREBOT_INGEST_MAX_BUFFER,
+)
+from .graph import GraphClient, GraphPager
+
+
+MessageWriter = Callable[[list[dict]], Awaitable[None]]
+
+
+class BatchedSink:
+    """Buffers items and hands them to `writer` in batches.
+
+    A batch is written when `batch_size` items are buffered or every
+    `flush_interval` seconds. Items of a failed batch are kept and written
+    again with the next one, up to `max_buffer` items: past it, the oldest
+    are dropped (and counted in `dropped`).
+
+    Args:
+        writer: coroutine receiving a list of items.
+        batch_size: items per batch.
+        flush_interval: seconds between two periodic flushes.
+        max_buffer: items kept while the writer fails.
+    """
+
+    def __init__(
+        self,
+        writer: MessageWriter,
+        batch_size: int = AZUREBOT_INGEST_BATCH_SIZE,
+        flush_interval: float = AZUREBOT_INGEST_FLUSH_INTERVAL,
+        max_buffer: int = AZUREBOT_INGEST_MAX_BUFFER
+    ):
+        self.writer = writer
+        self.batch_size: int = batch_size
+        self.flush_interval: float = flush_interval
+        self.max_buffer: int = max(max_buffer, batch_size)
+        self._buffer: list[dict] = []
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._batches: int = 0
+        self._written: int = 0
+        self._failures: int = 0
+        self.dropped: int = 0
+        self.logger = logging.getLogger('AzureBot.Ingestion.Sink')
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def _trim(self) -> None:
+        excess = len(self._buffer) - self.max_buffer
+        if excess > 0:
+            del self._buffer[:excess]
+            self.dropped += excess
+            self.logger.warning(f"Sink buffer full, {excess} items dropped")
+
+    async def write(self, items: list[dict]) -> None:
+        self._buffer.extend(items)
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Writes every buffered item (raises if the writer fails)."""
+        async with self._lock:
+            while self._buffer:
+                batch = self._buffer[:self.batch_size]
+                del self._buffer[:self.batch_size]
+                try:
+                    await self.writer(batch)
+                except Exception:
+                    self._failures += 1
+                    self._buffer[:0] = batch
+                    self._trim()
+                    raise
+                self._batches += 1
+                self._written += len(batch)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as exc:  # pylint: disable=W0718
+                self.logger.error(f"Error writing messages: {exc}")
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "batches": self._batches,
+            "written": self._written,
+            "failures": self._failures,
+            "dropped": self.dropped,
+        }
+
+
+class JSONLinesWriter:
+    """Appends items to a JSON-lines file (off the event loop)."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+
+    def _append(self, lines: str) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+
+    async def __call__(self, items: list[dict]) -> None:
+        lines = ''.join(json.dumps(item, ensure_ascii=False) + '\n' for item in items)
+        await asyncio.get_running_loop().run_in_executor(None, self._append, lines)
+
+
+def to_message(team_id: str, channel_id: str, message: dict) -> dict:
+    """Flattens a Graph chatMessage."""
+    sender = (message.get('from') or {}).get('user') or {}
+    body = message.get('body') or {}
+    return {
+        "id": message.get('id'),
+        "team_id": team_id,
+        "channel_id": channel_id,
+        "reply_to_id": message.get('replyToId'),
+        "created": message.get('createdDateTime'),
+        "modified": message.get('lastModifiedDateTime'),
+        "deleted": message.get('deletedDateTime'),
+        "user_id": sender.get('id'),
+        "user_name": sender.get('displayName'),
+        "subject": message.get('subject'),
+        "content_type": body.get('contentType'),
+        "content": body.get('content'),
+        "importance": message.get('importance'),
+    }
+
+
+class ChannelIngestor:
+    """Syncs the messages of the tracked channels into a sink.
+
+    The first sync of a channel backfills its history through the Graph
+    delta query; next syncs only fetch what changed (new, edited and
+    deleted messages). Cursors (delta link, or next page while backfilling)
+    are saved every `checkpoint` pages, after the sink was flushed, so a
+    restart resumes where it stopped. A cursor never moves past messages
+    the sink dropped: they are fetched again on the next sync.
+
+    Args:
+        client: GraphClient.
+        storage: durable Storage for the cursors and the tracked channels
+          (not the bot state, whose entries can expire).
+        sink: BatchedSink receiving the messages.
+        interval: seconds between two syncs of the tracked channels.
+        checkpoint: pages between two cursor saves.
+    """
+    channels_key: str = 'ingestion/channels'
+
+    def __init__(
+        self,
+        client: GraphClient,
+        storage: Storage,
+        sink: BatchedSink,
+        interval: float = AZUREBOT_INGEST_INTERVAL,
+        checkpoint: int = AZUREBOT_INGEST_CHECKPOINT
+    ):
+        self.client = client
+        self.storage = storage
+        self.sink = sink
+        self.interval: float = interval
+        self.checkpoint: int = max(checkpoint, 1)
+        self._channels: Optional[dict[str, list]] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._syncs: int = 0
+        self._messages: int = 0
+        self._errors: int = 0
+        self.logger = logging.getLogger('AzureBot.Ingestion')
+
+    @staticmethod
+    def cursor_key(team_id: str, channel_id: str) -> str:
+        return f"ingestion/{team_id}/{channel_id}"
+
+    async def _read(self, key: str) -> dict:
+        data = await self.storage.read([key])
+        return data.get(key) or {}
+
+    async def channels(self) -> dict[str, list]:
+        if self._channels is None:
+            self._channels = (await self._read(self.channels_key)).get('channels', {})
+        return self._channels
+
+    async def track(
+        self,
+        team_id: str,
+        channel_id: str,
+        group_id: Optional[str] = None
+    ) -> None:
+        """Adds a channel to the ingestion (synced on the next round).
+
+        Args:
+            team_id: Teams team (thread) id, written with the messages.
+            channel_id: channel (thread) id.
+            group_id: AAD group id of the team, used by the Graph API
+              (defaults to `team_id`).
+        """
+        channels = await self.channels()
+        key = self.cursor_key(team_id, channel_id)
+        entry = [team_id, channel_id, group_id or team_id]
+        if channels.get(key) == entry:
+            return
+        channels[key] = entry
+        await self.storage.write({self.channels_key: {"channels": channels}})
+        self._wakeup.set()
+
+    async def sync_channel(
+        self,
+        team_id: str,
+        channel_id: str,
+        group_id: Optional[str] = None
+    ) -> int:
+        """Fetches the new messages of a channel, returns how many."""
+        key = self.cursor_key(team_id, channel_id)
+        cursor = await self._read(key)
+        url = cursor.get('next_link') or cursor.get('delta_link') or (
+            f"teams/{group_id or team_id}/channels/{channel_id}/messages/delta"
+        )
+        # no read-ahead: the pager position is the resume point.
+        pager = GraphPager(self.client, url, prefetch=0)
+        dropped = self.sink.dropped
+        count = 0
+        pending = 0
+        async for page in pager.pages():
+            await self.sink.write(
+                [to_message(team_id, channel_id, message) for message in page]
+            )
+            count += len(page)
+            pending += 1
+            if pager.delta_link:
+                cursor = {"delta_link": pager.delta_link}
+            else:
+                cursor = {**cursor, "next_link": pager.next_link}
+            if pending >= self.checkpoint:
+                if not await self._save_cursor(key, cursor, dropped):
+                    return count
+                pending = 0
+        if pending and not await self._save_cursor(key, cursor, dropped):
+            return count
+        if pager.error == 410:
+            # expired delta token: backfill again.
+            self.logger.warning(f"Delta token expired for channel {channel_id}")
+            await self.storage.delete([key])
+        elif pager.error is not None:
+            self._errors += 1
+        self._messages += count
+        return count
+
+    async def _save_cursor(self, key: str, cursor: dict, dropped: int) -> bool:
+        # messages are written before the cursor moves past them.
+        await self.sink.flush()
+        if self.sink.dropped != dropped:
+            self._errors += 1
+            self.logger.error(f"Messages of {key} were dropped, cursor not saved")
+            return False
+        await self.storage.write({key: cursor})
+        return True
+
+    async def sync(self) -> int:
+        """Syncs every tracked channel, returns the number of messages."""
+        total = 0
+        for team_id, channel_id, *group_id in list((await self.channels()).values()):
+            try:
+                total += await self.sync_channel(team_id, channel_id, *group_id)
+            except Exception as exc:  # pylint: disable=W0718
+                self._errors += 1
+                self.logger.error(f"Error syncing channel {channel_id}: {exc}")
+        self._syncs += 1
+        return total
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            await self.sync()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self) -> None:
+        if callable(getattr(self.storage, 'open', None)):
+            await self.storage.open()
+        await self.sink.start()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.sink.close()
+        if callable(getattr(self.storage, 'close', None)):
+            await self.storage.close()
+
+    def stats(self) -> dict:
+        return {
+            "channels": len(self._channels or {}),
+            "syncs": self._syncs,
+            "messages": self._messages,
+            "errors": self._errors,
+            "sink": self.sink.stats(),
+        }
@@ -0,0 +1,114 @@
+"""
+Mention parsing.
+
+Parses the text and the mention entities of a message once per turn:
+who was mentioned, whether the bot was, the text without the mentions and
+the command with its arguments. The result is cached on the TurnContext.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Any, Optional
+from botbuilder.core import TurnContext
+from botbuilder.schema import Activity
+
+
+_MENTION = re.compile(r'<at[^>]*>([^<]*)</at>')
+
+
+@dataclass(slots=True)
+class ParsedMessage:
+    """A message text, parsed."""
+    text: str = ''
+    # text without the mentions (whitespace collapsed)
+    clean: str = ''
+    # names of the <at> mentions, in order
+    mentions: list[str] = field(default_factory=list)
+    bot_mentioned: bool = False
+    # first word of the clean text (lowercase) and the rest
+    command: str = ''
+    args: str = ''
+    # text after the trigger word (None: no trigger word)
+    triggered: Optional[str] = None
+
+
+def _mentioned_id(entity: Any) -> Optional[str]:
+    mentioned = getattr(entity, 'mentioned', None)
+    if mentioned is None:
+        mentioned = (getattr(entity, 'additional_properties', None) or {}).get('mentioned')
+    if isinstance(mentioned, dict):
+        return mentioned.get('id')
+    return getattr(mentioned, 'id', None)
+
+
+class MentionParser:
+    """Per-bot mention parser (patterns are compiled once).
+
+    Args:
+        bot_name: display name of the bot in the <at> mentions.
+        trigger: optional trigger word (`ParsedMessage.triggered` holds the
+          text after its first occurrence, case-insensitive).
+    """
+    state_key: str = 'AzureBot.message'
+
+    def __init__(self, bot_name: str, trigger: Optional[str] = None):
+        self.bot_name: str = bot_name or ''
+        self._bot_name: str = self.bot_name.strip().lower()
+        self.trigger: Optional[str] = trigger
+        self._trigger: str = trigger.lower() if trigger else ''
+        self._trigger_re = re.compile(re.escape(trigger), re.IGNORECASE) if trigger else None
+
+    def parse_text(self, text: Optional[str]) -> ParsedMessage:
+        """Parses a message text (mentions in the Teams <at>Name</at> form)."""
+        if not text:
+            return ParsedMessage()
+        bot_mentioned = False
+        mentions = []
+        clean = text
+        if '<at' in text:
+            # [text, mention, text, mention..., text]
+            parts = _MENTION.split(text)
+            if len(parts) > 1:
+                mentions = [name.strip() for name in parts[1::2]]
+                bot_mentioned = self._bot_name in [name.lower() for name in mentions]
+                clean = ' '.join(' '.join(parts[0::2]).split())
+        clean = clean.strip()
+        words = clean.split(None, 1)
+        triggered = None
+        if self._trigger:
+            lowered = clean.lower()
+            if len(lowered) == len(clean):
+                found = lowered.find(self._trigger)
+                if found != -1:
+                    triggered = clean[found + len(self._trigger):].strip()
+            elif (match := self._trigger_re.search(clean)) is not None:
+                # lowercase changed the length: offsets differ.
+                triggered = clean[match.end():].strip()
+        return ParsedMessage(
+            text,
+            clean,
+            mentions,
+            bot_mentioned,
+            words[0].lower() if words else '',
+            words[1] if len(words) > 1 else '',
+            triggered
+        )
+
+    def parse(self, activity: Activity) -> ParsedMessage:
+        """Parses a message activity (text and mention entities)."""
+        message = self.parse_text(activity.text)
+        if not message.bot_mentioned and activity.entities and activity.recipient:
+            # mentioned by id (display name can differ from the bot name).
+            recipient = activity.recipient.id
+            for entity in activity.entities:
+                if entity.type == 'mention' and _mentioned_id(entity) == recipient:
+                    message.bot_mentioned = True
+                    break
+        return message
+
+    def get(self, turn_context: TurnContext) -> ParsedMessage:
+        """The parsed message of a turn (parsed on first use)."""
+        message = turn_context.turn_state.get(self.state_key)
+        if message is None:
+            message = self.parse(turn_context.activity)
+            turn_context.turn_state[self.state_key] = message
+        return message
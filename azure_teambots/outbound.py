@@ -0,0 +1,245 @@
+"""
+Outbound Activities.
+
+Teams throttles the messages of a bot per conversation (about 7 per
+second, 60 per 30 seconds, tighter per thread) and per bot, answering
+bursts with 429 (Too Many Requests). OutboundScheduler sends the
+activities of every conversation in order under a per-conversation and a
+per-bot token bucket, honors Retry-After (pausing the conversation) and
+retries throttled sends with a jittered exponential backoff.
+"""
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any, Optional
+from navconfig.logging import logging
+from .conf import (
+    AZUREBOT_SEND_RATE,
+    AZUREBOT_SEND_BURST,
+    AZUREBOT_SEND_BOT_RATE,
+    AZUREBOT_SEND_BOT_BURST,
+    AZUREBOT_SEND_MAX_PENDING,
+    AZUREBOT_SEND_MAX_RETRIES,
+    AZUREBOT_SEND_BACKOFF,
+    AZUREBOT_SEND_MAX_BACKOFF,
+)
+from .exceptions import OutboundQueueFull
+from .ratelimit import TokenBucket, parse_retry_after
+
+
+RETRY_STATUS = (429, 503)
+
+
+def error_status(error: Exception) -> Optional[int]:
+    """HTTP status of a Bot Connector error (None if not an HTTP error)."""
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds requested by the Retry-After header of an error response."""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    return parse_retry_after(headers.get('Retry-After'))
+
+
+class _Conversation:
+    """Send queue of a conversation."""
+    __slots__ = ('bucket', 'lock', 'pending', 'paused_until')
+
+    def __init__(self, rate: float, burst: int):
+        self.bucket = TokenBucket(rate, burst)
+        self.lock = asyncio.Lock()
+        self.pending: int = 0
+        self.paused_until: float = 0
+
+    @property
+    def paused_for(self) -> float:
+        return max(self.paused_until - time.monotonic(), 0)
+
+    def is_idle(self) -> bool:
+        return (
+            self.pending == 0
+            and self.paused_for == 0
+            and self.bucket.tokens >= self.bucket.capacity
+        )
+
+
+class OutboundScheduler:
+    """Schedules the activities sent by a bot.
+
+    Activities of a conversation are sent one at a time, in order, at
+    `rate` per second (bursts of `burst`); every send also takes a token
+    of the bot bucket. A throttled send is retried up to `max_retries`
+    times, after what Retry-After asks (the conversation is paused
+    meanwhile) or a jittered exponential backoff.
+
+    Args:
+        rate: activities per second and conversation (0 disables the limit).
+        burst: maximum burst of activities of a conversation.
+        bot_rate: activities per second of the bot (0 disables the limit).
+        bot_burst: maximum burst of activities of the bot.
+        max_pending: activities of a conversation waiting to be sent, over
+          which new ones are dropped (raising OutboundQueueFull).
+        max_retries: retries of a throttled send.
+        backoff: base delay (in seconds) of the exponential backoff.
+        max_backoff: maximum delay (in seconds) between retries.
+    """
+
+    def __init__(
+        self,
+        rate: float = AZUREBOT_SEND_RATE,
+        burst: int = AZUREBOT_SEND_BURST,
+        bot_rate: float = AZUREBOT_SEND_BOT_RATE,
+        bot_burst: int = AZUREBOT_SEND_BOT_BURST,
+        max_pending: int = AZUREBOT_SEND_MAX_PENDING,
+        max_retries: int = AZUREBOT_SEND_MAX_RETRIES,
+        backoff: float = AZUREBOT_SEND_BACKOFF,
+        max_backoff: float = AZUREBOT_SEND_MAX_BACKOFF
+    ):
+        self.rate: float = rate
+        self.burst: int = burst
+        self.max_pending: int = max_pending
+        self.max_retries: int = max_retries
+        self.backoff: float = backoff
+        self.max_backoff: float = max_backoff
+        self._bucket = TokenBucket(bot_rate, bot_burst)
+        self._conversations: dict[str, _Conversation] = {}
+        self._sweep_at: int = 1024
+        self._queued: int = 0
+        self._active: int = 0
+        self._sent: int = 0
+        self._throttled: int = 0
+        self._retries: int = 0
+        self._dropped: int = 0
+        self._failed: int = 0
+        self.logger = logging.getLogger("AzureBot.Outbound")
+
+    def _conversation(self, conversation_id: str) -> _Conversation:
+        conversation = self._conversations.get(conversation_id)
+        if conversation is None:
+            if len(self._conversations) >= self._sweep_at:
+                self._sweep()
+            conversation = _Conversation(self.rate, self.burst)
+            self._conversations[conversation_id] = conversation
+        return conversation
+
+    def _sweep(self) -> None:
+        """Forgets the conversations with nothing pending and a full bucket."""
+        self._conversations = {
+            key: conversation for key, conversation in self._conversations.items()
+            if not conversation.is_idle()
+        }
+        self._sweep_at = max(1024, len(self._conversations) * 2)
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter."""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def should_retry(
+        self,
+        conversation: _Conversation,
+        error: Exception,
+        attempt: int
+    ) -> Optional[float]:
+        """Seconds to wait before retrying a failed send.
+
+        None if the send was not throttled or ran out of retries.
+        """
+        status = error_status(error)
+        if status not in RETRY_STATUS:
+            self._failed += 1
+            return None
+        self._throttled += 1
+        if attempt >= self.max_retries:
+            self._dropped += 1
+            self.logger.warning(
+                f"Activity dropped, still throttled after {attempt} retries "
+                f"(Status: {status})"
+            )
+            return None
+        self._retries += 1
+        delay = retry_after(error)
+        if delay is None:
+            return self.backoff_delay(attempt)
+        # the next activities of the conversation wait as well.
+        conversation.paused_until = max(
+            conversation.paused_until, time.monotonic() + delay
+        )
+        return min(delay, self.max_backoff)
+
+    async def send(
+        self,
+        conversation_id: str,
+        send: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Runs `send` in the conversation queue, retrying throttled sends."""
+        conversation = self._conversation(conversation_id)
+        if conversation.pending >= self.max_pending:
+            self._dropped += 1
+            raise OutboundQueueFull(
+                f"Conversation {conversation_id} has {conversation.pending} "
+                "activities waiting to be sent"
+            )
+        conversation.pending += 1
+        self._queued += 1
+        queued = True
+        try:
+            async with conversation.lock:
+                attempt = 0
+                while True:
+                    while (paused := conversation.paused_for) > 0:
+                        await asyncio.sleep(paused)
+                    await conversation.bucket.acquire()
+                    await self._bucket.acquire()
+                    if queued:
+                        queued = False
+                        self._queued -= 1
+                    self._active += 1
+                    try:
+                        result = await send()
+                    except Exception as exc:
+                        error = exc
+                    else:
+                        self._sent += 1
+                        return result
+                    finally:
+                        self._active -= 1
+                    delay = self.should_retry(conversation, error, attempt)
+                    if delay is None:
+                        raise error
+                    attempt += 1
+                    await asyncio.sleep(delay)
+        finally:
+            if queued:
+                self._queued -= 1
+            conversation.pending -= 1
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queued,
+            "active": self._active,
+            "sent": self._sent,
+            "throttled": self._throttled,
+            "retries": self._retries,
+            "dropped": self._dropped,
+            "failed": self._failed,
+            "conversations": len(self._conversations),
+            "paused": sum(
+                1 for conversation in self._conversations.values()
+                if conversation.paused_for > 0
+            ),
+            "rate_limit": self._bucket.stats(),
+        }
+
+
+_schedulers: dict[str, OutboundScheduler] = {}
+
+
+def get_outbound(app_id: str, **kwargs) -> OutboundScheduler:
+    """Returns the OutboundScheduler shared by the bots of an app id."""
+    scheduler = _schedulers.get(app_id)
+    if scheduler is None:
+        scheduler = OutboundScheduler(**kwargs)
+        _schedulers[app_id] = scheduler
+    return scheduler
@@ -0,0 +1,12 @@
+"""
+Proactive messages: conversation references and broadcasts.
+"""
+from .references import ConversationReferenceStore, conversation_references
+from .broadcast import BroadcastEngine, BroadcastProgress
+
+__all__ = (
+    'ConversationReferenceStore',
+    'conversation_references',
+    'BroadcastEngine',
+    'BroadcastProgress',
+)
@@ -0,0 +1,452 @@
+"""
+Proactive Broadcasts.
+
+Sends an activity to every conversation matching a filter (conversation
+type, tenant, team...) with `continue_conversation`. The targets of a
+broadcast are snapshotted in a journal, next to the conversation
+references, and their status is checkpointed while it runs: a broadcast
+interrupted by a crash or a shutdown resumes with the targets not sent.
+A worker runs a broadcast under a lease (renewed at every checkpoint), so
+processes sharing the database never send the same broadcast twice.
+Sends go through the adapter, so the outbound rate limits apply.
+"""
+import asyncio
+import inspect
+import json
+import sqlite3
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any, Optional, Union
+from botbuilder.core import CloudAdapterBase, MessageFactory, TurnContext
+from botbuilder.schema import Activity, ConversationReference
+from navconfig.logging import logging
+from ..conf import (
+    AZUREBOT_BROADCAST_CONCURRENCY,
+    AZUREBOT_BROADCAST_CHECKPOINT,
+    AZUREBOT_BROADCAST_LEASE,
+    AZUREBOT_BROADCAST_RETRIES,
+    AZUREBOT_SEND_BACKOFF,
+    AZUREBOT_SEND_MAX_BACKOFF,
+)
+from ..exceptions import BroadcastBusy, OutboundQueueFull
+from ..outbound import RETRY_STATUS, error_status
+from .references import ConversationReferenceStore
+
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS broadcast_jobs ("
+    "job_id TEXT PRIMARY KEY, app_id TEXT NOT NULL, activity TEXT NOT NULL, "
+    "state TEXT NOT NULL, total INTEGER NOT NULL, created REAL NOT NULL, "
+    "owner TEXT, lease REAL)",
+    "CREATE TABLE IF NOT EXISTS broadcast_targets ("
+    "job_id TEXT NOT NULL, conversation_id TEXT NOT NULL, "
+    "status TEXT NOT NULL, error TEXT, "
+    "PRIMARY KEY (job_id, conversation_id))",
+    "CREATE INDEX IF NOT EXISTS ix_broadcast_targets_status "
+    "ON broadcast_targets (job_id, status, conversation_id)",
+)
+
+PENDING = 'pending'
+SENT = 'sent'
+FAILED = 'failed'
+
+RUNNING = 'running'
+DONE = 'done'
+
+# the bot can no longer write to the conversation.
+GONE_STATUS = (403, 404)
+
+
+@dataclass
+class BroadcastProgress:
+    """Progress of a broadcast."""
+    job_id: str
+    total: int = 0
+    sent: int = 0
+    failed: int = 0
+    # still throttled after the retries: left pending for the next run.
+    deferred: int = 0
+    errors: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def pending(self) -> int:
+        return self.total - self.sent - self.failed
+
+    @property
+    def done(self) -> bool:
+        return self.pending == 0
+
+
+ProgressCallback = Callable[[BroadcastProgress], Union[Awaitable[None], None]]
+
+
+class BroadcastEngine:
+    """Broadcasts of a bot.
+
+    Args:
+        adapter: adapter of the bot (continue_conversation).
+        store: conversation references (the journal shares its database).
+        app_id: Microsoft App ID of the bot.
+        concurrency: conversations messaged at the same time.
+        checkpoint: statuses written to the journal at once.
+        page_size: targets read from the journal at once.
+        lease: seconds the engine owns a broadcast it runs (renewed at
+          every checkpoint); an expired lease can be claimed by another one.
+        retries: passes over the throttled targets, after the first one.
+        backoff: base delay (in seconds) before a pass over the throttled targets.
+        max_backoff: maximum delay (in seconds) between two passes.
+    """
+
+    def __init__(
+        self,
+        adapter: CloudAdapterBase,
+        store: ConversationReferenceStore,
+        app_id: str,
+        concurrency: int = AZUREBOT_BROADCAST_CONCURRENCY,
+        checkpoint: int = AZUREBOT_BROADCAST_CHECKPOINT,
+        page_size: int = 1000,
+        lease: float = AZUREBOT_BROADCAST_LEASE,
+        retries: int = AZUREBOT_BROADCAST_RETRIES,
+        backoff: float = AZUREBOT_SEND_BACKOFF,
+        max_backoff: float = AZUREBOT_SEND_MAX_BACKOFF
+    ):
+        self.adapter = adapter
+        self.store = store
+        self.app_id: str = app_id
+        self.concurrency: int = concurrency
+        self.checkpoint: int = checkpoint
+        self.page_size: int = page_size
+        self.lease: float = lease
+        self.retries: int = retries
+        self.backoff: float = backoff
+        self.max_backoff: float = max_backoff
+        # owner of the broadcasts run by this engine.
+        self.owner: str = uuid.uuid4().hex
+        self.store.add_schema(SCHEMA)
+        self._jobs: dict[str, asyncio.Task] = {}
+        self._progress: dict[str, BroadcastProgress] = {}
+        self.logger = logging.getLogger('AzureBot.Broadcast')
+
+    ## Journal
+    async def create(
+        self,
+        activity: Union[Activity, str],
+        job_id: Optional[str] = None,
+        **filters: Any
+    ) -> str:
+        """Records a broadcast of `activity` to the conversations matching
+        `filters` (see ConversationReferenceStore.find), returns its id."""
+        if isinstance(activity, str):
+            activity = MessageFactory.text(activity)
+        job_id = job_id or uuid.uuid4().hex
+        if self.store.path == ':memory:':
+            self.logger.warning(
+                f"Broadcast {job_id}: the journal is in memory, "
+                "it will not resume after a restart"
+            )
+        where, params = self.store.where(self.app_id, **filters)
+        payload = json.dumps(activity.serialize())
+
+        def _create(conn: sqlite3.Connection) -> None:
+            with conn:
+                conn.execute(
+                    "INSERT INTO broadcast_jobs "
+                    "(job_id, app_id, activity, state, total, created) "
+                    "VALUES (?, ?, ?, ?, 0, ?)",
+                    (job_id, self.app_id, payload, RUNNING, time.time())
+                )
+                conn.execute(
+                    "INSERT INTO broadcast_targets (job_id, conversation_id, status) "
+                    f"SELECT ?, conversation_id, ? FROM conversation_references "
+                    f"WHERE {where}",
+                    [job_id, PENDING, *params]
+                )
+                conn.execute(
+                    "UPDATE broadcast_jobs SET total = ("
+                    "SELECT COUNT(*) FROM broadcast_targets WHERE job_id = ?"
+                    ") WHERE job_id = ?",
+                    (job_id, job_id)
+                )
+        await self.store.execute(_create)
+        return job_id
+
+    async def progress(self, job_id: str) -> BroadcastProgress:
+        """Progress of a broadcast, as recorded in the journal."""
+        def _progress(conn: sqlite3.Connection) -> dict:
+            return dict(conn.execute(
+                "SELECT status, COUNT(*) FROM broadcast_targets "
+                "WHERE job_id = ? GROUP BY status",
+                (job_id,)
+            ).fetchall())
+        counts = await self.store.execute(_progress)
+        return BroadcastProgress(
+            job_id,
+            total=sum(counts.values()),
+            sent=counts.get(SENT, 0),
+            failed=counts.get(FAILED, 0)
+        )
+
+    async def unfinished(self) -> list[str]:
+        """Broadcasts of this bot with targets still pending."""
+        def _unfinished(conn: sqlite3.Connection) -> list[str]:
+            return [row[0] for row in conn.execute(
+                "SELECT job_id FROM broadcast_jobs WHERE app_id = ? AND state = ? "
+                "ORDER BY created",
+                (self.app_id, RUNNING)
+            )]
+        return await self.store.execute(_unfinished)
+
+    def _pending(
+        self, conn: sqlite3.Connection, job_id: str, after: str
+    ) -> list[tuple[str, Optional[str]]]:
+        return conn.execute(
+            "SELECT t.conversation_id, r.reference FROM broadcast_targets t "
+            "LEFT JOIN conversation_references r "
+            "ON r.app_id = ? AND r.conversation_id = t.conversation_id "
+            "WHERE t.job_id = ? AND t.status = ? AND t.conversation_id > ? "
+            "ORDER BY t.conversation_id LIMIT ?",
+            (self.app_id, job_id, PENDING, after, self.page_size)
+        ).fetchall()
+
+    @staticmethod
+    def _save(conn: sqlite3.Connection, job_id: str, results: list[tuple]) -> None:
+        with conn:
+            conn.executemany(
+                "UPDATE broadcast_targets SET status = ?, error = ? "
+                "WHERE job_id = ? AND conversation_id = ?",
+                [(status, error, job_id, target) for target, status, error in results]
+            )
+
+    def _claim(self, conn: sqlite3.Connection, job_id: str) -> bool:
+        """Takes (or renews) the lease of a running broadcast."""
+        now = time.time()
+        with conn:
+            cursor = conn.execute(
+                "UPDATE broadcast_jobs SET owner = ?, lease = ? "
+                "WHERE job_id = ? AND app_id = ? AND state = ? "
+                "AND (owner IS NULL OR owner = ? OR lease < ?)",
+                (self.owner, now + self.lease, job_id, self.app_id, RUNNING,
+                 self.owner, now)
+            )
+        return cursor.rowcount == 1
+
+    def _release(self, conn: sqlite3.Connection, job_id: str) -> None:
+        with conn:
+            conn.execute(
+                "UPDATE broadcast_jobs SET owner = NULL, lease = NULL "
+                "WHERE job_id = ? AND owner = ?",
+                (job_id, self.owner)
+            )
+
+    @staticmethod
+    def _finish(conn: sqlite3.Connection, job_id: str) -> None:
+        with conn:
+            conn.execute(
+                "UPDATE broadcast_jobs SET state = ? WHERE job_id = ? AND NOT EXISTS ("
+                "SELECT 1 FROM broadcast_targets WHERE job_id = ? AND status = ?)",
+                (DONE, job_id, job_id, PENDING)
+            )
+
+    ## Delivery
+    async def _deliver(self, reference: ConversationReference, activity: Activity) -> None:
+        async def callback(turn_context: TurnContext):
+            await turn_context.send_activity(activity)
+        await self.adapter.continue_conversation(reference, callback, self.app_id)
+
+    async def _send(
+        self, payload: dict, target: str, reference: Optional[str]
+    ) -> tuple[str, Optional[str], Optional[str]]:
+        """(target, status, error) of a send, status None if deferred."""
+        if reference is None:
+            return target, FAILED, "Unknown conversation"
+        try:
+            await self._deliver(
+                ConversationReference().deserialize(json.loads(reference)),
+                Activity().deserialize(payload)
+            )
+        except OutboundQueueFull:
+            return target, None, None
+        except Exception as exc:  # pylint: disable=W0718
+            status = error_status(exc)
+            if status in RETRY_STATUS:
+                return target, None, None
+            if status in GONE_STATUS:
+                await self.store.deactivate(self.app_id, target)
+            return target, FAILED, str(exc) or type(exc).__name__
+        return target, SENT, None
+
+    async def run(
+        self,
+        job_id: str,
+        progress: Optional[ProgressCallback] = None
+    ) -> BroadcastProgress:
+        """Sends the pending targets of a broadcast.
+
+        `progress` is called at every checkpoint with the progress so far.
+        Raises BroadcastBusy if another worker holds the broadcast lease.
+        """
+        def _job(conn: sqlite3.Connection):
+            return conn.execute(
+                "SELECT activity, state FROM broadcast_jobs "
+                "WHERE job_id = ? AND app_id = ?",
+                (job_id, self.app_id)
+            ).fetchone()
+        row = await self.store.execute(_job)
+        if row is None:
+            raise ValueError(f"Unknown broadcast: {job_id}")
+        payload = json.loads(row[0])
+        if row[1] == RUNNING and not await self.store.execute(self._claim, job_id):
+            raise BroadcastBusy(f"Broadcast {job_id} is run by another worker")
+        try:
+            return await self._run(job_id, payload, progress)
+        finally:
+            await asyncio.shield(self.store.execute(self._release, job_id))
+
+    async def _run(
+        self,
+        job_id: str,
+        payload: dict,
+        progress: Optional[ProgressCallback]
+    ) -> BroadcastProgress:
+        state = await self.progress(job_id)
+        self._progress[job_id] = state
+        results: list[tuple] = []
+        lost = asyncio.Event()
+
+        async def checkpoint():
+            if results:
+                batch = results[:]
+                results.clear()
+                await self.store.execute(self._save, job_id, batch)
+            if not await self.store.execute(self._claim, job_id):
+                # the lease expired and another worker took the broadcast.
+                lost.set()
+            if progress is not None:
+                outcome = progress(state)
+                if inspect.isawaitable(outcome):
+                    await outcome
+
+        async def send_pending():
+            after = ''
+            while not lost.is_set():
+                page = await self.store.execute(self._pending, job_id, after)
+                if not page:
+                    break
+                after = page[-1][0]
+                targets = iter(page)
+
+                async def worker():
+                    for target, reference in targets:
+                        if lost.is_set():
+                            return
+                        target, status, error = await self._send(payload, target, reference)
+                        if status is None:
+                            state.deferred += 1
+                            continue
+                        if status == SENT:
+                            state.sent += 1
+                        else:
+                            state.failed += 1
+                            state.errors[target] = error
+                        results.append((target, status, error))
+                        if len(results) >= self.checkpoint:
+                            await checkpoint()
+
+                try:
+                    await asyncio.gather(
+                        *[worker() for _ in range(min(self.concurrency, len(page)))]
+                    )
+                finally:
+                    # statuses of the sends done so far survive a cancellation.
+                    if results:
+                        batch = results[:]
+                        results.clear()
+                        await asyncio.shield(self.store.execute(self._save, job_id, batch))
+
+        attempt = 0
+        while True:
+            # throttled targets stay pending: they are sent on the next pass.
+            state.deferred = 0
+            await send_pending()
+            if lost.is_set() or not state.deferred or attempt >= self.retries:
+                break
+            delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+            attempt += 1
+            self.logger.info(
+                f"Broadcast {job_id}: {state.deferred} throttled, "
+                f"retrying in {delay:.1f}s ({attempt}/{self.retries})"
+            )
+            await checkpoint()
+            await asyncio.sleep(delay)
+        await checkpoint()
+        if lost.is_set():
+            raise BroadcastBusy(f"Broadcast {job_id}: lease lost to another worker")
+        await self.store.execute(self._finish, job_id)
+        self.logger.info(
+            f"Broadcast {job_id}: {state.sent} sent, {state.failed} failed, "
+            f"{state.deferred} deferred of {state.total}"
+        )
+        return state
+
+    async def broadcast(
+        self,
+        activity: Union[Activity, str],
+        progress: Optional[ProgressCallback] = None,
+        **filters: Any
+    ) -> BroadcastProgress:
+        """Creates and runs a broadcast."""
+        job_id = await self.create(activity, **filters)
+        return await self.run(job_id, progress=progress)
+
+    def start(self, job_id: str, progress: Optional[ProgressCallback] = None) -> asyncio.Task:
+        """Runs a broadcast in background."""
+        task = self._jobs.get(job_id)
+        if task is None or task.done():
+            task = asyncio.create_task(self.run(job_id, progress=progress))
+            self._jobs[job_id] = task
+            task.add_done_callback(self._job_done(job_id))
+        return task
+
+    def _job_done(self, job_id: str) -> Callable[[asyncio.Task], None]:
+        def done(task: asyncio.Task) -> None:
+            if self._jobs.get(job_id) is task:
+                del self._jobs[job_id]
+            if task.cancelled() or task.exception() is None:
+                return
+            if isinstance(task.exception(), BroadcastBusy):
+                self.logger.info(str(task.exception()))
+            else:
+                self.logger.error(f"Broadcast {job_id} failed: {task.exception()}")
+        return done
+
+    async def resume(self) -> list[str]:
+        """Starts (in background) the broadcasts left unfinished (the ones
+        run by another worker are skipped)."""
+        jobs = await self.unfinished()
+        for job_id in jobs:
+            self.start(job_id)
+        return jobs
+
+    async def stop(self) -> None:
+        """Stops the running broadcasts (they resume with `resume`)."""
+        tasks = list(self._jobs.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._jobs.clear()
+
+    def stats(self) -> dict:
+        return {
+            "running": len(self._jobs),
+            "jobs": {
+                job_id: {
+                    "total": state.total,
+                    "sent": state.sent,
+                    "failed": state.failed,
+                    "deferred": state.deferred,
+                }
+                for job_id, state in self._progress.items()
+            },
+        }
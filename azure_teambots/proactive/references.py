@@ -0,0 +1,331 @@
+"""
+Conversation References.
+
+A bot can only message a conversation it has seen: the ConversationReference
+of every conversation (service url, bot account, conversation, tenant) is
+captured on each turn and kept in a SQLite database, indexed by app id,
+conversation type, tenant and team for the broadcasts.
+"""
+import asyncio
+import json
+import sqlite3
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional, TypeVar
+from botbuilder.core import TurnContext
+from botbuilder.schema import Activity, ActivityTypes, ConversationReference
+from ..cache import TTLCache
+from ..conf import AZUREBOT_REFERENCES_PATH, AZUREBOT_REFERENCES_TOUCH
+
+
+T = TypeVar('T')
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS conversation_references ("
+    "app_id TEXT NOT NULL, conversation_id TEXT NOT NULL, "
+    "conversation_type TEXT, channel_id TEXT, tenant_id TEXT, team_id TEXT, "
+    "user_id TEXT, service_url TEXT, reference TEXT NOT NULL, "
+    "active INTEGER NOT NULL DEFAULT 1, updated REAL NOT NULL, "
+    "PRIMARY KEY (app_id, conversation_id))",
+    "CREATE INDEX IF NOT EXISTS ix_references_type "
+    "ON conversation_references (app_id, active, conversation_type)",
+    "CREATE INDEX IF NOT EXISTS ix_references_tenant "
+    "ON conversation_references (app_id, tenant_id)",
+    "CREATE INDEX IF NOT EXISTS ix_references_team "
+    "ON conversation_references (app_id, team_id)",
+)
+
+UPSERT = (
+    "INSERT INTO conversation_references (app_id, conversation_id, "
+    "conversation_type, channel_id, tenant_id, team_id, user_id, service_url, "
+    "reference, active, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?) "
+    "ON CONFLICT (app_id, conversation_id) DO UPDATE SET "
+    "conversation_type = excluded.conversation_type, "
+    "channel_id = excluded.channel_id, tenant_id = excluded.tenant_id, "
+    "team_id = excluded.team_id, user_id = excluded.user_id, "
+    "service_url = excluded.service_url, reference = excluded.reference, "
+    "active = 1, updated = excluded.updated"
+)
+
+# filters of `find` (column names).
+FILTERS = ('conversation_type', 'channel_id', 'tenant_id', 'team_id', 'user_id')
+
+
+def conversation_key(activity: Activity) -> str:
+    """Conversation id of an activity (the channel, for a channel thread)."""
+    conversation_id = activity.conversation.id
+    # channel replies: "19:...@thread.tacv2;messageid=1234"
+    return conversation_id.split(';messageid=', 1)[0]
+
+
+def _team_id(activity: Activity) -> Optional[str]:
+    channel_data = activity.channel_data
+    if isinstance(channel_data, dict):
+        return (channel_data.get('team') or {}).get('id')
+    return None
+
+
+def _tenant_id(activity: Activity) -> Optional[str]:
+    tenant_id = activity.conversation.tenant_id
+    if tenant_id:
+        return tenant_id
+    channel_data = activity.channel_data
+    if isinstance(channel_data, dict):
+        return (channel_data.get('tenant') or {}).get('id')
+    return None
+
+
+def bot_removed(activity: Activity) -> bool:
+    """The activity tells the bot was removed from the conversation
+    (or its app uninstalled)."""
+    if activity.type == ActivityTypes.conversation_update:
+        bot_id = activity.recipient.id if activity.recipient else None
+        return any(
+            member.id == bot_id for member in activity.members_removed or []
+        )
+    if activity.type == ActivityTypes.installation_update:
+        return activity.action == 'remove'
+    return False
+
+
+class ConversationReferenceStore:
+    """Conversation references by app id and conversation.
+
+    `capture` runs on every turn: a reference already stored is only
+    written again when it changed (ex: a new service url) or once every
+    `touch_interval` seconds, so known conversations cost no I/O.
+    When the bot is removed from a conversation (or a team), its references
+    are deactivated instead. All statements run on a dedicated thread.
+
+    Args:
+        path: database file path (None or ":memory:": in-memory database).
+        touch_interval: seconds before an unchanged reference is rewritten.
+        maxsize: conversations remembered as already stored.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = AZUREBOT_REFERENCES_PATH,
+        touch_interval: float = AZUREBOT_REFERENCES_TOUCH,
+        maxsize: int = 100000
+    ):
+        self.path: str = str(path) if path else ':memory:'
+        self.touch_interval: float = touch_interval
+        self._seen = TTLCache(maxsize=maxsize, ttl=touch_interval)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix='AzureBot.References'
+        )
+        self._schemas: list[tuple[str, ...]] = [SCHEMA]
+        self._captured: int = 0
+        self._writes: int = 0
+
+    async def execute(self, fn: Callable[[sqlite3.Connection], T], *args) -> T:
+        """Runs `fn(connection, *args)` on the database thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, lambda: fn(self._connect(), *args)
+        )
+
+    def add_schema(self, statements: tuple[str, ...]) -> None:
+        """Tables of other components sharing the database."""
+        if statements not in self._schemas:
+            self._schemas.append(statements)
+            if self._conn is not None:
+                self._create(self._conn, statements)
+
+    @staticmethod
+    def _create(conn: sqlite3.Connection, statements: tuple[str, ...]) -> None:
+        with conn:
+            for statement in statements:
+                conn.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            if self.path != ':memory:':
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            for statements in self._schemas:
+                self._create(conn, statements)
+            self._conn = conn
+        return self._conn
+
+    def _close(self) -> None:
+        if self._conn is not None and self.path != ':memory:':
+            # an in-memory database lives as long as the process.
+            self._conn.close()
+            self._conn = None
+
+    async def open(self) -> None:
+        await self.execute(lambda conn: None)
+
+    async def close(self) -> None:
+        await self.execute(lambda conn: self._close())
+
+    @staticmethod
+    def _row(app_id: str, activity: Activity) -> tuple:
+        reference = TurnContext.get_conversation_reference(activity)
+        conversation_id = conversation_key(activity)
+        if conversation_id != activity.conversation.id:
+            reference.conversation.id = conversation_id
+        # a proactive message is not a reply.
+        reference.activity_id = None
+        return (
+            app_id,
+            conversation_id,
+            activity.conversation.conversation_type,
+            activity.channel_id,
+            _tenant_id(activity),
+            _team_id(activity),
+            activity.from_property.id if activity.from_property else None,
+            activity.service_url,
+            json.dumps(reference.serialize()),
+            time.time(),
+        )
+
+    def _upsert(self, conn: sqlite3.Connection, row: tuple) -> None:
+        with conn:
+            conn.execute(UPSERT, row)
+
+    async def capture(self, app_id: str, activity: Activity) -> bool:
+        """Stores the reference of the activity conversation (True if written)."""
+        if activity.conversation is None or not activity.service_url:
+            return False
+        if bot_removed(activity):
+            await self.deactivate(
+                app_id, conversation_key(activity), team_id=_team_id(activity)
+            )
+            return False
+        self._captured += 1
+        # thread replies are stored (and deactivated) as their channel.
+        key = (app_id, conversation_key(activity))
+        # what a stored reference depends on.
+        signature = (
+            activity.service_url,
+            activity.recipient.id if activity.recipient else None,
+            activity.conversation.tenant_id,
+        )
+        if self._seen.get(key, None) == signature:
+            return False
+        await self.execute(self._upsert, self._row(app_id, activity))
+        self._seen.set(key, signature)
+        self._writes += 1
+        return True
+
+    @staticmethod
+    def _reference(data: Optional[str]) -> Optional[ConversationReference]:
+        if data is None:
+            return None
+        return ConversationReference().deserialize(json.loads(data))
+
+    async def get(
+        self, app_id: str, conversation_id: str
+    ) -> Optional[ConversationReference]:
+        def _get(conn):
+            return conn.execute(
+                "SELECT reference FROM conversation_references "
+                "WHERE app_id = ? AND conversation_id = ?",
+                (app_id, conversation_id)
+            ).fetchone()
+        row = await self.execute(_get)
+        return self._reference(row[0] if row else None)
+
+    @staticmethod
+    def where(app_id: str, active: bool = True, **filters: Any) -> tuple[str, list]:
+        """WHERE clause (and parameters) selecting conversation references."""
+        clauses = ["app_id = ?"]
+        params: list = [app_id]
+        if active:
+            clauses.append("active = 1")
+        for name, value in filters.items():
+            if name not in FILTERS:
+                raise ValueError(f"Invalid conversation filter: {name}")
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple, set)):
+                clauses.append(f"{name} IN ({','.join('?' * len(value))})")
+                params.extend(value)
+            else:
+                clauses.append(f"{name} = ?")
+                params.append(value)
+        return ' AND '.join(clauses), params
+
+    async def find(self, app_id: str, active: bool = True, **filters: Any) -> list[str]:
+        """Conversation ids of an app id, filtered by conversation type,
+        channel, tenant, team or user (a value or a list of values)."""
+        where, params = self.where(app_id, active, **filters)
+
+        def _find(conn):
+            return [row[0] for row in conn.execute(
+                f"SELECT conversation_id FROM conversation_references WHERE {where} "
+                "ORDER BY conversation_id",
+                params
+            )]
+        return await self.execute(_find)
+
+    async def deactivate(
+        self,
+        app_id: str,
+        conversation_id: str,
+        team_id: Optional[str] = None
+    ) -> None:
+        """Excludes a conversation from the broadcasts (ex: the bot was removed).
+
+        With `team_id`, every channel of the team is excluded.
+        """
+        def _deactivate(conn):
+            with conn:
+                conn.execute(
+                    "UPDATE conversation_references SET active = 0 "
+                    "WHERE app_id = ? AND (conversation_id = ? OR team_id = ?)",
+                    (app_id, conversation_id, team_id)
+                )
+        await self.execute(_deactivate)
+        if team_id is None:
+            self._seen.pop((app_id, conversation_id))
+        else:
+            # the channels of the team are captured again on their next message.
+            self._seen.clear()
+
+    async def service_urls(self, app_id: Optional[str] = None) -> list[str]:
+        """Service urls of the active conversations."""
+        def _urls(conn):
+            if app_id is None:
+                rows = conn.execute(
+                    "SELECT DISTINCT service_url FROM conversation_references "
+                    "WHERE active = 1 AND service_url IS NOT NULL"
+                )
+            else:
+                rows = conn.execute(
+                    "SELECT DISTINCT service_url FROM conversation_references "
+                    "WHERE app_id = ? AND active = 1 AND service_url IS NOT NULL",
+                    (app_id,)
+                )
+            return [row[0] for row in rows]
+        return await self.execute(_urls)
+
+    async def count(self, app_id: Optional[str] = None) -> int:
+        def _count(conn):
+            if app_id is None:
+                return conn.execute(
+                    "SELECT COUNT(*) FROM conversation_references"
+                ).fetchone()[0]
+            return conn.execute(
+                "SELECT COUNT(*) FROM conversation_references WHERE app_id = ?",
+                (app_id,)
+            ).fetchone()[0]
+        return await self.execute(_count)
+
+    def stats(self) -> dict:
+        return {
+            "captured": self._captured,
+            "writes": self._writes,
+            "known": len(self._seen),
+        }
+
+
+## process-wide references store.
+conversation_references = ConversationReferenceStore()
@@ -0,0 +1,80 @@
+"""
+Rate Limiting primitives.
+
+TokenBucket: requests per second with bursts.
+parse_retry_after: seconds requested by a Retry-After header.
+"""
+import asyncio
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds of a Retry-After value (delay or HTTP date), None if invalid."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Token bucket rate limiter.
+
+    Tokens are added at `rate` per second up to `capacity`. Acquiring takes
+    a reservation (the balance can go negative), so concurrent waiters are
+    served in arrival order without polling.
+
+    Args:
+        rate: tokens added per second (0 disables the limit).
+        capacity: maximum burst of tokens.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate: float = rate
+        self.capacity: float = max(capacity, 1)
+        self._tokens: float = self.capacity
+        self._updated: float = time.monotonic()
+        self._waits: int = 0
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def reserve(self, tokens: float = 1) -> float:
+        """Takes `tokens`, returning the seconds to wait before using them."""
+        if self.rate <= 0:
+            return 0
+        self._refill()
+        self._tokens -= tokens
+        if self._tokens >= 0:
+            return 0
+        return -self._tokens / self.rate
+
+    async def acquire(self, tokens: float = 1) -> None:
+        delay = self.reserve(tokens)
+        if delay > 0:
+            self._waits += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {
+            "rate": self.rate,
+            "capacity": self.capacity,
+            "tokens": round(self.tokens, 2),
+            "waits": self._waits,
+        }
@@ -0,0 +1,11 @@
+"""
+Full-text search over the conversation history.
+"""
+from .index import SearchIndex
+from .tokenizer import clean_text, tokenize
+
+__all__ = (
+    'SearchIndex',
+    'clean_text',
+    'tokenize',
+)
@@ -0,0 +1,422 @@
+"""
+Full-text Search Index.
+
+Embedded inverted index over the conversation history, with positional
+postings (phrase queries), BM25 ranking and team/channel filters.
+
+Messages of personal and group chats (no team) are private: they are only
+returned to a search scoped to their own conversation.
+"""
+import asyncio
+import heapq
+import json
+import math
+from pathlib import Path
+from typing import Any, Optional, Union
+from botbuilder.core.teams import teams_get_channel_id, teams_get_team_info
+from botbuilder.schema import Activity, ActivityTypes
+from navconfig.logging import logging
+from ..conf import (
+    AZUREBOT_SEARCH_FLUSH_DOCS,
+    AZUREBOT_SEARCH_MAX_SEGMENTS,
+)
+from .segment import (
+    Segment,
+    MemorySegment,
+    DiskSegment,
+    write_segment,
+    DOC_ID,
+    DOC_TEAM,
+    DOC_CHANNEL,
+    DOC_AUTHOR,
+    DOC_TIMESTAMP,
+    DOC_LENGTH,
+    DOC_SNIPPET,
+)
+from .tokenizer import clean_text, tokenize, parse_query
+
+
+SNIPPET_LENGTH: int = 200
+
+
+class SearchIndex:
+    """Inverted index of messages.
+
+    New messages go to an in-memory segment. Once it holds `flush_docs`
+    documents it is written to disk (off the event loop) as an immutable,
+    memory-mapped segment; when there are more than `max_segments` disk
+    segments they are merged into one. Edited messages replace the previous
+    version and deleted ones are masked until the next merge.
+
+    Args:
+        path: directory of the segments (None keeps the index in memory).
+        flush_docs: documents of the in-memory segment before a flush.
+        max_segments: disk segments before a merge.
+        k1, b: BM25 parameters.
+    """
+    manifest_file: str = 'manifest.json'
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        flush_docs: int = AZUREBOT_SEARCH_FLUSH_DOCS,
+        max_segments: int = AZUREBOT_SEARCH_MAX_SEGMENTS,
+        k1: float = 1.2,
+        b: float = 0.75
+    ):
+        self.path: Optional[Path] = Path(path) if path else None
+        self.flush_docs: int = flush_docs
+        self.max_segments: int = max_segments
+        self.k1: float = k1
+        self.b: float = b
+        self._segments: list[Segment] = []
+        self._counter: int = 0
+        self._memory: MemorySegment = self._new_memory()
+        # message id -> (segment, document number) of its current version.
+        self._where: dict[str, tuple[Segment, int]] = {}
+        self._length: int = 0
+        self._flushing: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._searches: int = 0
+        self._flushes: int = 0
+        self._merges: int = 0
+        self.logger = logging.getLogger('AzureBot.Search')
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def _next_name(self) -> str:
+        self._counter += 1
+        return f"seg-{self._counter:06d}"
+
+    def _new_memory(self) -> MemorySegment:
+        return MemorySegment(self._next_name())
+
+    @property
+    def segments(self) -> list[Segment]:
+        return [*self._segments, self._memory]
+
+    ## Documents
+    def add(
+        self,
+        doc_id: str,
+        text: str,
+        team_id: Optional[str] = None,
+        channel_id: Optional[str] = None,
+        author: Optional[str] = None,
+        timestamp: Any = None
+    ) -> bool:
+        """Indexes (or replaces) a message. Returns False if it has no text."""
+        text = clean_text(text)
+        tokens = tokenize(text)
+        if not tokens:
+            self.delete(doc_id)
+            return False
+        self.delete(doc_id)
+        if timestamp is not None and not isinstance(timestamp, str):
+            timestamp = timestamp.isoformat()
+        row = [
+            doc_id, team_id, channel_id, author, timestamp,
+            len(tokens), text[:SNIPPET_LENGTH]
+        ]
+        docnum = self._memory.add(row, tokens)
+        self._where[doc_id] = (self._memory, docnum)
+        self._length += len(tokens)
+        if self.path is not None and len(self._memory) >= self.flush_docs and (
+            self._flushing is None or self._flushing.done()
+        ):
+            self._flushing = asyncio.create_task(self.flush())
+        return True
+
+    def delete(self, doc_id: str) -> bool:
+        location = self._where.pop(doc_id, None)
+        if location is None:
+            return False
+        segment, docnum = location
+        segment.deleted.add(docnum)
+        self._length -= segment.docs[docnum][DOC_LENGTH]
+        return True
+
+    def add_activity(self, activity: Activity) -> bool:
+        """Indexes a message activity (edits replace, deletes remove)."""
+        if activity.type == ActivityTypes.message_delete:
+            return self.delete(activity.id)
+        if activity.type not in (ActivityTypes.message, ActivityTypes.message_update):
+            return False
+        if not activity.id or not activity.text:
+            return False
+        team = teams_get_team_info(activity)
+        channel_id = teams_get_channel_id(activity)
+        sender = activity.from_property
+        return self.add(
+            activity.id,
+            activity.text,
+            team_id=team.id if team else None,
+            channel_id=channel_id or activity.conversation.id,
+            author=sender.name if sender else None,
+            timestamp=activity.timestamp
+        )
+
+    async def add_messages(self, messages: list[dict]) -> None:
+        """Indexes a batch of ingested channel messages (a sink writer)."""
+        for message in messages:
+            if message.get('deleted'):
+                self.delete(message['id'])
+                continue
+            self.add(
+                message['id'],
+                message.get('content') or '',
+                team_id=message.get('team_id'),
+                channel_id=message.get('channel_id'),
+                author=message.get('user_name'),
+                timestamp=message.get('modified') or message.get('created')
+            )
+
+    ## Search
+    def search(
+        self,
+        query: str,
+        team_id: Optional[str] = None,
+        channel_id: Optional[str] = None,
+        limit: int = 10
+    ) -> list[dict]:
+        """BM25-ranked messages matching the query.
+
+        Quoted phrases ("release date") must appear as-is. Messages without
+        a team are only returned when `channel_id` is their conversation.
+        """
+        self._searches += 1
+        terms, phrases = parse_query(query)
+        total = len(self._where)
+        if not terms or not total:
+            return []
+        avgdl = self._length / total
+        # (segment, postings by term) of every segment with a match.
+        matches = []
+        df = dict.fromkeys(terms, 0)
+        for segment in self.segments:
+            postings = {}
+            for term in terms:
+                term_postings = segment.postings(term)
+                if term_postings:
+                    postings[term] = term_postings
+                    df[term] += sum(1 for d in term_postings if d not in segment.deleted)
+            if postings:
+                matches.append((segment, postings))
+        idf = {
+            term: math.log(1 + (total - n + 0.5) / (n + 0.5))
+            for term, n in df.items()
+        }
+        scored = []
+        for segment, postings in matches:
+            candidates = set().union(*postings.values()) - segment.deleted
+            for docnum in candidates:
+                row = segment.docs[docnum]
+                if team_id and row[DOC_TEAM] != team_id:
+                    continue
+                if channel_id and row[DOC_CHANNEL] != channel_id:
+                    continue
+                if row[DOC_TEAM] is None and row[DOC_CHANNEL] != channel_id:
+                    # private chat of another conversation.
+                    continue
+                if phrases and not all(
+                    self._has_phrase(postings, docnum, phrase) for phrase in phrases
+                ):
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * row[DOC_LENGTH] / avgdl)
+                score = 0.0
+                for term, term_postings in postings.items():
+                    positions = term_postings.get(docnum)
+                    if positions:
+                        freq = len(positions)
+                        score += idf[term] * freq * (self.k1 + 1) / (freq + norm)
+                scored.append((score, row))
+        return [
+            {
+                "id": row[DOC_ID],
+                "score": round(score, 4),
+                "team_id": row[DOC_TEAM],
+                "channel_id": row[DOC_CHANNEL],
+                "author": row[DOC_AUTHOR],
+                "timestamp": row[DOC_TIMESTAMP],
+                "snippet": row[DOC_SNIPPET],
+            }
+            for score, row in heapq.nlargest(limit, scored, key=lambda item: item[0])
+        ]
+
+    @staticmethod
+    def scope(activity: Activity, channel: bool = False) -> tuple[Optional[str], str]:
+        """(team_id, channel_id) a search from `activity` is allowed to see.
+
+        In a team, the messages of the team (of its channel if `channel`);
+        in a personal or group chat, the messages of that conversation only.
+        """
+        team = teams_get_team_info(activity)
+        if team is None or not team.id:
+            return None, activity.conversation.id
+        if channel:
+            return team.id, teams_get_channel_id(activity) or activity.conversation.id
+        return team.id, None
+
+    @staticmethod
+    def _has_phrase(postings: dict, docnum: int, phrase: list[str]) -> bool:
+        positions = []
+        for term in phrase:
+            term_positions = postings.get(term, {}).get(docnum)
+            if not term_positions:
+                return False
+            positions.append(set(term_positions))
+        return any(
+            all(start + i in positions[i] for i in range(1, len(phrase)))
+            for start in positions[0]
+        )
+
+    ## Persistence
+    async def open(self) -> None:
+        """Loads the disk segments listed in the manifest."""
+        if self.path is None:
+            return
+        loop = asyncio.get_running_loop()
+        manifest = await loop.run_in_executor(None, self._read_manifest)
+        for entry in manifest.get('segments', []):
+            segment = await loop.run_in_executor(
+                None, DiskSegment, self.path, entry['name'], entry.get('deleted')
+            )
+            self._segments.append(segment)
+            for docnum, row in enumerate(segment.docs):
+                if docnum in segment.deleted:
+                    continue
+                # later versions of a message replace the previous ones.
+                self.delete(row[DOC_ID])
+                self._where[row[DOC_ID]] = (segment, docnum)
+                self._length += row[DOC_LENGTH]
+        self._counter = max(self._counter, manifest.get('counter', 0))
+        self._memory = self._new_memory()
+
+    def _read_manifest(self) -> dict:
+        manifest = self.path.joinpath(self.manifest_file)
+        if not manifest.exists():
+            return {}
+        return json.loads(manifest.read_text())
+
+    def _write_manifest(self, manifest: dict) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        target = self.path.joinpath(self.manifest_file)
+        tmp = target.with_suffix('.tmp')
+        tmp.write_text(json.dumps(manifest))
+        tmp.replace(target)
+
+    async def save_manifest(self) -> None:
+        if self.path is None:
+            return
+        manifest = {
+            "counter": self._counter,
+            "segments": [
+                {"name": segment.name, "deleted": sorted(segment.deleted)}
+                for segment in self._segments
+            ],
+        }
+        await asyncio.get_running_loop().run_in_executor(
+            None, self._write_manifest, manifest
+        )
+
+    def _relocate(self, old: Segment, new: Segment, mapping: dict[int, int]) -> None:
+        """Points the messages of `old` to their document in `new`."""
+        for docnum, newnum in mapping.items():
+            doc_id = old.docs[docnum][DOC_ID]
+            if self._where.get(doc_id) == (old, docnum):
+                self._where[doc_id] = (new, newnum)
+            else:
+                # replaced or deleted while the segment was written.
+                new.deleted.add(newnum)
+
+    async def flush(self) -> None:
+        """Writes the in-memory segment to disk (merging if needed)."""
+        if self.path is None:
+            return
+        async with self._lock:
+            segment = self._memory
+            if not segment.docs:
+                return
+            self._memory = self._new_memory()
+            # the frozen segment stays searchable while it is written.
+            self._segments.append(segment)
+            loop = asyncio.get_running_loop()
+            postings = [(term, segment.postings(term)) for term in segment.terms()]
+            await loop.run_in_executor(
+                None, write_segment, self.path, segment.name, segment.docs, postings
+            )
+            disk = await loop.run_in_executor(
+                None, DiskSegment, self.path, segment.name
+            )
+            self._relocate(segment, disk, {d: d for d in range(len(segment.docs))})
+            self._segments[self._segments.index(segment)] = disk
+            self._flushes += 1
+            if len(self._segments) > self.max_segments:
+                await self._merge()
+            await self.save_manifest()
+
+    async def _merge(self) -> None:
+        segments = list(self._segments)
+        deleted = [set(segment.deleted) for segment in segments]
+        merged = self._next_name()
+        loop = asyncio.get_running_loop()
+        mappings = await loop.run_in_executor(
+            None, self._merge_segments, segments, deleted, merged
+        )
+        disk = await loop.run_in_executor(None, DiskSegment, self.path, merged)
+        for segment, mapping in zip(segments, mappings):
+            self._relocate(segment, disk, mapping)
+        self._segments = [disk, *self._segments[len(segments):]]
+        await self.save_manifest()
+        for segment in segments:
+            segment.remove()
+        self._merges += 1
+
+    def _merge_segments(
+        self,
+        segments: list[Segment],
+        deleted: list[set],
+        name: str
+    ) -> list[dict[int, int]]:
+        docs = []
+        mappings = []
+        for segment, removed in zip(segments, deleted):
+            mapping = {}
+            for docnum, row in enumerate(segment.docs):
+                if docnum not in removed:
+                    mapping[docnum] = len(docs)
+                    docs.append(row)
+            mappings.append(mapping)
+        terms = set()
+        for segment in segments:
+            terms.update(segment.terms())
+
+        def postings():
+            for term in terms:
+                merged = {}
+                for segment, mapping in zip(segments, mappings):
+                    for docnum, positions in segment.postings(term).items():
+                        if docnum in mapping:
+                            merged[mapping[docnum]] = positions
+                yield term, merged
+
+        write_segment(self.path, name, docs, postings())
+        return mappings
+
+    async def close(self) -> None:
+        if self._flushing is not None and not self._flushing.done():
+            await self._flushing
+        await self.flush()
+        for segment in self._segments:
+            segment.close()
+
+    def stats(self) -> dict:
+        return {
+            "documents": len(self._where),
+            "segments": len(self._segments),
+            "memory_documents": len(self._memory),
+            "searches": self._searches,
+            "flushes": self._flushes,
+            "merges": self._merges,
+        }
@@ -0,0 +1,152 @@
+"""
+Search Index Segments.
+
+A segment is a set of documents with their positional postings:
+    term -> {document number: [positions]}
+
+MemorySegment receives the new documents; once full it is written to disk
+as an immutable DiskSegment:
+    <name>.post: postings, uint32 words; per term:
+                 [documents, (document, frequency, positions...)...]
+    <name>.terms: JSON term dictionary {term: [offset, words]}
+    <name>.docs: JSON list of documents
+Postings are read through mmap, only for the terms of a query.
+"""
+import json
+import mmap
+from array import array
+from pathlib import Path
+from typing import Iterator, Optional
+
+
+## document row: [id, team_id, channel_id, author, timestamp, length, snippet]
+DOC_ID, DOC_TEAM, DOC_CHANNEL, DOC_AUTHOR, DOC_TIMESTAMP, DOC_LENGTH, DOC_SNIPPET = range(7)
+
+
+class Segment:
+    """Common interface of the segments."""
+    name: str
+    docs: list[list]
+
+    def __init__(self):
+        # deleted (or replaced) document numbers.
+        self.deleted: set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def postings(self, term: str) -> dict[int, list[int]]:
+        raise NotImplementedError
+
+    def terms(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class MemorySegment(Segment):
+    """Mutable segment receiving the new documents."""
+
+    def __init__(self, name: str):
+        super().__init__()
+        self.name = name
+        self.docs: list[list] = []
+        self._postings: dict[str, dict[int, list[int]]] = {}
+
+    def add(self, row: list, tokens: list[str]) -> int:
+        docnum = len(self.docs)
+        self.docs.append(row)
+        for position, token in enumerate(tokens):
+            self._postings.setdefault(token, {}).setdefault(docnum, []).append(position)
+        return docnum
+
+    def postings(self, term: str) -> dict[int, list[int]]:
+        return self._postings.get(term, {})
+
+    def terms(self) -> Iterator[str]:
+        return iter(self._postings)
+
+
+class DiskSegment(Segment):
+    """Immutable, memory-mapped segment."""
+
+    def __init__(self, directory: Path, name: str, deleted: Optional[list] = None):
+        super().__init__()
+        self.name = name
+        self.directory = directory
+        self.deleted = set(deleted or [])
+        self._terms: dict[str, list[int]] = json.loads(
+            directory.joinpath(f"{name}.terms").read_text()
+        )
+        self.docs = json.loads(directory.joinpath(f"{name}.docs").read_text())
+        self._file = open(directory.joinpath(f"{name}.post"), 'rb')  # pylint: disable=R1732
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file
+            self._mmap = None
+
+    def postings(self, term: str) -> dict[int, list[int]]:
+        entry = self._terms.get(term)
+        if entry is None or self._mmap is None:
+            return {}
+        offset, words = entry
+        data = array('I')
+        data.frombytes(self._mmap[offset * 4:(offset + words) * 4])
+        return decode(data)
+
+    def terms(self) -> Iterator[str]:
+        return iter(self._terms)
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+    def remove(self) -> None:
+        self.close()
+        for ext in ('post', 'terms', 'docs'):
+            self.directory.joinpath(f"{self.name}.{ext}").unlink(missing_ok=True)
+
+
+def decode(data: array) -> dict[int, list[int]]:
+    postings = {}
+    idx = 1
+    for _ in range(data[0]):
+        docnum, freq = data[idx], data[idx + 1]
+        postings[docnum] = data[idx + 2:idx + 2 + freq].tolist()
+        idx += 2 + freq
+    return postings
+
+
+def encode(postings: dict[int, list[int]]) -> array:
+    data = array('I', [len(postings)])
+    for docnum in sorted(postings):
+        positions = postings[docnum]
+        data.append(docnum)
+        data.append(len(positions))
+        data.extend(positions)
+    return data
+
+
+def write_segment(
+    directory: Path,
+    name: str,
+    docs: list[list],
+    postings: Iterator[tuple[str, dict[int, list[int]]]]
+) -> None:
+    """Writes a segment (postings are given as (term, postings) pairs)."""
+    directory.mkdir(parents=True, exist_ok=True)
+    terms = {}
+    offset = 0
+    with open(directory.joinpath(f"{name}.post"), 'wb') as f:
+        for term, term_postings in sorted(postings, key=lambda item: item[0]):
+            if not term_postings:
+                continue
+            data = encode(term_postings)
+            data.tofile(f)
+            terms[term] = [offset, len(data)]
+            offset += len(data)
+    directory.joinpath(f"{name}.terms").write_text(json.dumps(terms))
+    directory.joinpath(f"{name}.docs").write_text(json.dumps(docs))
@@ -0,0 +1,42 @@
+"""
+Text tokenization for the search index.
+"""
+import html
+import re
+import unicodedata
+
+
+_TAGS = re.compile(r'<[^>]+>')
+_WORDS = re.compile(r'\w+')
+_PHRASES = re.compile(r'"([^"]+)"')
+MAX_TOKEN_LENGTH: int = 64
+
+
+def clean_text(text: str) -> str:
+    """Plain text of a message (Teams messages are HTML)."""
+    if not text:
+        return ''
+    return ' '.join(html.unescape(_TAGS.sub(' ', text)).split())
+
+
+def fold(text: str) -> str:
+    """Lowercase, without accents."""
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> list[str]:
+    """Terms of a plain text, in order."""
+    return [
+        token for token in _WORDS.findall(fold(text))
+        if len(token) <= MAX_TOKEN_LENGTH
+    ]
+
+
+def parse_query(query: str) -> tuple[list[str], list[list[str]]]:
+    """Terms and quoted phrases of a query."""
+    phrases = [tokenize(phrase) for phrase in _PHRASES.findall(query)]
+    terms = tokenize(_PHRASES.sub(' ', query))
+    for phrase in phrases:
+        terms.extend(phrase)
+    return list(dict.fromkeys(terms)), [p for p in phrases if len(p) > 1]
@@ -10,6 +10,8 @@ from .config import BotConfig
 from .bots.abstract import AbstractBot
 from .bots.base import BaseBot
 from .bots import EchoBot
+from .sessions import http_pool
+from .graph import photo_cache
 
 
 logging.getLogger(name='msrest').setLevel(logging.INFO)
@@ -33,7 +35,7 @@ class AzureBots:
         app_password (str): The Microsoft App Password for the bot,
         used for authentication.
         _config (BotConfig): Configuration object containing bot settings.
-        _memory (MemoryStorage): In-memory storage for bot state management.
+        _memory (Storage): storage backend for bot state management.
         _user_state (UserState): State management for user-specific data.
         _conversation_state (ConversationState): State management
         for conversation-specific data.
@@ -251,6 +253,10 @@ class AzureBots:
         self.app.on_startup.append(self.on_startup)
         # cleanup operations over Auth backend
         self.app.on_cleanup.append(self.on_cleanup)
+        # Shared outbound HTTP sessions (closed on cleanup)
+        http_pool.setup(self.app)
+        # persists the user photo cache index on cleanup.
+        photo_cache.setup(self.app)
         ## Configure Routes
         router = self.app.router
         # More Generic Approach
@@ -260,6 +266,9 @@ class AzureBots:
         router.add_route(
             "POST", r"/api/v1/azurebots/{bot}", self._botmessage, name="azurebot_message_post"
         )
+        router.add_route(
+            "GET", r"/api/v1/azurebots/{bot}/stats", self._botstats, name="azurebot_stats"
+        )
 
     async def on_startup(self, app):
         """
@@ -312,3 +321,14 @@ class AzureBots:
         # Get the bot instance and process the request
         bot = self.bots[bot_name]
         return await bot.messages(request)
+
+    async def _botstats(self, request: web.Request):
+        """
+        Returns the live counters (state storage, queues) of a bot.
+        """
+        bot_name = request.match_info.get('bot')
+        if bot_name not in self.bots:
+            return web.Response(
+                status=404, text=f"Bot with name {bot_name} not found."
+            )
+        return web.json_response(self.bots[bot_name].stats())
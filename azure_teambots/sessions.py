@@ -0,0 +1,108 @@
+"""
+Outbound HTTP Sessions.
+
+Long-lived aiohttp ClientSessions shared by all the outbound HTTP
+of the package (Microsoft Graph, token endpoints, file downloads),
+so connections are kept alive and reused instead of doing a new
+TCP+TLS handshake per call.
+"""
+import aiohttp
+from aiohttp import web
+from navconfig.logging import logging
+from .conf import (
+    AZUREBOT_HTTP_LIMIT,
+    AZUREBOT_HTTP_LIMIT_PER_HOST,
+    AZUREBOT_HTTP_DNS_TTL,
+    AZUREBOT_HTTP_KEEPALIVE,
+    AZUREBOT_HTTP_TIMEOUT,
+)
+
+
+class SessionPool:
+    """Pool of named, long-lived aiohttp ClientSessions.
+
+    Sessions are created lazily (inside the running loop) and closed on the
+    aiohttp application cleanup.
+
+    Args:
+        limit: maximum number of simultaneous connections (per session).
+        limit_per_host: maximum number of simultaneous connections per host.
+        ttl_dns_cache: seconds DNS resolutions are cached.
+        keepalive_timeout: seconds an idle connection is kept open.
+        timeout: total timeout (in seconds) of a request.
+    """
+
+    def __init__(
+        self,
+        limit: int = AZUREBOT_HTTP_LIMIT,
+        limit_per_host: int = AZUREBOT_HTTP_LIMIT_PER_HOST,
+        ttl_dns_cache: int = AZUREBOT_HTTP_DNS_TTL,
+        keepalive_timeout: float = AZUREBOT_HTTP_KEEPALIVE,
+        timeout: float = AZUREBOT_HTTP_TIMEOUT
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self._sessions: dict[str, aiohttp.ClientSession] = {}
+        self._apps: set[int] = set()
+        self.logger = logging.getLogger('AzureBot.Sessions')
+
+    def setup(self, app: web.Application) -> None:
+        """Ties the pool lifecycle to the aiohttp application (idempotent)."""
+        if id(app) in self._apps:
+            return
+        self._apps.add(id(app))
+        app.on_cleanup.append(self.on_cleanup)
+
+    def get_session(self, name: str = 'default') -> aiohttp.ClientSession:
+        """Returns the shared session `name`, creating it if needed."""
+        session = self._sessions.get(name)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                use_dns_cache=True,
+                ttl_dns_cache=self.ttl_dns_cache,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+            self._sessions[name] = session
+        return session
+
+    async def close(self) -> None:
+        for name, session in list(self._sessions.items()):
+            try:
+                await session.close()
+            except Exception as exc:  # pylint: disable=W0718
+                self.logger.warning(
+                    f"Error closing HTTP session {name}: {exc}"
+                )
+        self._sessions = {}
+
+    async def on_cleanup(self, app: web.Application) -> None:
+        await self.close()
+
+    def stats(self) -> dict:
+        stats = {}
+        for name, session in self._sessions.items():
+            connector = session.connector
+            stats[name] = {
+                "closed": session.closed,
+                "limit": connector.limit if connector else None,
+                "limit_per_host": connector.limit_per_host if connector else None,
+            }
+        return stats
+
+
+## process-wide pool.
+http_pool = SessionPool()
+
+
+def get_session(name: str = 'default') -> aiohttp.ClientSession:
+    """Returns a session of the process-wide pool."""
+    return http_pool.get_session(name)
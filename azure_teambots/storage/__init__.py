@@ -0,0 +1,45 @@
+"""
+Bot State Storages.
+
+Backends used by `AbstractBot` to keep User and Conversation State.
+"""
+from typing import Union
+from botbuilder.core import Storage
+from .abstract import AbstractStorage
+from .memory import BoundedMemoryStorage
+from .state import TrackedUserState, TrackedConversationState
+from .writebehind import WriteBehindStorage
+
+
+def get_storage(backend: Union[str, Storage] = 'memory', **kwargs) -> Storage:
+    """Returns a Storage instance for the given backend name.
+
+    Args:
+        backend: one of "memory", "redis" or "sqlite"
+          (a Storage instance is returned as-is).
+        **kwargs: options passed to the backend constructor.
+    """
+    if isinstance(backend, Storage):
+        return backend
+    backend = (backend or 'memory').lower()
+    if backend == 'memory':
+        return BoundedMemoryStorage(**kwargs)
+    if backend == 'redis':
+        from .redis import RedisStorage  # pylint: disable=C0415
+        return RedisStorage(**kwargs)
+    if backend == 'sqlite':
+        from .sqlite import SQLiteStorage  # pylint: disable=C0415
+        return SQLiteStorage(**kwargs)
+    raise ValueError(
+        f"Invalid State Storage backend: {backend}"
+    )
+
+
+__all__ = (
+    'AbstractStorage',
+    'BoundedMemoryStorage',
+    'TrackedUserState',
+    'TrackedConversationState',
+    'WriteBehindStorage',
+    'get_storage',
+)
@@ -0,0 +1,91 @@
+"""
+Base class for persistent Bot State storages.
+"""
+from abc import abstractmethod
+from typing import Any, Optional
+import jsonpickle
+from botbuilder.core import Storage
+from navconfig.logging import logging
+
+
+class AbstractStorage(Storage):
+    """Persistent Storage for Bot State.
+
+    Items are serialized with `jsonpickle` (the same serializer used by
+    the Bot Framework state layer) and every key is prefixed by a namespace,
+    so several bots can share the same backend.
+    Subclasses only need to implement the multi-key primitives
+    (`read_many`, `write_many` and `delete_many`),
+    which are expected to be a single round-trip to the backend.
+
+    Writes are last-writer-wins: e_tags are kept but not enforced.
+    """
+    backend: str = 'abstract'
+
+    def __init__(self, namespace: Optional[str] = None, **kwargs):
+        super().__init__()
+        self.namespace: str = namespace or 'azurebot'
+        self._prefix: str = f"{self.namespace}:"
+        self.logger = logging.getLogger(
+            f'AzureBot.Storage.{self.backend}'
+        )
+        self.kwargs = kwargs
+
+    def key(self, key: str) -> str:
+        return f"{self._prefix}{key}"
+
+    def encode(self, item: Any) -> str:
+        return jsonpickle.encode(item)
+
+    def decode(self, data: Any) -> Any:
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        return jsonpickle.decode(data)
+
+    async def open(self) -> None:
+        """Open the connection with the backend."""
+        pass
+
+    async def close(self) -> None:
+        """Close the connection with the backend."""
+        pass
+
+    @abstractmethod
+    async def read_many(self, keys: list[str]) -> dict[str, Any]:
+        """Returns the raw (serialized) values of existing keys."""
+
+    @abstractmethod
+    async def write_many(self, items: dict[str, str]) -> None:
+        """Stores serialized values."""
+
+    @abstractmethod
+    async def delete_many(self, keys: list[str]) -> None:
+        """Removes the keys."""
+
+    async def read(self, keys: list[str]) -> dict[str, Any]:
+        if not keys:
+            return {}
+        keys = list(keys)
+        result = await self.read_many([self.key(k) for k in keys])
+        data = {}
+        for key in keys:
+            value = result.get(self.key(key))
+            if value is not None:
+                data[key] = self.decode(value)
+        return data
+
+    async def write(self, changes: dict[str, Any]) -> None:
+        if changes is None:
+            raise ValueError(
+                "Changes are required when writing"
+            )
+        if not changes:
+            return
+        await self.write_many(
+            {self.key(k): self.encode(v) for k, v in changes.items()}
+        )
+
+    async def delete(self, keys: list[str]) -> None:
+        if not keys:
+            return
+        await self.delete_many([self.key(k) for k in keys])
@@ -0,0 +1,130 @@
+"""
+Bounded In-Memory Storage for Bot State.
+
+Keeps state in the process heap, bounded by an idle TTL, a maximum number
+of entries and an (approximate) byte budget, evicting the least recently
+used entries first.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from .abstract import AbstractStorage
+from ..conf import (
+    AZUREBOT_MEMORY_TTL,
+    AZUREBOT_MEMORY_MAX_ENTRIES,
+    AZUREBOT_MEMORY_MAX_BYTES,
+)
+
+
+class BoundedMemoryStorage(AbstractStorage):
+    """In-Memory Bot State Storage with TTL and LRU eviction.
+
+    Values are kept serialized, so the byte accounting is the size of the
+    serialized state and readers never share objects with the store.
+    An entry expires `ttl` seconds after its last read or write; since every
+    access moves the entry to the end of the LRU order, the oldest entries
+    are always at the front and the expiration sweep is cheap.
+
+    Args:
+        ttl: idle seconds before an entry expires (0 disables it).
+        max_entries: maximum number of entries (0 disables it).
+        max_bytes: approximate maximum size of the stored state (0 disables it).
+        namespace: prefix of every key.
+    """
+    backend: str = 'memory'
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        namespace: Optional[str] = None,
+        **kwargs
+    ):
+        super().__init__(namespace=namespace, **kwargs)
+        self.ttl: float = AZUREBOT_MEMORY_TTL if ttl is None else ttl
+        self.max_entries: int = (
+            AZUREBOT_MEMORY_MAX_ENTRIES if max_entries is None else max_entries
+        )
+        self.max_bytes: int = (
+            AZUREBOT_MEMORY_MAX_BYTES if max_bytes is None else max_bytes
+        )
+        # key -> (serialized value, last access)
+        self._data: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._bytes: int = 0
+        self._hits: int = 0
+        self._misses: int = 0
+        self._evictions: int = 0
+        self._expirations: int = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _remove(self, key: str) -> None:
+        value, _ = self._data.pop(key)
+        self._bytes -= len(value)
+
+    def _expire(self, now: float) -> None:
+        if not self.ttl:
+            return
+        deadline = now - self.ttl
+        while self._data:
+            key, (_, accessed) = next(iter(self._data.items()))
+            if accessed > deadline:
+                break
+            self._remove(key)
+            self._expirations += 1
+
+    def _evict(self) -> None:
+        while self._data and (
+            (self.max_entries and len(self._data) > self.max_entries)
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            key = next(iter(self._data))
+            self._remove(key)
+            self._evictions += 1
+
+    async def read_many(self, keys: list[str]) -> dict[str, Any]:
+        now = time.monotonic()
+        self._expire(now)
+        result = {}
+        for key in keys:
+            entry = self._data.get(key)
+            if entry is None:
+                self._misses += 1
+                continue
+            self._hits += 1
+            self._data[key] = (entry[0], now)
+            self._data.move_to_end(key)
+            result[key] = entry[0]
+        return result
+
+    async def write_many(self, items: dict[str, str]) -> None:
+        now = time.monotonic()
+        self._expire(now)
+        for key, value in items.items():
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, now)
+            self._bytes += len(value)
+        self._evict()
+
+    async def delete_many(self, keys: list[str]) -> None:
+        for key in keys:
+            if key in self._data:
+                self._remove(key)
+
+    def stats(self) -> dict:
+        self._expire(time.monotonic())
+        return {
+            "backend": self.backend,
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+        }
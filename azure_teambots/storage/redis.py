@@ -0,0 +1,76 @@
+"""
+Redis Storage for Bot State.
+
+Any server speaking the Redis protocol (Redis, Valkey, KeyDB, Dragonfly)
+can be used, state is shared between workers and survives restarts.
+"""
+from typing import Any, Optional
+try:
+    from redis import asyncio as aioredis
+except ImportError:  # pragma: no cover
+    aioredis = None
+from .abstract import AbstractStorage
+from ..conf import AZUREBOT_REDIS_URL
+
+
+class RedisStorage(AbstractStorage):
+    """Bot State Storage using Redis.
+
+    Reads are done with a single MGET and writes are pipelined,
+    so every operation costs one round-trip no matter the number of keys.
+
+    Args:
+        url: Redis DSN (redis://host:port/db).
+        ttl: optional expiration (in seconds) of the stored state.
+        namespace: prefix of every key.
+    """
+    backend: str = 'redis'
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        ttl: Optional[int] = None,
+        namespace: Optional[str] = None,
+        **kwargs
+    ):
+        if aioredis is None:
+            raise RuntimeError(
+                "RedisStorage requires the *redis* package: pip install redis"
+            )
+        super().__init__(namespace=namespace, **kwargs)
+        self.url: str = url or AZUREBOT_REDIS_URL
+        self.ttl: Optional[int] = ttl
+        self._redis = None
+
+    @property
+    def connection(self):
+        if self._redis is None:
+            self._redis = aioredis.from_url(
+                self.url,
+                decode_responses=False,
+                **self.kwargs
+            )
+        return self._redis
+
+    async def open(self) -> None:
+        await self.connection.ping()
+
+    async def close(self) -> None:
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    async def read_many(self, keys: list[str]) -> dict[str, Any]:
+        values = await self.connection.mget(keys)
+        return {
+            key: value for key, value in zip(keys, values) if value is not None
+        }
+
+    async def write_many(self, items: dict[str, str]) -> None:
+        async with self.connection.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.set(key, value, ex=self.ttl)
+            await pipe.execute()
+
+    async def delete_many(self, keys: list[str]) -> None:
+        await self.connection.delete(*keys)
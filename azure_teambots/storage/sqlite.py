@@ -0,0 +1,104 @@
+"""
+SQLite Storage for Bot State.
+
+Single-node persistent storage, state survives restarts
+and can be shared between workers on the same host.
+"""
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+from .abstract import AbstractStorage
+from ..conf import AZUREBOT_SQLITE_PATH
+
+
+class SQLiteStorage(AbstractStorage):
+    """Bot State Storage using a SQLite database.
+
+    All statements run on a dedicated thread (sqlite3 connections are not
+    thread-safe), multi-key operations are executed in a single transaction.
+
+    Args:
+        path: database file path (":memory:" for a volatile database).
+        table: name of the state table.
+        namespace: prefix of every key.
+    """
+    backend: str = 'sqlite'
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        table: str = 'bot_state',
+        namespace: Optional[str] = None,
+        **kwargs
+    ):
+        super().__init__(namespace=namespace, **kwargs)
+        self.path: str = str(path or AZUREBOT_SQLITE_PATH)
+        self.table: str = table
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix='AzureBot.SQLite'
+        )
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def open(self) -> None:
+        await self._run(self._connect)
+
+    async def close(self) -> None:
+        await self._run(self._close)
+
+    def _read(self, keys: list[str]) -> dict[str, Any]:
+        conn = self._connect()
+        placeholders = ','.join('?' * len(keys))
+        cursor = conn.execute(
+            f"SELECT key, value FROM {self.table} WHERE key IN ({placeholders})",
+            keys
+        )
+        return dict(cursor.fetchall())
+
+    def _write(self, items: dict[str, str]) -> None:
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value) VALUES (?, ?)",
+                items.items()
+            )
+
+    def _delete(self, keys: list[str]) -> None:
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                f"DELETE FROM {self.table} WHERE key = ?",
+                [(k,) for k in keys]
+            )
+
+    async def read_many(self, keys: list[str]) -> dict[str, Any]:
+        return await self._run(self._read, keys)
+
+    async def write_many(self, items: dict[str, str]) -> None:
+        await self._run(self._write, items)
+
+    async def delete_many(self, keys: list[str]) -> None:
+        await self._run(self._delete, keys)
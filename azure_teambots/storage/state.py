@@ -0,0 +1,138 @@
+"""
+Dirty-tracked Bot State.
+
+Drop-in replacements of `UserState` and `ConversationState` that
+fingerprint every state property the first time it is touched in a turn,
+so saving only serializes the touched properties and only writes
+when one of them actually changed.
+"""
+import hashlib
+from typing import Optional
+from jsonpickle.pickler import Pickler
+from botbuilder.core.bot_state import CachedBotState
+from botbuilder.core import (
+    ConversationState,
+    TurnContext,
+    UserState,
+)
+
+
+def fingerprint(value: object) -> str:
+    """Stable digest of a (jsonpickle-flattened) state value."""
+    flat = str(Pickler().flatten(value))
+    return hashlib.blake2b(flat.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class TrackedCachedState(CachedBotState):
+    """State cached in the turn context, tracking changes per property.
+
+    Properties are fingerprinted lazily, only those read or written during
+    the turn are compared when deciding whether the state must be saved.
+    """
+
+    def __init__(self, state: Optional[dict] = None):  # pylint: disable=W0231
+        # CachedBotState computes a hash of the whole state, skipped here.
+        self.state = state if state is not None else {}
+        self.hash = None
+        self.forced: bool = False
+        self.fingerprints: dict[str, Optional[str]] = {}
+
+    def touch(self, name: str) -> None:
+        if name not in self.fingerprints:
+            self.fingerprints[name] = self._current(name)
+
+    def touch_all(self) -> None:
+        for name in list(self.state):
+            self.touch(name)
+
+    def _current(self, name: str) -> Optional[str]:
+        value = self.state.get(name)
+        return None if value is None else fingerprint(value)
+
+    def changed_properties(self) -> set[str]:
+        return {
+            name for name, digest in self.fingerprints.items()
+            if self._current(name) != digest
+        }
+
+    @property
+    def is_changed(self) -> bool:
+        return self.forced or bool(self.changed_properties())
+
+    def commit(self) -> None:
+        """Marks the current values as saved."""
+        self.forced = False
+        # values handed out can still be mutated later in the turn.
+        self.fingerprints = {name: self._current(name) for name in self.fingerprints}
+
+
+class TrackedBotState:
+    """Mixin for `BotState` subclasses using `TrackedCachedState`."""
+
+    async def load(self, turn_context: TurnContext, force: bool = False) -> None:
+        cached_state = self.get_cached_state(turn_context)
+        if force or not cached_state or not cached_state.state:
+            storage_key = self.get_storage_key(turn_context)
+            items = await self._storage.read([storage_key])
+            turn_context.turn_state[self._context_service_key] = TrackedCachedState(
+                items.get(storage_key)
+            )
+
+    def get(self, turn_context: TurnContext) -> dict:
+        cached_state = self.get_cached_state(turn_context)
+        if cached_state is None:
+            return None
+        # the whole state was handed out, any property can change.
+        cached_state.touch_all()
+        return cached_state.state
+
+    async def get_property_value(self, turn_context: TurnContext, property_name: str):
+        self.get_cached_state(turn_context).touch(property_name)
+        return await super().get_property_value(turn_context, property_name)
+
+    async def set_property_value(
+        self, turn_context: TurnContext, property_name: str, value: object
+    ) -> None:
+        self.get_cached_state(turn_context).touch(property_name)
+        await super().set_property_value(turn_context, property_name, value)
+
+    async def delete_property_value(
+        self, turn_context: TurnContext, property_name: str
+    ) -> None:
+        self.get_cached_state(turn_context).touch(property_name)
+        await super().delete_property_value(turn_context, property_name)
+
+    async def clear_state(self, turn_context: TurnContext):
+        cached_state = TrackedCachedState()
+        cached_state.forced = True
+        turn_context.turn_state[self._context_service_key] = cached_state
+
+    def get_changes(self, turn_context: TurnContext, force: bool = False) -> dict:
+        """Returns the `{storage_key: state}` pending to be written (if any)."""
+        cached_state = self.get_cached_state(turn_context)
+        if cached_state is None:
+            return {}
+        if force or cached_state.is_changed:
+            return {self.get_storage_key(turn_context): cached_state.state}
+        return {}
+
+    def mark_saved(self, turn_context: TurnContext) -> None:
+        cached_state = self.get_cached_state(turn_context)
+        if cached_state is not None:
+            cached_state.commit()
+
+    async def save_changes(
+        self, turn_context: TurnContext, force: bool = False
+    ) -> None:
+        changes = self.get_changes(turn_context, force)
+        if changes:
+            await self._storage.write(changes)
+            self.mark_saved(turn_context)
+
+
+class TrackedUserState(TrackedBotState, UserState):
+    """User State with per-property dirty tracking."""
+
+
+class TrackedConversationState(TrackedBotState, ConversationState):
+    """Conversation State with per-property dirty tracking."""
@@ -0,0 +1,140 @@
+"""
+Write-behind Storage.
+
+Wraps any Storage delaying writes for a short window: all the changes
+received in that window (from any number of turns) are coalesced and
+flushed to the backend in a single write.
+"""
+import asyncio
+from copy import deepcopy
+from typing import Any, Optional
+from botbuilder.core import Storage
+from navconfig.logging import logging
+
+
+class WriteBehindStorage(Storage):
+    """Storage decorator buffering writes for `delay` seconds.
+
+    Reads see the buffered values (read-your-writes), so turns never observe
+    stale state. Buffered changes are lost if the process dies before the
+    flush, keep `delay` short (sub-second to a few seconds).
+
+    Args:
+        storage: the backend Storage.
+        delay: seconds to wait before flushing the buffered changes.
+        max_pending: flush immediately when this number of keys is buffered.
+    """
+
+    def __init__(
+        self,
+        storage: Storage,
+        delay: float = 0.5,
+        max_pending: int = 500
+    ):
+        super().__init__()
+        self.storage = storage
+        self.delay: float = delay
+        self.max_pending: int = max_pending
+        self._pending: dict[str, Any] = {}
+        self._inflight: dict[str, Any] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushing: set[asyncio.Task] = set()
+        self._lock = asyncio.Lock()
+        self._flushes: int = 0
+        self._coalesced: int = 0
+        self.logger = logging.getLogger('AzureBot.Storage.WriteBehind')
+
+    async def open(self) -> None:
+        if callable(getattr(self.storage, 'open', None)):
+            await self.storage.open()
+
+    async def close(self) -> None:
+        await self.flush()
+        if self._timer is not None:
+            # a failed final flush is not retried.
+            self._timer.cancel()
+            self._timer = None
+        if callable(getattr(self.storage, 'close', None)):
+            await self.storage.close()
+
+    async def read(self, keys: list[str]) -> dict[str, Any]:
+        data = {}
+        missing = []
+        for key in keys:
+            if key in self._pending:
+                data[key] = deepcopy(self._pending[key])
+            elif key in self._inflight:
+                data[key] = deepcopy(self._inflight[key])
+            else:
+                missing.append(key)
+        if missing:
+            data.update(await self.storage.read(missing))
+        return data
+
+    async def write(self, changes: dict[str, Any]) -> None:
+        if changes is None:
+            raise ValueError(
+                "Changes are required when writing"
+            )
+        for key, value in changes.items():
+            if key in self._pending:
+                self._coalesced += 1
+            self._pending[key] = deepcopy(value)
+        if len(self._pending) >= self.max_pending:
+            await self.flush()
+        else:
+            self._arm()
+
+    async def delete(self, keys: list[str]) -> None:
+        async with self._lock:
+            for key in keys:
+                self._pending.pop(key, None)
+            await self.storage.delete(keys)
+
+    def _schedule_flush(self) -> None:
+        self._timer = None
+        # a flush in progress holds the lock: this one writes what was
+        # buffered meanwhile once it is done.
+        task = asyncio.create_task(self.flush())
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    def _arm(self) -> None:
+        if self._timer is None and self._pending:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.delay, self._schedule_flush)
+
+    async def flush(self) -> None:
+        """Writes all buffered changes to the backend (single write)."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        async with self._lock:
+            if not self._pending:
+                return
+            self._inflight, self._pending = self._pending, {}
+            try:
+                await self.storage.write(self._inflight)
+                self._flushes += 1
+            except Exception as exc:  # pylint: disable=W0718
+                self.logger.error(
+                    f"Error flushing {len(self._inflight)} state changes: {exc}"
+                )
+                # keep the changes for the next flush, newer values win.
+                for key, value in self._inflight.items():
+                    self._pending.setdefault(key, value)
+            finally:
+                self._inflight = {}
+                # changes buffered during the write (or not written).
+                self._arm()
+
+    def stats(self) -> dict:
+        stats = {}
+        if callable(getattr(self.storage, 'stats', None)):
+            stats.update(self.storage.stats())
+        stats["write_behind"] = {
+            "pending": len(self._pending),
+            "flushes": self._flushes,
+            "coalesced": self._coalesced,
+        }
+        return stats
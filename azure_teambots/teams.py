@@ -0,0 +1,250 @@
+"""
+MS Teams Metadata Caches.
+
+Process-wide caches for the Teams connector lookups done on every turn
+(member profiles, team details and channels), shared by all bots.
+"""
+from typing import Optional
+from botbuilder.core import TurnContext
+from botbuilder.core.teams import (
+    TeamsInfo,
+    teams_get_channel_id,
+    teams_get_team_info,
+)
+from botbuilder.schema.teams import (
+    ChannelInfo,
+    TeamDetails,
+    TeamsChannelAccount,
+    TeamsChannelData,
+)
+from navconfig.logging import logging
+from .cache import TTLCache, SingleFlight, MISSING
+from .conf import (
+    AZUREBOT_MEMBER_CACHE_SIZE,
+    AZUREBOT_MEMBER_TTL,
+    AZUREBOT_MEMBER_NEGATIVE_TTL,
+    AZUREBOT_TEAM_CACHE_SIZE,
+    AZUREBOT_TEAM_TTL,
+)
+
+
+def get_tenant_id(activity) -> Optional[str]:
+    """Tenant of an activity (conversation or channel data)."""
+    tenant_id = getattr(activity.conversation, 'tenant_id', None)
+    if tenant_id:
+        return tenant_id
+    channel_data = activity.channel_data or {}
+    if isinstance(channel_data, dict):
+        return (channel_data.get('tenant') or {}).get('id')
+    return None
+
+
+class MemberCache:
+    """Cache of `TeamsInfo.get_member` lookups.
+
+    Members are keyed by (tenant id, AAD object id) -falling back to the
+    channel account id when the object id is unknown-. Failed lookups are
+    cached for `negative_ttl` seconds and concurrent lookups of the same
+    member share a single connector call.
+
+    Args:
+        maxsize: maximum number of cached members.
+        ttl: seconds a member profile is cached.
+        negative_ttl: seconds a failed lookup is cached.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = AZUREBOT_MEMBER_CACHE_SIZE,
+        ttl: float = AZUREBOT_MEMBER_TTL,
+        negative_ttl: float = AZUREBOT_MEMBER_NEGATIVE_TTL
+    ):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._flight = SingleFlight()
+        self.negative_ttl: float = negative_ttl
+        self._lookups: int = 0
+        self._failures: int = 0
+        self.logger = logging.getLogger('AzureBot.Teams.Members')
+
+    def key(self, turn_context: TurnContext, member_id: str) -> tuple:
+        activity = turn_context.activity
+        sender = activity.from_property
+        object_id = None
+        if sender is not None and sender.id == member_id:
+            object_id = sender.aad_object_id
+        return (get_tenant_id(activity), object_id or member_id)
+
+    async def get_member(
+        self,
+        turn_context: TurnContext,
+        member_id: Optional[str] = None
+    ) -> Optional[TeamsChannelAccount]:
+        """Returns the Teams member (None if the lookup failed)."""
+        member_id = member_id or turn_context.activity.from_property.id
+        key = self.key(turn_context, member_id)
+        member = self._cache.get(key)
+        if member is not MISSING:
+            return member
+
+        async def lookup():
+            self._lookups += 1
+            try:
+                result = await TeamsInfo.get_member(turn_context, member_id)
+            except Exception as exc:  # pylint: disable=W0718
+                self._failures += 1
+                self.logger.warning(
+                    f"Error on Teams user's profile {member_id}: {exc}"
+                )
+                result = None
+            self._cache.set(
+                key,
+                result,
+                ttl=None if result is not None else self.negative_ttl
+            )
+            return result
+
+        return await self._flight.do(key, lookup)
+
+    def invalidate(self, turn_context: TurnContext, member_id: str) -> None:
+        self._cache.pop(self.key(turn_context, member_id))
+
+    def stats(self) -> dict:
+        return {
+            **self._cache.stats(),
+            **self._flight.stats(),
+            "lookups": self._lookups,
+            "failures": self._failures,
+        }
+
+
+class TeamCache:
+    """Cache of team details and channels.
+
+    Entries are loaded lazily (`TeamsInfo.get_team_details` and
+    `TeamsInfo.get_team_channels`) and kept up to date with the Teams
+    `conversationUpdate` events (team renamed, channel created/renamed/deleted,
+    team deleted...), so in steady state reads do not hit the network.
+
+    Args:
+        maxsize: maximum number of cached teams.
+        ttl: seconds a team is cached (safety net for missed events).
+    """
+    _team_events = ('teamDeleted', 'teamHardDeleted', 'teamArchived')
+
+    def __init__(
+        self,
+        maxsize: int = AZUREBOT_TEAM_CACHE_SIZE,
+        ttl: float = AZUREBOT_TEAM_TTL
+    ):
+        self._details = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._channels = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._flight = SingleFlight()
+        self._lookups: int = 0
+        self._events: int = 0
+        self.logger = logging.getLogger('AzureBot.Teams.Teams')
+
+    async def get_team_details(
+        self,
+        turn_context: TurnContext,
+        team_id: Optional[str] = None
+    ) -> Optional[TeamDetails]:
+        """Returns the details of the team (None outside of a team)."""
+        team_id = team_id or self.team_id(turn_context)
+        if not team_id:
+            return None
+        details = self._details.get(team_id)
+        if details is not MISSING:
+            return details
+
+        async def lookup():
+            self._lookups += 1
+            result = await TeamsInfo.get_team_details(turn_context, team_id)
+            self._details.set(team_id, result)
+            return result
+
+        return await self._flight.do(('details', team_id), lookup)
+
+    async def get_channels(
+        self,
+        turn_context: TurnContext,
+        team_id: Optional[str] = None
+    ) -> dict[str, ChannelInfo]:
+        """Returns the channels of the team, by channel id."""
+        team_id = team_id or self.team_id(turn_context)
+        if not team_id:
+            return {}
+        channels = self._channels.get(team_id)
+        if channels is not MISSING:
+            return channels
+
+        async def lookup():
+            self._lookups += 1
+            result = await TeamsInfo.get_team_channels(turn_context, team_id)
+            channels = {channel.id: channel for channel in result or []}
+            self._channels.set(team_id, channels)
+            return channels
+
+        return await self._flight.do(('channels', team_id), lookup)
+
+    async def get_channel(
+        self,
+        turn_context: TurnContext,
+        channel_id: Optional[str] = None
+    ) -> Optional[ChannelInfo]:
+        """Returns the channel where the activity was posted."""
+        channel_id = channel_id or teams_get_channel_id(turn_context.activity)
+        if not channel_id:
+            return None
+        channels = await self.get_channels(turn_context)
+        return channels.get(channel_id)
+
+    @staticmethod
+    def team_id(turn_context: TurnContext) -> Optional[str]:
+        team = teams_get_team_info(turn_context.activity)
+        return team.id if team else None
+
+    def update_from_activity(self, activity) -> None:
+        """Applies a Teams conversationUpdate event to the cache."""
+        if not isinstance(activity.channel_data, dict):
+            return
+        channel_data = TeamsChannelData().deserialize(activity.channel_data)
+        event = channel_data.event_type
+        team = channel_data.team
+        if not event or not team or not team.id:
+            return
+        self._events += 1
+        if event in self._team_events:
+            self._details.pop(team.id)
+            self._channels.pop(team.id)
+            return
+        details = self._details.get(team.id)
+        if event == 'teamRenamed' and details is not MISSING and team.name:
+            details.name = team.name
+        channel = channel_data.channel
+        if not channel or not channel.id:
+            return
+        channels = self._channels.get(team.id)
+        if event in ('channelCreated', 'channelRenamed', 'channelRestored'):
+            if channels is not MISSING:
+                channels[channel.id] = ChannelInfo(id=channel.id, name=channel.name)
+            if event != 'channelRenamed' and details is not MISSING and details.channel_count:
+                details.channel_count += 1
+        elif event == 'channelDeleted':
+            if channels is not MISSING:
+                channels.pop(channel.id, None)
+            if details is not MISSING and details.channel_count:
+                details.channel_count -= 1
+
+    def stats(self) -> dict:
+        return {
+            "teams": len(self._details),
+            "channels": len(self._channels),
+            "lookups": self._lookups,
+            "events": self._events,
+            **self._flight.stats(),
+        }
+
+
+## shared by all bots.
+member_cache = MemberCache()
+team_cache = TeamCache()
@@ -0,0 +1,55 @@
+"""
+Microbenchmark: inbound Activity deserialization.
+
+Compares the former path of AbstractBot.messages (stdlib json, then
+msrest `Activity().deserialize`) with the compiled reader (orjson, then
+`read_activity`), on the Teams payloads of tests/payloads. The handlers
+read the text, sender, conversation and entities of every activity.
+
+    python benchmarks/bench_activity.py [iterations]
+"""
+import json
+import sys
+import timeit
+from pathlib import Path
+from botbuilder.schema import Activity
+from azure_teambots.activity import loads, read_activity
+
+
+PAYLOADS = Path(__file__).parent.parent.joinpath('tests', 'payloads')
+
+
+def touch(activity: Activity) -> None:
+    _ = (
+        activity.text,
+        activity.from_property.id,
+        activity.conversation.id,
+        activity.entities,
+    )
+
+
+def msrest_path(raw: bytes) -> None:
+    touch(Activity().deserialize(json.loads(raw)))
+
+
+def compiled_path(raw: bytes) -> None:
+    touch(read_activity(loads(raw)))
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for path in sorted(PAYLOADS.glob('*.json')):
+        raw = path.read_bytes()
+        results = {}
+        for name, func in (("msrest", msrest_path), ("compiled", compiled_path)):
+            elapsed = min(timeit.repeat(lambda: func(raw), number=iterations, repeat=5))
+            results[name] = elapsed / iterations * 1e6
+        print(
+            f"{path.stem:18} msrest {results['msrest']:8.1f} us"
+            f"  compiled {results['compiled']:7.1f} us"
+            f"  x{results['msrest'] / results['compiled']:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Microbenchmark: mention parsing of a channel message turn.
+
+Everything a turn needs to know about the mentions (was the bot
+mentioned, the text without mentions, the text after the trigger word and
+the command): the former EchoChannelBot/ChannelBot helpers (uncompiled
+`re.findall`, repeated replace/lower/split, entity rescans) against one
+MentionParser pass cached for the turn.
+
+    python benchmarks/bench_mentions.py [iterations]
+"""
+import re
+import sys
+import timeit
+from botbuilder.schema import Activity
+from azure_teambots.mentions import MentionParser
+
+
+BOT_NAME = "Echo Bot"
+BOT_ID = "28:echo-bot"
+TRIGGER = "echo"
+
+
+def activity(text: str, mentioned: list[tuple[str, str]]) -> Activity:
+    return Activity().deserialize({
+        "type": "message",
+        "channelId": "msteams",
+        "text": text,
+        "recipient": {"id": BOT_ID, "name": BOT_NAME},
+        "conversation": {"id": "19:channel", "conversationType": "channel"},
+        "entities": [
+            {"type": "mention", "mentioned": {"id": uid, "name": name}, "text": f"<at>{name}</at>"}
+            for uid, name in mentioned
+        ],
+    })
+
+
+ACTIVITIES = [
+    activity(f"<at>{BOT_NAME}</at> echo hello world", [(BOT_ID, BOT_NAME)]),
+    activity(f"<at>{BOT_NAME}</at> help", [(BOT_ID, BOT_NAME)]),
+    activity(
+        f"Hi <at>Jane Doe</at> and <at>{BOT_NAME}</at>, echo \"check the build\"",
+        [("29:jane", "Jane Doe"), (BOT_ID, BOT_NAME)]
+    ),
+    activity("no mention here, just a long message " * 8, []),
+    activity("<at>Other Bot</at> status of the deployment", [("28:other", "Other Bot")]),
+]
+
+
+class Legacy:
+    """The former EchoChannelBot helpers (logging removed)."""
+    mention_text = TRIGGER
+    strip_quotes = True
+    _bot_name = BOT_NAME
+
+    def process_teams_mention(self, text):
+        if "<at>" in text and "</at>" in text:
+            mentions = re.findall(r'<at>.*?</at>', text)
+            cleaned_text = text
+            for mention in mentions:
+                cleaned_text = cleaned_text.replace(mention, "").strip()
+        else:
+            cleaned_text = text
+        if self.mention_text.lower() in cleaned_text.lower():
+            parts = cleaned_text.lower().split(self.mention_text.lower(), 1)
+            cleaned_text = parts[1].strip() if len(parts) > 1 else ""
+        if self.strip_quotes and cleaned_text and (
+            (cleaned_text.startswith('"') and cleaned_text.endswith('"')) or
+            (cleaned_text.startswith("'") and cleaned_text.endswith("'"))
+        ):
+            cleaned_text = cleaned_text[1:-1]
+        return cleaned_text
+
+    def was_bot_mentioned(self, activity):
+        bot_id = activity.recipient.id
+        if f"<at>{self._bot_name}</at>" in activity.text:
+            return True
+        for entity in activity.entities or []:
+            if entity.type == "mention":
+                if hasattr(entity, 'mentioned') and hasattr(entity.mentioned, 'id') and entity.mentioned.id == bot_id:
+                    return True
+                elif hasattr(entity, 'id') and entity.id == bot_id:
+                    return True
+                elif hasattr(entity, 'text') and self._bot_name.lower() in entity.text.lower():
+                    return True
+        return self._bot_name.lower() in activity.text.lower()
+
+    def remove_mentions_from_text(self, activity):
+        text = activity.text
+        at_mention = f"<at>{self._bot_name}</at>"
+        if at_mention in text:
+            text = text.replace(at_mention, "").strip()
+        for entity in activity.entities or []:
+            if entity.type == "mention":
+                if hasattr(entity, 'start_index') and hasattr(entity, 'end_index'):
+                    mention_text = text[entity.start_index:entity.end_index]
+                    text = text.replace(mention_text, "").strip()
+                elif hasattr(entity, 'text'):
+                    text = text.replace(entity.text, "").strip()
+        return text
+
+    def turn(self, activity):
+        """Mentioned?, text without mentions, trigger text and command."""
+        mentioned = self.was_bot_mentioned(activity)
+        without = self.remove_mentions_from_text(activity)
+        triggered = self.process_teams_mention(without)
+        # ChannelBot._remove_mention_text and command
+        parts = activity.text.split(">")
+        text = "".join(parts[1:]).strip() if len(parts) > 1 else activity.text.strip()
+        command = text.strip().lower().split()[0] if text and text.strip() else ""
+        return mentioned, without, triggered, command
+
+
+def parsed_turn(parser: MentionParser, activity):
+    turn_state = {}
+    # every handler of the turn reads the same parsed message.
+    for _ in range(3):
+        message = turn_state.get(parser.state_key)
+        if message is None:
+            message = turn_state[parser.state_key] = parser.parse(activity)
+    return message.bot_mentioned, message.clean, message.triggered, message.command
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    legacy = Legacy()
+    parser = MentionParser(BOT_NAME, trigger=TRIGGER)
+    cases = {
+        "legacy": lambda: [legacy.turn(a) for a in ACTIVITIES],
+        "parser": lambda: [parsed_turn(parser, a) for a in ACTIVITIES],
+    }
+    for name, func in cases.items():
+        elapsed = min(timeit.repeat(func, number=iterations, repeat=5))
+        per_turn = elapsed / (iterations * len(ACTIVITIES)) * 1e6
+        print(f"{name:8} {per_turn:8.3f} us/turn")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+from pathlib import Path
+import pytest
+from botbuilder.schema import Activity
+from azure_teambots.activity import loads, read_activity
+
+
+PAYLOADS = sorted(Path(__file__).parent.joinpath('payloads').glob('*.json'))
+
+
+@pytest.mark.parametrize('path', PAYLOADS, ids=lambda path: path.stem)
+def test_read_activity(path):
+    body = loads(path.read_bytes())
+    expected = Activity().deserialize(body)
+    activity = read_activity(body)
+    assert isinstance(activity, Activity)
+    assert activity.serialize() == expected.serialize()
+    assert activity.timestamp == expected.timestamp
+    assert vars(activity.from_property) == vars(expected.from_property)
+    assert [vars(e) for e in activity.entities or []] == [vars(e) for e in expected.entities or []]
+    activity.entities = None
+    assert activity.entities is None
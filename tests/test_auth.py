@@ -0,0 +1,124 @@
+import time
+import jwt
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from botbuilder.integration.aiohttp import ConfigurationBotFrameworkAuthentication
+from botbuilder.schema import Activity
+from botframework.connector.auth import ChannelValidation
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+from azure_teambots.auth import CachedAuthentication, SigningKeyStore
+from azure_teambots.config import BotConfig
+from azure_teambots.sessions import http_pool
+
+
+APP_ID = 'bot-app-id'
+SERVICE_URL = 'https://smba.trafficmanager.net/amer/'
+
+
+class JWKSStandIn:
+    """Minimal OpenID metadata and JWKS endpoints of the Bot Connector."""
+
+    def __init__(self):
+        self.calls: list = []
+        self.keys: dict = {}
+        self.app = web.Application()
+        self.app.router.add_get('/openidconfiguration', self.metadata)
+        self.app.router.add_get('/keys', self.jwks)
+        self.server = None
+        self.rotate()
+
+    def rotate(self) -> str:
+        kid = f"key-{len(self.keys)}"
+        self.keys[kid] = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        return kid
+
+    def token(self, kid: str, expires_in: int = 3600) -> str:
+        claims = {
+            "iss": "https://api.botframework.com",
+            "aud": APP_ID,
+            "serviceurl": SERVICE_URL,
+            "exp": int(time.time()) + expires_in,
+            "nbf": int(time.time()) - 60,
+        }
+        return jwt.encode(claims, self.keys[kid], algorithm='RS256', headers={"kid": kid})
+
+    async def metadata(self, request):
+        self.calls.append('metadata')
+        return web.json_response({"jwks_uri": str(request.url.with_path('/keys'))})
+
+    async def jwks(self, request):
+        self.calls.append('keys')
+        keys = []
+        for kid, key in self.keys.items():
+            jwk = RSAAlgorithm.to_jwk(key.public_key(), as_dict=True)
+            keys.append({**jwk, "kid": kid, "endorsements": ["msteams"]})
+        return web.json_response({"keys": keys})
+
+
+@pytest.fixture
+async def jwks():
+    standin = JWKSStandIn()
+    server = TestServer(standin.app)
+    await server.start_server()
+    url = str(server.make_url('/openidconfiguration'))
+    previous = ChannelValidation.open_id_metadata_endpoint
+    ChannelValidation.open_id_metadata_endpoint = url
+    store = SigningKeyStore(interval=3600, min_refresh=0)
+    auth = CachedAuthentication(
+        ConfigurationBotFrameworkAuthentication(
+            BotConfig(client_id=APP_ID, client_secret='secret')
+        )
+    )
+    yield standin, store, auth, url
+    ChannelValidation.open_id_metadata_endpoint = previous
+    await store.stop()
+    await http_pool.close()
+    await server.close()
+
+
+def _activity() -> Activity:
+    return Activity(type='message', channel_id='msteams', service_url=SERVICE_URL)
+
+
+async def test_prefetched_keys_and_cached_tokens(jwks):
+    standin, store, auth, url = jwks
+    await store.start([url])
+    await store.refresh()
+    fetches = len(standin.calls)
+    token = standin.token('key-0')
+    for _ in range(5):
+        result = await auth.authenticate_request(_activity(), f"Bearer {token}")
+        assert result.claims_identity.claims['aud'] == APP_ID
+    # the keys were prefetched, and the token validated once.
+    assert len(standin.calls) == fetches
+    stats = auth.stats()
+    assert stats['validations'] == 1
+    assert stats['hits'] == 4
+    # a token for another service url is validated again (and rejected).
+    other = Activity(type='message', channel_id='msteams', service_url='https://evil/')
+    with pytest.raises(PermissionError):
+        await auth.authenticate_request(other, f"Bearer {token}")
+
+
+async def test_rotated_and_invalid_keys(jwks):
+    standin, store, auth, url = jwks
+    await store.start([url])
+    await store.refresh()
+    # a new signing key: keys are fetched again once.
+    kid = standin.rotate()
+    result = await auth.authenticate_request(_activity(), f"Bearer {standin.token(kid)}")
+    assert result.claims_identity.is_authenticated
+    assert store.get(url).stats()['keys'] == 2
+    # signed by a key that is not published.
+    unpublished = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    claims = jwt.decode(standin.token(kid), options={"verify_signature": False})
+    forged = jwt.encode(claims, unpublished, algorithm='RS256', headers={"kid": 'key-9'})
+    with pytest.raises(PermissionError):
+        await auth.authenticate_request(_activity(), f"Bearer {forged}")
+    assert store.get(url).stats()['unknown'] == 1
+    # expired tokens are rejected, and failures are not cached.
+    with pytest.raises(Exception):
+        await auth.authenticate_request(_activity(), f"Bearer {standin.token(kid, -600)}")
+    assert auth.stats()['entries'] == 1
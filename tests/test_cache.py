@@ -0,0 +1,39 @@
+import asyncio
+import pytest
+from azure_teambots.cache import SingleFlight
+
+
+async def test_waiters_take_over_a_cancelled_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(len(calls))
+        await asyncio.sleep(0.05)
+        return len(calls)
+
+    leader = asyncio.create_task(flight.do('key', fetch))
+    await asyncio.sleep(0)
+    waiters = [asyncio.create_task(flight.do('key', fetch)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+    # the call runs again once, for all the waiters.
+    assert await asyncio.gather(*waiters) == [2, 2, 2]
+    assert len(calls) == 2
+    assert len(flight) == 0
+
+
+async def test_failures_are_shared():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise KeyError('key')
+
+    results = await asyncio.gather(
+        *(flight.do('key', fail) for _ in range(3)), return_exceptions=True
+    )
+    assert all(isinstance(result, KeyError) for result in results)
+    assert flight.stats() == {"inflight": 0, "shared": 2}
@@ -0,0 +1,106 @@
+import json
+import pytest
+from azure_teambots.cards import CardBudget, CardRegistry, minify
+from azure_teambots.exceptions import CardTooLarge
+
+
+CARD = {
+    "type": "AdaptiveCard",
+    "body": [
+        {"type": "TextBlock", "text": "Hi ${person.name} (${person.email})", "wrap": False},
+        {"type": "Input.ChoiceSet", "id": "badge", "choices": "${choices}"},
+        {"type": "Input.Text", "id": "message"}
+    ],
+    "actions": [{"type": "Action.Submit", "title": "Send"}]
+}
+
+
+def test_render_template():
+    registry = CardRegistry()
+    template = registry.register('test', CARD)
+    data = {"person": {"name": 'Jane "J" Doe'}, "choices": [{"title": "A", "value": "1"}]}
+    card = registry.render('test', data)
+    assert card["body"][0]["text"] == 'Hi Jane "J" Doe ()'
+    assert card["body"][1]["choices"] == data["choices"]
+    # defaults are stripped, static parts are shared.
+    assert "wrap" not in card["body"][0]
+    assert card["actions"] is template.card["actions"]
+    assert card["body"][2] is template.card["body"][2]
+    assert template.card["body"][0]["text"] == "Hi ${person.name} (${person.email})"
+    assert json.loads(template.render_json(data)) == card
+
+
+def test_static_attachment():
+    registry = CardRegistry()
+    registry.register('static', CARD["actions"][0] | {"type": "AdaptiveCard"})
+    first = registry.attachment('static')
+    assert registry.attachment('static') is first
+    assert registry.stats() == {"templates": 1, "renders": 2, "static": 2}
+
+
+def test_card_budget():
+    budget = CardBudget(max_bytes=600)
+    text = "\n".join(f"Line {i} of a very long message" for i in range(60))
+    card = {
+        "type": "AdaptiveCard",
+        "version": "1.3",
+        "body": [
+            {"type": "TextBlock", "text": "Title", "size": "Default", "weight": "bolder"},
+            {"type": "TextBlock", "text": text, "wrap": True},
+            {"type": "Input.Text", "id": "message", "isMultiline": False},
+        ],
+        "actions": [{"type": "Action.Submit", "title": "Send"}],
+    }
+    with pytest.raises(CardTooLarge):
+        budget.prepare(card, name='long')
+    cards = budget.split(card, name='long')
+    assert len(cards) > 1
+    assert all(len(json.dumps(c, separators=(',', ':'))) <= 600 for c in cards)
+    texts = [b["text"] for c in cards for b in c["body"] if b["type"] == "TextBlock"]
+    assert "\n".join(texts[1:]) == text
+    assert cards[0]["body"][0] == {"type": "TextBlock", "text": "Title", "weight": "bolder"}
+    assert cards[-1]["body"][-1] == {"type": "Input.Text", "id": "message"}
+    assert "actions" in cards[-1] and "actions" not in cards[0]
+    stats = budget.stats()
+    assert stats["rejected"] == 1 and stats["splits"] == 1
+    assert stats["cards"]["long"]["parts"] == len(cards)
+
+
+def test_minify_keeps_inherited_properties_and_action_data():
+    card = {
+        "type": "AdaptiveCard",
+        "body": [{
+            "type": "Container",
+            "style": "emphasis",
+            "items": [{
+                "type": "Container",
+                "style": "default",
+                "bleed": False,
+                "items": [
+                    {"type": "TextBlock", "text": "Hi", "horizontalAlignment": "left", "wrap": False},
+                    {"type": "Image", "url": "x", "horizontalAlignment": "Left", "size": "auto"},
+                ],
+            }],
+        }],
+        "actions": [{
+            "type": "Action.Submit",
+            "title": "Send",
+            "style": "default",
+            "data": {"action": "send", "comment": None, "msteams": {"type": "messageBack"}},
+        }],
+    }
+    inner = minify(card)["body"][0]["items"][0]
+    # a default that overrides what the parent sets is kept.
+    assert inner == {
+        "type": "Container",
+        "style": "default",
+        "items": [
+            {"type": "TextBlock", "text": "Hi", "horizontalAlignment": "left"},
+            {"type": "Image", "url": "x", "horizontalAlignment": "Left"},
+        ],
+    }
+    assert minify(card)["actions"] == [{
+        "type": "Action.Submit",
+        "title": "Send",
+        "data": {"action": "send", "comment": None, "msteams": {"type": "messageBack"}},
+    }]
@@ -0,0 +1,82 @@
+import pytest
+from aiohttp import web
+from botbuilder.core import TurnContext
+from botbuilder.core.adapters import TestAdapter
+from botbuilder.schema import Activity, ChannelAccount, ConversationAccount
+from azure_teambots.bots.private import PrivateChatBot
+from azure_teambots.commands import CommandError, CommandRouter, command
+
+
+class Commands:
+    @command(aliases=("?",))
+    async def help(self, turn_context):
+        """Show the help"""
+
+    @command(prefix=True)
+    async def remind(self, turn_context, minutes: int, loud: bool = False, text: str = ""):
+        """Remind me something"""
+
+    @command(prefix=True)
+    async def report(self, turn_context, days: int = 7):
+        pass
+
+
+def test_router_lookup():
+    router = CommandRouter.from_class(Commands)
+    assert router.match("HELP").name == "help"
+    assert router.match("?").name == "help"
+    assert router.match("rem").name == "remind"
+    # ambiguous prefix
+    assert router.match("re") is None
+    assert router.match("unknown") is None
+    # ordinary words: prefixes are opt-in, and 3 characters long at least.
+    assert router.match("he") is None
+    assert router.match("rep").name == "report"
+    assert router.match("r") is None
+    assert "- remind <minutes> [loud] [text]: Remind me something" in router.help()
+
+
+def test_argument_parsing():
+    remind = CommandRouter.from_class(Commands).match("remind")
+    assert remind.parse('10 yes call "Jane" back') == {
+        "minutes": 10, "loud": True, "text": 'call "Jane" back'
+    }
+    assert remind.parse("5") == {"minutes": 5}
+    with pytest.raises(CommandError):
+        remind.parse("")
+    with pytest.raises(CommandError):
+        remind.parse("soon")
+    report = CommandRouter.from_class(Commands).match("report")
+    with pytest.raises(CommandError):
+        report.parse("7 8")
+
+
+def test_commands_without_arguments_are_the_whole_message():
+    router = CommandRouter.from_class(Commands)
+    assert router.match("help").accepts("")
+    assert not router.match("help").accepts("me")
+    assert router.match("report").accepts("14")
+    assert router.match("remind").accepts("")
+
+
+async def test_sentences_are_not_commands():
+    bot = PrivateChatBot(
+        bot_name='Private', id='private', client_id='id', client_secret='secret',
+        app=web.Application()
+    )
+    handled = []
+    for text in ("help me", "help"):
+        adapter = TestAdapter()
+        activity = Activity(
+            type='message',
+            channel_id='msteams',
+            from_property=ChannelAccount(id='user'),
+            recipient=ChannelAccount(id='bot'),
+            conversation=ConversationAccount(id='chat', conversation_type='personal'),
+            text=text
+        )
+        context = TurnContext(adapter, activity)
+        handled.append(await bot.dispatch_command(context))
+    # "help me" goes to the default reply, not to a usage error.
+    assert handled == [False, True]
+    assert adapter.activity_buffer[0].text.startswith("Here's what I can do")
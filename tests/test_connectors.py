@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from botbuilder.core import ConversationState, MemoryStorage
+from azure_teambots.adapters import AdapterHandler
+from azure_teambots.config import BotConfig
+from azure_teambots.connectors import ConnectorPool, connector_pool
+
+
+class ConnectorStandIn:
+    """Bot Connector of two regions (get conversations endpoint)."""
+
+    def __init__(self):
+        self.requests: list = []
+        self.app = web.Application()
+        self.app.router.add_get('/{region}/v3/conversations', self.conversations)
+
+    async def conversations(self, request):
+        self.requests.append(request.match_info['region'])
+        return web.json_response({"conversations": []})
+
+
+def _adapter() -> AdapterHandler:
+    return AdapterHandler(
+        BotConfig(client_id='', client_secret=''),
+        logging.getLogger('test'),
+        ConversationState(MemoryStorage())
+    )
+
+
+@pytest.fixture
+async def connector():
+    standin = ConnectorStandIn()
+    server = TestServer(standin.app)
+    await server.start_server()
+    yield standin, str(server.make_url('/'))
+    await connector_pool.close()
+    await server.close()
+
+
+async def test_clients_are_shared(connector):
+    standin, url = connector
+    first, second = _adapter(), _adapter()
+    identity = first.create_claims_identity('')
+    factories = [
+        adapter.bot_framework_authentication.create_connector_factory(identity)
+        for adapter in (first, second)
+    ]
+    amer = [await factory.create(f"{url}amer/") for factory in factories]
+    emea = await factories[0].create(f"{url}emea/")
+    assert amer[0] is amer[1]
+    assert emea is not amer[0]
+    assert amer[0].config.credentials is emea.config.credentials
+    await amer[1].conversations.get_conversations()
+    assert standin.requests == ['amer']
+    assert connector_pool.stats()['clients'] == 2
+
+
+async def test_warm_up(connector):
+    standin, url = connector
+    adapter = _adapter()
+    before = connector_pool.stats()
+    await adapter.warm_up([f"{url}amer/", f"{url}emea/"])
+    assert sorted(standin.requests) == ['amer', 'emea']
+    assert connector_pool.stats()['warmed'] - before['warmed'] == 2
+    # the turns use the warmed clients.
+    factory = adapter.bot_framework_authentication.create_connector_factory(
+        adapter.create_claims_identity('')
+    )
+    await factory.create(f"{url}amer/")
+    assert connector_pool.stats()['reused'] - before['reused'] == 1
+
+
+async def test_least_recently_used_are_closed_later(connector):
+    _, url = connector
+    pool = ConnectorPool(max_clients=1, close_delay=0.05)
+    adapter = _adapter()
+    factory = pool.connector_factory(
+        adapter.bot_framework_authentication.inner.create_connector_factory(
+            adapter.create_claims_identity('')
+        ),
+        None
+    )
+    amer = await factory.create(f"{url}amer/")
+    emea = await factory.create(f"{url}emea/")
+    # evicted, but a turn may still be using it: taken back while open.
+    assert pool.stats()['retired'] == 1
+    assert await factory.create(f"{url}amer/") is amer
+    await asyncio.sleep(0.1)
+    stats = pool.stats()
+    assert (stats['evicted'], stats['retired'], stats['closed']) == (2, 0, 1)
+    assert await factory.create(f"{url}emea/") is not emea
+    await pool.close()
+    assert pool.stats()['clients'] == 0
+
+
+async def test_pool_is_closed_by_its_last_user(connector):
+    _, url = connector
+    pool = ConnectorPool()
+    adapter = _adapter()
+    factory = pool.connector_factory(
+        adapter.bot_framework_authentication.inner.create_connector_factory(
+            adapter.create_claims_identity('')
+        ),
+        None
+    )
+    # two bots of the same application.
+    await pool.open()
+    await pool.open()
+    client = await factory.create(f"{url}amer/")
+    await pool.close()
+    assert await factory.create(f"{url}amer/") is client
+    await pool.close()
+    assert pool.stats()['clients'] == 0
@@ -0,0 +1,90 @@
+import json
+from azure_teambots.graph import DirectoryIndex, GraphResponse
+
+
+ALICE = {"id": "1", "displayName": "Alice Martínez", "mail": "alice@x.com", "userPrincipalName": "alice@x.com"}
+BOB = {"id": "2", "displayName": "Bob Stone", "mail": "bob@x.com", "userPrincipalName": "bob@x.com"}
+CAROL = {"id": "3", "displayName": "Carol King", "mail": "carol@x.com", "userPrincipalName": "carol@x.com"}
+
+
+class DeltaStandIn:
+    """Graph client answering /users/delta with the queued pages."""
+
+    def __init__(self, index: DirectoryIndex):
+        self.index = index
+        self.pages: list = []
+        self.urls: list = []
+        # lookups done while the pages are loaded.
+        self.seen: list = []
+
+    def page(self, users: list, next_link: str = None, delta_link: str = None, status: int = 200):
+        body = {"value": users}
+        if next_link:
+            body['@odata.nextLink'] = next_link
+        if delta_link:
+            body['@odata.deltaLink'] = delta_link
+        self.pages.append((status, body))
+
+    async def request(self, method: str, url: str, **kwargs):
+        self.urls.append(url)
+        person = self.index.lookup("alice@x.com")
+        self.seen.append(person['id'] if person else None)
+        status, body = self.pages.pop(0)
+        return GraphResponse(status, {}, json.dumps(body).encode())
+
+
+async def test_lookups_and_delta():
+    index = DirectoryIndex(path=None)
+    client = DeltaStandIn(index)
+    client.page([ALICE], next_link="users/delta?page=2")
+    client.page([BOB], delta_link="users/delta?token=1")
+    assert await index.sync(client) == 2
+    assert index.lookup("ALICE@x.com")['id'] == "1"
+    assert index.lookup("martinez")['id'] == "1"
+    assert [p['id'] for p in index.search("bo")] == ["2"]
+    assert index.lookup("Alise Martines")['id'] == "1"
+    # changes since the delta link: Bob removed, Carol added, Alice renamed.
+    client.page(
+        [{"id": "2", "@removed": {"reason": "deleted"}}, CAROL, {"id": "1", "jobTitle": "CTO"}],
+        delta_link="users/delta?token=2"
+    )
+    assert await index.sync(client) == 3
+    assert client.urls[-1] == "users/delta?token=1"
+    assert index.lookup("bob@x.com") is None
+    assert index.lookup("carol")['id'] == "3"
+    assert index.lookup("alice@x.com")['title'] == "CTO"
+    assert len(index) == 2
+
+
+async def test_resync_swaps_the_users_when_complete():
+    index = DirectoryIndex(path=None)
+    client = DeltaStandIn(index)
+    client.page([ALICE, BOB], delta_link="users/delta?token=1")
+    await index.sync(client)
+    # expired delta token: the users are loaded again, Bob first.
+    client.page([], status=410)
+    client.page([BOB], next_link="users/delta?page=2")
+    client.page([CAROL], next_link="users/delta?page=3")
+    client.page([ALICE], delta_link="users/delta?token=2")
+    await index.sync(client)
+    # lookups kept answering with the previous users.
+    assert client.seen[1:] == ["1", "1", "1", "1"]
+    assert index.lookup("alice@x.com")['id'] == "1"
+    assert index.lookup("bob@x.com")['id'] == "2"
+    assert index.delta_link == "users/delta?token=2"
+    assert len(index) == 3
+
+
+async def test_failed_resync_keeps_the_users():
+    index = DirectoryIndex(path=None)
+    client = DeltaStandIn(index)
+    client.page([ALICE], delta_link="users/delta?token=1")
+    await index.sync(client)
+    client.page([], status=410)
+    client.page([BOB], next_link="users/delta?page=2")
+    client.page({}, status=500)
+    assert await index.sync(client) == 0
+    assert index.lookup("alice@x.com")['id'] == "1"
+    assert index.lookup("bob@x.com") is None
+    # retried on the next sync.
+    assert index.delta_link == "users/delta?token=1"
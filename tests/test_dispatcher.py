@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from http import HTTPStatus
+import pytest
+from aiohttp import web
+from botbuilder.core import ConversationState, MemoryStorage
+from botbuilder.schema import Activity, ChannelAccount, ConversationAccount
+from azure_teambots.adapters import AdapterHandler
+from azure_teambots.bots import EchoBot
+from azure_teambots.config import BotConfig
+from azure_teambots.dispatcher import TurnDispatcher
+from azure_teambots.exceptions import TurnQueueFull
+
+
+class Turns:
+    """Handler recording the turns, each one taking `latency` seconds."""
+
+    def __init__(self, latency: float = 0.01):
+        self.latency = latency
+        self.done: list = []
+        self.running: set = set()
+        self.overlaps: int = 0
+
+    async def __call__(self, item):
+        conversation, _ = item
+        if conversation in self.running:
+            self.overlaps += 1
+        self.running.add(conversation)
+        await asyncio.sleep(self.latency)
+        self.running.discard(conversation)
+        self.done.append(item)
+        if item[1] == 'boom':
+            raise RuntimeError('boom')
+
+
+async def test_conversations_are_ordered_and_parallel():
+    turns = Turns(latency=0.02)
+    dispatcher = TurnDispatcher(turns, workers=4)
+    # submitted before start: queued.
+    for i in range(5):
+        dispatcher.submit('a', ('a', i))
+    await dispatcher.start()
+    for i in range(5):
+        dispatcher.submit('b', ('b', i))
+    dispatcher.submit('c', ('c', 'boom'))
+    started = asyncio.get_running_loop().time()
+    await dispatcher.stop()
+    # both conversations ran side by side, each one in order.
+    assert asyncio.get_running_loop().time() - started < 5 * 2 * 0.02
+    assert [i for c, i in turns.done if c == 'a'] == list(range(5))
+    assert [i for c, i in turns.done if c == 'b'] == list(range(5))
+    assert turns.overlaps == 0
+    stats = dispatcher.stats()
+    assert (stats['processed'], stats['failed'], stats['pending']) == (10, 1, 0)
+
+
+async def test_queue_bounds():
+    dispatcher = TurnDispatcher(Turns(), workers=1, max_pending=4, max_per_conversation=2)
+    dispatcher.submit('a', ('a', 0))
+    dispatcher.submit('a', ('a', 1))
+    with pytest.raises(TurnQueueFull):
+        dispatcher.submit('a', ('a', 2))
+    dispatcher.submit('b', ('b', 0))
+    dispatcher.submit('c', ('c', 0))
+    with pytest.raises(TurnQueueFull):
+        dispatcher.submit('d', ('d', 0))
+    assert dispatcher.stats()['rejected'] == 2
+    await dispatcher.start()
+    await dispatcher.stop()
+    assert len(dispatcher) == 0
+
+
+async def test_stop_drains_then_gives_up():
+    turns = Turns(latency=0.05)
+    dispatcher = TurnDispatcher(turns, workers=1)
+    await dispatcher.start()
+    for i in range(3):
+        dispatcher.submit('a', ('a', i))
+    await dispatcher.stop()
+    assert len(turns.done) == 3
+    await dispatcher.start()
+    for i in range(10):
+        dispatcher.submit('a', ('a', i))
+    await dispatcher.stop(timeout=0.08)
+    assert len(turns.done) < 13
+    assert not dispatcher.running
+
+
+async def test_full_queue_answers_503():
+    app = web.Application()
+    bot = EchoBot(
+        bot_name='Echo', id='echo', client_id='id', client_secret='secret', app=app,
+        async_turns=True, turn_workers=1, turn_queue_size=1
+    )
+    bot.setup(app)
+    # authentication disabled (no app id).
+    bot._adapter = AdapterHandler(
+        BotConfig(client_id='', client_secret=''),
+        logging.getLogger('test'),
+        ConversationState(MemoryStorage())
+    )
+    activity = Activity(
+        type='message',
+        channel_id='msteams',
+        service_url='https://smba.example/',
+        from_property=ChannelAccount(id='user'),
+        recipient=ChannelAccount(id='bot'),
+        conversation=ConversationAccount(id='a'),
+        text='hi'
+    )
+    response = await bot._enqueue_activity('', activity)
+    assert response.status == HTTPStatus.ACCEPTED
+    response = await bot._enqueue_activity('', activity)
+    assert response.status == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.headers['Retry-After'] == '1'
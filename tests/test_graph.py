@@ -0,0 +1,208 @@
+import asyncio
+import base64
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from azure_teambots.graph import GraphClient, PhotoCache
+from azure_teambots.sessions import http_pool
+
+
+PHOTO = b'\x89PNG\r\n\x1a\nphoto'
+
+
+class GraphStandIn:
+    """Minimal in-process Microsoft Graph (token endpoint, users and $batch)."""
+
+    def __init__(self):
+        self.calls: list = []
+        self.batches: list = []
+        self.throttle: int = 0
+        self.app = web.Application()
+        self.app.router.add_post('/token', self.token)
+        self.app.router.add_post('/v1.0/$batch', self.batch)
+        self.app.router.add_get('/v1.0/users/{upn}', self.user)
+        self.app.router.add_get('/v1.0/users/{upn}/photo/$value', self.photo)
+        self.app.router.add_get('/v1.0/groups', self.groups)
+        self.server = None
+
+    def handle(self, method: str, url: str):
+        self.calls.append((method, url))
+        parts = url.strip('/').split('/')
+        if parts[0] != 'users' or len(parts) < 2:
+            return 404, {"Content-Type": "application/json"}, {"error": "NotFound"}
+        upn = parts[1]
+        if self.throttle > 0:
+            self.throttle -= 1
+            return 429, {"Retry-After": "0"}, {"error": "TooManyRequests"}
+        if upn.startswith('missing'):
+            return 404, {"Content-Type": "application/json"}, {"error": "NotFound"}
+        if len(parts) == 2:
+            return 200, {"Content-Type": "application/json"}, {
+                "userPrincipalName": upn, "displayName": upn.split('@')[0]
+            }
+        if parts[2] == 'manager':
+            return 200, {"Content-Type": "application/json"}, {
+                "userPrincipalName": f"boss.{upn}"
+            }
+        return 200, {"Content-Type": "image/png"}, base64.b64encode(PHOTO).decode()
+
+    async def token(self, request):
+        return web.json_response({"access_token": "token", "expires_in": 3600})
+
+    async def batch(self, request):
+        assert request.headers['Authorization'] == 'Bearer token'
+        payload = await request.json()
+        requests = payload['requests']
+        self.batches.append(len(requests))
+        responses = []
+        for item in reversed(requests):
+            status, headers, body = self.handle(item['method'], item['url'])
+            responses.append(
+                {"id": item['id'], "status": status, "headers": headers, "body": body}
+            )
+        return web.json_response({"responses": responses})
+
+    async def groups(self, request):
+        """Paged collection of 100 items."""
+        self.calls.append(('GET', request.path_qs))
+        top = int(request.query.get('$top', 20))
+        skip = int(request.query.get('$skip', 0))
+        page = {"value": [{"id": i} for i in range(skip, min(skip + top, 100))]}
+        if skip + top < 100:
+            page['@odata.nextLink'] = str(
+                request.url.update_query({'$top': top, '$skip': skip + top})
+            )
+        return web.json_response(page)
+
+    async def photo(self, request):
+        self.calls.append(('GET', request.path))
+        if request.headers.get('If-None-Match') == '"v1"':
+            return web.Response(status=304)
+        return web.Response(body=PHOTO, content_type='image/png', headers={"ETag": '"v1"'})
+
+    async def user(self, request):
+        status, headers, body = self.handle('GET', f"/users/{request.match_info['upn']}")
+        headers.pop('Content-Type', None)
+        return web.json_response(body, status=status, headers=headers)
+
+
+@pytest.fixture
+async def graph():
+    standin = GraphStandIn()
+    server = TestServer(standin.app)
+    await server.start_server()
+    base = str(server.make_url(''))
+    client = GraphClient(
+        'client', 'secret', f"tenant-{id(standin)}",
+        base_url=f"{base}/v1.0",
+        token_url=f"{base}/token",
+        batch_window=0.05,
+    )
+    yield client, standin
+    await client.close()
+    await http_pool.close()
+    await server.close()
+
+
+async def test_user_info_single_batch(graph):
+    client, standin = graph
+    info = await client.get_user_info('jlara@example.com')
+    assert standin.batches == [3]
+    assert info['user']['userPrincipalName'] == 'jlara@example.com'
+    assert info['manager']['userPrincipalName'] == 'boss.jlara@example.com'
+    assert info['photo'] == PHOTO
+
+
+async def test_batch_split_and_demux(graph):
+    client, standin = graph
+    upns = [f"user{i}@example.com" for i in range(25)] + ['missing@example.com']
+    users = await asyncio.gather(
+        *[client.get_user_by_upn(upn, batch=True) for upn in upns]
+    )
+    # 20 sub-requests at most per $batch.
+    assert sorted(standin.batches) == [6, 20]
+    assert [u['userPrincipalName'] for u in users[:-1]] == upns[:-1]
+    assert users[-1] is None
+    assert client.stats()['batch']['requests'] == 26
+
+
+async def test_flush_and_direct_calls(graph):
+    client, standin = graph
+    task = asyncio.create_task(client.batch_request('GET', 'users/a@example.com'))
+    await asyncio.sleep(0)
+    await client.batcher.flush()
+    response = await task
+    assert response.status == 200
+    assert response.json()['userPrincipalName'] == 'a@example.com'
+    user = await client.get_user_by_upn('b@example.com')
+    assert user['displayName'] == 'b'
+    assert standin.batches == [1]
+
+
+async def test_throttled_calls_are_retried(graph):
+    client, standin = graph
+    standin.throttle = 2
+    user = await client.get_user_by_upn('c@example.com')
+    assert user['displayName'] == 'c'
+    standin.throttle = 1
+    users = await asyncio.gather(
+        client.get_user_by_upn('d@example.com', batch=True),
+        client.get_user_by_upn('e@example.com', batch=True),
+    )
+    assert [u['displayName'] for u in users] == ['d', 'e']
+    stats = client.stats()['scheduler']
+    assert stats['throttled'] == 3
+    assert stats['retries'] == 3
+    assert stats['queued'] == 0
+
+
+async def test_photo_cache_revalidation(graph, tmp_path):
+    client, standin = graph
+    client.photos = PhotoCache(directory=tmp_path, ttl=0)
+    assert await client.get_user_photo('f@example.com') == PHOTO
+    # stale: revalidated with If-None-Match, answered with a 304.
+    assert await client.get_user_photo('f@example.com') == PHOTO
+    stats = client.photos.stats()
+    assert stats['downloads'] == 1
+    assert stats['revalidated'] == 1
+    assert stats['disk_files'] == 1
+    await client.photos.close()
+    # index and content survive a restart.
+    photos = PhotoCache(directory=tmp_path)
+    client.photos = photos
+    assert await client.get_user_photo('f@example.com') == PHOTO
+    assert photos.stats()['hits'] == 1
+    assert len([c for c in standin.calls if c[1].endswith('$value')]) == 2
+
+
+async def test_identical_calls_are_coalesced(graph):
+    client, standin = graph
+    users = await asyncio.gather(
+        *[client.get_user_by_upn('g@example.com') for _ in range(10)],
+        *[client.get_user_by_upn('g@example.com', batch=True) for _ in range(10)],
+    )
+    assert all(u['displayName'] == 'g' for u in users)
+    assert standin.calls.count(('GET', '/users/g@example.com')) == 1
+    # served from the result cache.
+    assert (await client.get_user_by_upn('g@example.com'))['displayName'] == 'g'
+    stats = client.stats()['cache']
+    assert stats['shared'] == 19
+    assert stats['hits'] == 1
+
+
+async def test_pager_streams_pages(graph):
+    client, standin = graph
+    pager = client.pager('groups', select=['id', 'displayName'], top=10, max_items=25)
+    items = [item async for item in pager]
+    assert [item['id'] for item in items] == list(range(25))
+    assert pager.pages_read == 3
+    # read-ahead is bounded: one page past the last one consumed at most.
+    requested = [c for c in standin.calls if c[1].startswith('/v1.0/groups')]
+    assert len(requested) <= 4
+    assert requested[0] == ('GET', '/v1.0/groups?$select=id,displayName&$top=10')
+    pager = client.pager('groups', top=40)
+    pages = [page async for page in pager.pages()]
+    assert [len(page) for page in pages] == [40, 40, 20]
+    assert pager.delta_link is None and pager.error is None
+    # pages are not kept in the results cache.
+    assert client.stats()['cache']['entries'] == 0
@@ -0,0 +1,155 @@
+import json
+import pytest
+from aiohttp import web
+from botbuilder.core import MemoryStorage, TurnContext
+from botbuilder.core.adapters import TestAdapter
+from botbuilder.core.teams import TeamsInfo
+from botbuilder.schema import Activity, ChannelAccount, ConversationAccount
+from botbuilder.schema.teams import TeamDetails, TeamsChannelAccount
+from azure_teambots.bots.listener import TeamsChannelBot
+from azure_teambots.graph import GraphResponse
+from azure_teambots.ingestion import BatchedSink, ChannelIngestor
+
+
+class Writer:
+    """Sink writer failing while `failing` is set."""
+
+    def __init__(self):
+        self.batches: list = []
+        self.items: list = []
+        self.failing = False
+
+    async def __call__(self, items):
+        if self.failing:
+            raise ConnectionError("down")
+        self.batches.append([item['id'] for item in items])
+        self.items.extend(items)
+
+
+class MessagesStandIn:
+    """Graph client serving the messages delta of one channel."""
+
+    def __init__(self, messages: int, page_size: int = 2):
+        self.messages = [
+            {"id": str(i), "body": {"content": f"message {i}"}} for i in range(messages)
+        ]
+        self.page_size = page_size
+        self.urls: list = []
+        # called before serving a page (things happening meanwhile).
+        self.before = None
+
+    async def request(self, method: str, url: str, **kwargs):
+        self.urls.append(url)
+        if self.before is not None:
+            await self.before(len(self.urls))
+        start = int(url.split('skip=')[1]) if 'skip=' in url else 0
+        if 'token=' in url:
+            start = int(url.split('token=')[1])
+        page = self.messages[start:start + self.page_size]
+        body = {"value": page}
+        end = start + len(page)
+        if end < len(self.messages):
+            body['@odata.nextLink'] = f"delta?skip={end}"
+        else:
+            body['@odata.deltaLink'] = f"delta?token={end}"
+        return GraphResponse(200, {}, json.dumps(body).encode())
+
+
+async def test_sink_batches_and_bounded_retries():
+    writer = Writer()
+    sink = BatchedSink(writer, batch_size=2, max_buffer=4)
+    await sink.write([{"id": "1"}])
+    await sink.write([{"id": "2"}, {"id": "3"}])
+    assert writer.batches == [["1", "2"], ["3"]]
+    writer.failing = True
+    for i in range(4, 10, 2):
+        with pytest.raises(ConnectionError):
+            await sink.write([{"id": str(i)}, {"id": str(i + 1)}])
+    # the oldest items were dropped to keep at most 4.
+    assert len(sink) == 4
+    assert sink.stats()['dropped'] == 2
+    writer.failing = False
+    await sink.close()
+    assert writer.batches[2:] == [["6", "7"], ["8", "9"]]
+
+
+async def test_ingestor_backfills_and_resumes():
+    client = MessagesStandIn(5)
+    writer = Writer()
+    storage = MemoryStorage()
+    ingestor = ChannelIngestor(client, storage, BatchedSink(writer, batch_size=100), checkpoint=1)
+    await ingestor.track('team', 'channel')
+    assert await ingestor.sync() == 5
+    assert [i for batch in writer.batches for i in batch] == ['0', '1', '2', '3', '4']
+    cursor = (await storage.read([ingestor.cursor_key('team', 'channel')]))
+    assert cursor[ingestor.cursor_key('team', 'channel')] == {"delta_link": "delta?token=5"}
+    # next sync: only the new messages.
+    client.messages.append({"id": "5", "body": {"content": "message 5"}})
+    assert await ingestor.sync() == 1
+    assert client.urls[-1] == "delta?token=5"
+    await ingestor.stop()
+
+
+async def test_cursor_does_not_move_past_dropped_messages():
+    client = MessagesStandIn(4)
+    writer = Writer()
+    storage = MemoryStorage()
+    sink = BatchedSink(writer, batch_size=4, max_buffer=4)
+    ingestor = ChannelIngestor(client, storage, sink, checkpoint=2)
+
+    async def background_flush_fails(request: int):
+        # while the second page is read, a periodic flush fails and the
+        # buffer overflows (other channels): the first message is dropped.
+        if request == 2:
+            writer.failing = True
+            with pytest.raises(ConnectionError):
+                await sink.write([{"id": f"other{i}"} for i in range(3)])
+            writer.failing = False
+
+    client.before = background_flush_fails
+    await ingestor.track('team', 'channel')
+    await ingestor.sync()
+    key = ingestor.cursor_key('team', 'channel')
+    assert sink.stats()['dropped'] == 1
+    assert await storage.read([key]) == {}
+    # the channel is read again from the start.
+    client.before = None
+    writer.batches.clear()
+    await ingestor.sync()
+    assert [i for batch in writer.batches for i in batch] == ['0', '1', '2', '3']
+    assert (await storage.read([key]))[key] == {"delta_link": "delta?token=4"}
+
+
+async def test_channel_bot_tracks_the_team_group(monkeypatch):
+    async def get_team_details(turn_context, team_id):
+        return TeamDetails(id=team_id, name="Team", aad_group_id="0b8c-group")
+
+    async def get_member(turn_context, member_id):
+        return TeamsChannelAccount(id=member_id, name="User")
+
+    monkeypatch.setattr(TeamsInfo, 'get_team_details', get_team_details)
+    monkeypatch.setattr(TeamsInfo, 'get_member', get_member)
+    writer = Writer()
+    bot = TeamsChannelBot(
+        bot_name='Listener', id='listener', client_id='id', client_secret='secret',
+        app=web.Application(), message_sink=writer, cursor_storage=MemoryStorage()
+    )
+    client = MessagesStandIn(1)
+    bot.ingestor = ChannelIngestor(client, MemoryStorage(), BatchedSink(writer))
+    thread = "19:listener-team@thread.tacv2"
+    activity = Activity(
+        type='message',
+        channel_id='msteams',
+        from_property=ChannelAccount(id='29:user'),
+        recipient=ChannelAccount(id='28:bot'),
+        conversation=ConversationAccount(id='19:general', conversation_type='channel'),
+        channel_data={"team": {"id": thread}, "channel": {"id": "19:general"}},
+        text='hello'
+    )
+    await bot.on_message_activity(TurnContext(TestAdapter(), activity))
+    assert await bot.ingestor.sync() == 1
+    # Graph addresses the team by its group id, the messages keep the thread id.
+    assert client.urls[0] == "teams/0b8c-group/channels/19:general/messages/delta"
+    await bot.ingestor.sink.flush()
+    assert writer.batches == [["0"]]
+    assert writer.items[0]['team_id'] == thread
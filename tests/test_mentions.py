@@ -0,0 +1,29 @@
+from botbuilder.schema import Activity
+from azure_teambots.mentions import MentionParser
+
+
+def test_parse_text():
+    parser = MentionParser("Echo Bot", trigger="echo")
+    message = parser.parse_text(
+        'Hi <at>Jane</at> and <at>Echo Bot</at>, ECHO "Build <b>OK</b>"'
+    )
+    assert message.mentions == ["Jane", "Echo Bot"]
+    assert message.bot_mentioned
+    assert message.clean == 'Hi and , ECHO "Build <b>OK</b>"'
+    assert message.triggered == '"Build <b>OK</b>"'
+    message = parser.parse_text("<at>Echo Bot</at>  Search  release notes")
+    assert (message.command, message.args) == ("search", "release notes")
+    assert parser.parse_text("").command == ""
+
+
+def test_parse_activity_entities():
+    parser = MentionParser("Echo Bot")
+    activity = Activity().deserialize({
+        "type": "message",
+        "text": "<at>Echo</at> help",
+        "recipient": {"id": "28:bot", "name": "Echo Bot"},
+        "entities": [{"type": "mention", "mentioned": {"id": "28:bot"}, "text": "<at>Echo</at>"}],
+    })
+    message = parser.parse(activity)
+    assert message.bot_mentioned
+    assert message.command == "help"
@@ -0,0 +1,94 @@
+import asyncio
+import time
+import pytest
+from azure_teambots.exceptions import OutboundQueueFull
+from azure_teambots.outbound import OutboundScheduler
+
+
+class ConnectorError(Exception):
+    """Bot Connector error response (as raised by the connector client)."""
+
+    def __init__(self, status_code: int, headers: dict = None):
+        super().__init__(f"Status {status_code}")
+        self.response = type(
+            'Response', (), {"status_code": status_code, "headers": headers or {}}
+        )()
+
+
+class ConversationStandIn:
+    """Records the sends, throttling the first `throttle` ones."""
+
+    def __init__(self, throttle: int = 0, retry_after: str = None):
+        self.sent: list = []
+        self.throttle = throttle
+        self.retry_after = retry_after
+
+    def send(self, conversation: str, text: str):
+        async def _send():
+            await asyncio.sleep(0.01)
+            if self.throttle > 0:
+                self.throttle -= 1
+                headers = {"Retry-After": self.retry_after} if self.retry_after else {}
+                raise ConnectorError(429, headers)
+            self.sent.append((conversation, text, time.monotonic()))
+            return text
+        return _send
+
+
+async def test_conversation_rate_and_order():
+    scheduler = OutboundScheduler(rate=20, burst=2, bot_rate=0)
+    standin = ConversationStandIn()
+    results = await asyncio.gather(
+        *[scheduler.send('a', standin.send('a', str(i))) for i in range(6)],
+        *[scheduler.send('b', standin.send('b', str(i))) for i in range(2)],
+    )
+    assert results == [str(i) for i in range(6)] + ['0', '1']
+    sent_a = [s for s in standin.sent if s[0] == 'a']
+    assert [s[1] for s in sent_a] == [str(i) for i in range(6)]
+    # burst of 2, then 20 per second.
+    assert sent_a[-1][2] - sent_a[0][2] >= 0.15
+    stats = scheduler.stats()
+    assert stats['sent'] == 8
+    assert stats['queued'] == 0
+
+
+async def test_retry_after_pauses_the_conversation():
+    scheduler = OutboundScheduler(rate=0, bot_rate=0, max_retries=3)
+    standin = ConversationStandIn(throttle=2, retry_after='0.1')
+    started = time.monotonic()
+    first, second = await asyncio.gather(
+        scheduler.send('a', standin.send('a', 'first')),
+        scheduler.send('a', standin.send('a', 'second')),
+    )
+    assert (first, second) == ('first', 'second')
+    assert time.monotonic() - started >= 0.2
+    assert [s[1] for s in standin.sent] == ['first', 'second']
+    stats = scheduler.stats()
+    assert stats['throttled'] == 2
+    assert stats['retries'] == 2
+    assert stats['dropped'] == 0
+
+
+async def test_dropped_activities():
+    scheduler = OutboundScheduler(
+        rate=0, bot_rate=0, max_retries=1, backoff=0.01, max_pending=2
+    )
+    standin = ConversationStandIn(throttle=5)
+    with pytest.raises(ConnectorError):
+        await scheduler.send('a', standin.send('a', 'lost'))
+    # errors other than throttling are not retried.
+    async def forbidden():
+        raise ConnectorError(403)
+    with pytest.raises(ConnectorError):
+        await scheduler.send('a', forbidden)
+    standin.throttle = 0
+    tasks = [
+        asyncio.create_task(scheduler.send('a', standin.send('a', str(i))))
+        for i in range(3)
+    ]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert isinstance(results[2], OutboundQueueFull)
+    stats = scheduler.stats()
+    assert stats['dropped'] == 2
+    assert stats['failed'] == 1
+    assert stats['sent'] == 2
@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from botbuilder.core import ConversationState, MemoryStorage
+from botbuilder.schema import Activity, ChannelAccount, ConversationAccount
+from azure_teambots.adapters import AdapterHandler
+from azure_teambots.config import BotConfig
+from azure_teambots.exceptions import BroadcastBusy
+from azure_teambots.outbound import OutboundScheduler
+from azure_teambots.proactive import BroadcastEngine, ConversationReferenceStore
+
+
+APP_ID = ''
+
+
+class ConnectorStandIn:
+    """Minimal Bot Connector (send to conversation and reply endpoints)."""
+
+    def __init__(self):
+        self.received: list = []
+        self.gone: set = set()
+        # conversation -> sends answered with a 429.
+        self.throttled: dict = {}
+        self.app = web.Application()
+        self.app.router.add_post(
+            '/v3/conversations/{conversation}/activities', self.send
+        )
+        self.app.router.add_post(
+            '/v3/conversations/{conversation}/activities/{reply_to}', self.send
+        )
+
+    async def send(self, request):
+        conversation = request.match_info['conversation']
+        if conversation in self.gone:
+            return web.json_response({"error": {"code": "BotNotInConversationRoster"}}, status=403)
+        if self.throttled.get(conversation, 0) > 0:
+            self.throttled[conversation] -= 1
+            return web.json_response({"error": {"code": "Throttled"}}, status=429)
+        payload = await request.json()
+        self.received.append((conversation, payload['text']))
+        return web.json_response({"id": f"{len(self.received)}"})
+
+
+def _activity(service_url: str, conversation: str, kind: str = 'personal', team: str = None):
+    return Activity(
+        type='message',
+        id='1',
+        channel_id='msteams',
+        service_url=service_url,
+        text='hello',
+        from_property=ChannelAccount(id=f"user-{conversation}"),
+        recipient=ChannelAccount(id='bot'),
+        conversation=ConversationAccount(
+            id=conversation, conversation_type=kind, tenant_id='tenant'
+        ),
+        channel_data={"team": {"id": team}} if team else None,
+    )
+
+
+@pytest.fixture
+async def connector(tmp_path):
+    standin = ConnectorStandIn()
+    server = TestServer(standin.app)
+    await server.start_server()
+    service_url = str(server.make_url('/'))
+    store = ConversationReferenceStore(tmp_path / 'references.db')
+    adapter = AdapterHandler(
+        BotConfig(client_id=APP_ID, client_secret=''),
+        logging.getLogger('test'),
+        ConversationState(MemoryStorage())
+    )
+    adapter.outbound = OutboundScheduler(rate=0, bot_rate=0)
+    yield standin, store, adapter, service_url
+    await store.close()
+    await server.close()
+
+
+async def test_references_are_captured_once(connector):
+    standin, store, adapter, service_url = connector
+    assert await store.capture(APP_ID, _activity(service_url, 'a'))
+    assert not await store.capture(APP_ID, _activity(service_url, 'a'))
+    await store.capture(APP_ID, _activity(service_url, '19:c@thread;messageid=5', 'channel', 'team1'))
+    # another thread of the same channel is the same reference.
+    assert not await store.capture(
+        APP_ID, _activity(service_url, '19:c@thread;messageid=6', 'channel', 'team1')
+    )
+    assert await store.find(APP_ID, conversation_type='channel') == ['19:c@thread']
+    assert await store.find(APP_ID, team_id='team1') == ['19:c@thread']
+    reference = await store.get(APP_ID, '19:c@thread')
+    assert reference.conversation.id == '19:c@thread'
+    assert reference.activity_id is None
+    assert await store.service_urls(APP_ID) == [service_url]
+    assert store.stats()['writes'] == 2
+    # a deactivated channel is active again on its next message.
+    await store.deactivate(APP_ID, '19:c@thread')
+    assert await store.find(APP_ID, conversation_type='channel') == []
+    assert await store.capture(
+        APP_ID, _activity(service_url, '19:c@thread;messageid=7', 'channel', 'team1')
+    )
+    assert await store.find(APP_ID, conversation_type='channel') == ['19:c@thread']
+
+
+async def test_broadcast_and_resume(connector):
+    standin, store, adapter, service_url = connector
+    for i in range(30):
+        await store.capture(APP_ID, _activity(service_url, f"user{i:02d}"))
+    await store.capture(APP_ID, _activity(service_url, 'general', 'channel', 'team1'))
+    standin.gone.add('user05')
+    engine = BroadcastEngine(adapter, store, APP_ID, concurrency=4, checkpoint=5)
+    job_id = await engine.create('Announcement', conversation_type='personal')
+    # interrupted after some sends.
+    engine.start(job_id)
+    while len(standin.received) < 12:
+        await asyncio.sleep(0.005)
+    await engine.stop()
+    interrupted = await engine.progress(job_id)
+    assert 0 < interrupted.sent < 29
+    assert await engine.unfinished() == [job_id]
+    # resumed (as after a restart), by a new engine on the same database.
+    updates = []
+    engine = BroadcastEngine(adapter, store, APP_ID, concurrency=4, checkpoint=5)
+    state = await engine.run(job_id, progress=lambda p: updates.append(p.sent))
+    assert state.done
+    assert (state.total, state.sent, state.failed) == (30, 29, 1)
+    assert updates[-1] == 29
+    targets = sorted({c for c, _ in standin.received})
+    assert targets == sorted(f"user{i:02d}" for i in range(30) if i != 5)
+    # at-least-once: only the sends after the last checkpoint can repeat.
+    assert len(standin.received) - 29 < 4 + 5
+    assert await engine.unfinished() == []
+    # conversations the bot was removed from are not targeted anymore.
+    assert 'user05' not in await store.find(APP_ID)
+
+
+async def test_references_are_deactivated_when_the_bot_is_removed(connector):
+    standin, store, adapter, service_url = connector
+    await store.capture(APP_ID, _activity(service_url, 'a'))
+    await store.capture(APP_ID, _activity(service_url, 'general', 'channel', 'team1'))
+    await store.capture(APP_ID, _activity(service_url, 'dev', 'channel', 'team1'))
+    # uninstalled from a personal chat.
+    removed = _activity(service_url, 'a')
+    removed.type, removed.action = 'installationUpdate', 'remove'
+    assert not await store.capture(APP_ID, removed)
+    assert await store.find(APP_ID) == ['dev', 'general']
+    # someone else leaving the team: still active.
+    update = _activity(service_url, 'general', 'channel', 'team1')
+    update.type = 'conversationUpdate'
+    update.members_removed = [ChannelAccount(id='user')]
+    await store.capture(APP_ID, update)
+    assert await store.find(APP_ID) == ['dev', 'general']
+    # the bot removed from the team: every channel of the team.
+    update.members_removed = [ChannelAccount(id='bot')]
+    assert not await store.capture(APP_ID, update)
+    assert await store.find(APP_ID) == []
+    # added again.
+    assert await store.capture(APP_ID, _activity(service_url, 'dev', 'channel', 'team1'))
+    assert await store.find(APP_ID) == ['dev']
+
+
+async def test_a_broadcast_is_run_by_one_worker(connector):
+    standin, store, adapter, service_url = connector
+    for i in range(10):
+        await store.capture(APP_ID, _activity(service_url, f"user{i}"))
+    first = BroadcastEngine(adapter, store, APP_ID, concurrency=2, checkpoint=2, lease=0.2)
+    second = BroadcastEngine(adapter, store, APP_ID, concurrency=2, checkpoint=2, lease=0.2)
+    job_id = await first.create('Announcement')
+    # a worker crashed while running the broadcast: its lease is left.
+    assert await store.execute(first._claim, job_id)
+    with pytest.raises(BroadcastBusy):
+        await second.run(job_id)
+    # resumed on startup: skipped while the lease is held.
+    assert await second.resume() == [job_id]
+    with pytest.raises(BroadcastBusy):
+        await second.start(job_id)
+    assert standin.received == []
+    await asyncio.sleep(0.25)
+    state = await second.run(job_id)
+    assert (state.sent, len(standin.received)) == (10, 10)
+    # released once done.
+    assert await store.execute(
+        lambda conn: conn.execute(
+            "SELECT owner FROM broadcast_jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+    ) == (None,)
+
+
+async def test_throttled_targets_are_retried(connector):
+    standin, store, adapter, service_url = connector
+    adapter.outbound = OutboundScheduler(rate=0, bot_rate=0, max_retries=0)
+    for i in range(6):
+        await store.capture(APP_ID, _activity(service_url, f"user{i}"))
+    standin.throttled = {'user1': 1, 'user2': 2, 'user3': 10}
+    engine = BroadcastEngine(adapter, store, APP_ID, retries=3, backoff=0.01)
+    state = await engine.broadcast('Announcement')
+    # user3 is still throttled after the retries: left for the next run.
+    assert (state.sent, state.deferred) == (5, 1)
+    assert sorted(c for c, _ in standin.received) == [f"user{i}" for i in range(6) if i != 3]
+    assert await engine.unfinished() == [state.job_id]
+    standin.throttled = {}
+    assert (await engine.run(state.job_id)).done
+    assert await engine.unfinished() == []
@@ -0,0 +1,82 @@
+from botbuilder.schema import Activity, ChannelAccount, ConversationAccount
+from azure_teambots.search import SearchIndex
+
+
+MESSAGES = [
+    ("1", "The <b>release date</b> moved to Friday", "team-a", "general"),
+    ("2", "Friday lunch: who is in?", "team-a", "random"),
+    ("3", "Release notes are ready, date TBD", "team-b", "general"),
+    ("4", "Migración del servidor el viernes", "team-a", "general"),
+]
+
+
+def fill(index: SearchIndex):
+    for doc_id, text, team_id, channel_id in MESSAGES:
+        index.add(doc_id, text, team_id=team_id, channel_id=channel_id, author="jlara")
+
+
+def ids(results):
+    return [result['id'] for result in results]
+
+
+async def test_ranking_filters_and_phrases():
+    index = SearchIndex()
+    fill(index)
+    assert ids(index.search("release date"))[:2] == ["1", "3"]
+    assert ids(index.search('"release date"')) == ["1"]
+    assert ids(index.search("friday", team_id="team-a", channel_id="random")) == ["2"]
+    assert ids(index.search("release", team_id="team-b")) == ["3"]
+    # accents are folded.
+    assert ids(index.search("migracion")) == ["4"]
+    # edits replace, deletes remove.
+    index.add("2", "Pizza on Thursday", team_id="team-a", channel_id="random")
+    assert ids(index.search("friday")) == ["1"]
+    assert index.delete("1")
+    assert index.search("friday") == []
+    assert len(index) == 3
+
+
+async def test_segments_persist_and_merge(tmp_path):
+    index = SearchIndex(path=tmp_path, flush_docs=2, max_segments=1)
+    await index.open()
+    fill(index)
+    await index.flush()
+    index.add("5", "Release party on Friday", team_id="team-a", channel_id="general")
+    index.delete("3")
+    await index.close()
+    assert index.stats()['merges'] >= 1
+
+    index = SearchIndex(path=tmp_path)
+    await index.open()
+    assert len(index) == 4
+    assert sorted(ids(index.search("release"))) == ["1", "5"]
+    assert index.stats()["segments"] == 1
+    assert ids(index.search('"release party"')) == ["5"]
+    await index.close()
+
+
+def _activity(doc_id: str, text: str, conversation: str, team: str = None):
+    return Activity(
+        type='message',
+        id=doc_id,
+        text=text,
+        channel_id='msteams',
+        from_property=ChannelAccount(id=conversation, name=conversation),
+        conversation=ConversationAccount(id=conversation),
+        channel_data={"team": {"id": team}, "channel": {"id": conversation}} if team else None,
+    )
+
+
+async def test_private_chats_are_scoped_to_their_conversation():
+    index = SearchIndex()
+    index.add_activity(_activity("1", "salary review tomorrow", "a:alice"))
+    index.add_activity(_activity("2", "salary review done", "a:bob"))
+    index.add_activity(_activity("3", "salary bands published", "19:general", "team-a"))
+    # a personal chat only sees its own messages.
+    assert ids(index.search("salary", *index.scope(_activity("9", "", "a:alice")))) == ["1"]
+    # a team (or its channel) never sees the personal chats.
+    team = _activity("9", "", "19:general", "team-a")
+    assert ids(index.search("salary", *index.scope(team))) == ["3"]
+    assert ids(index.search("salary", *index.scope(team, channel=True))) == ["3"]
+    # neither does an unscoped search.
+    assert ids(index.search("salary")) == ["3"]
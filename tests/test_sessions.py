@@ -0,0 +1,43 @@
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from azure_teambots.sessions import SessionPool
+
+
+class PeerStandIn:
+    """Answers with the client port of the connection."""
+
+    def __init__(self):
+        self.app = web.Application()
+        self.app.router.add_get('/', self.peer)
+
+    async def peer(self, request):
+        return web.json_response({"port": request.transport.get_extra_info('peername')[1]})
+
+
+async def test_sessions_are_reused_until_closed():
+    pool = SessionPool(limit=10, limit_per_host=2)
+    app = web.Application()
+    pool.setup(app)
+    pool.setup(app)
+    assert list(app.on_cleanup).count(pool.on_cleanup) == 1
+    server = TestServer(PeerStandIn().app)
+    await server.start_server()
+    try:
+        session = pool.get_session('graph')
+        assert pool.get_session('graph') is session
+        assert pool.get_session() is not session
+        ports = []
+        for _ in range(3):
+            async with pool.get_session('graph').get(server.make_url('/')) as response:
+                ports.append((await response.json())['port'])
+        # keep-alive: one connection for the three requests.
+        assert len(set(ports)) == 1
+        assert pool.stats()['graph'] == {"closed": False, "limit": 10, "limit_per_host": 2}
+        await pool.on_cleanup(app)
+        assert session.closed
+        assert pool.stats() == {}
+        # a new session after close.
+        assert not pool.get_session('graph').closed
+    finally:
+        await pool.close()
+        await server.close()
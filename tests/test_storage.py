@@ -0,0 +1,214 @@
+import asyncio
+import pytest
+from botbuilder.core import MemoryStorage, TurnContext
+from botbuilder.core.adapters import TestAdapter
+from botbuilder.schema import Activity, ChannelAccount, ConversationAccount
+from azure_teambots.storage import (
+    TrackedConversationState,
+    TrackedUserState,
+    WriteBehindStorage,
+    get_storage,
+)
+from azure_teambots.storage.sqlite import SQLiteStorage
+from azure_teambots.models import UserProfile
+
+
+class RedisStandIn:
+    """Minimal in-process server speaking the Redis protocol (RESP2)."""
+
+    def __init__(self):
+        self.data: dict = {}
+        self.commands: list = []
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def read_command(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        count = int(line[1:])
+        args = []
+        for _ in range(count):
+            size = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(size + 2))[:-2])
+        return args
+
+    async def handle(self, reader, writer):
+        while True:
+            args = await self.read_command(reader)
+            if args is None:
+                break
+            cmd = args[0].decode().upper()
+            self.commands.append(cmd)
+            if cmd == 'PING':
+                writer.write(b"+PONG\r\n")
+            elif cmd == 'SET':
+                self.data[args[1]] = args[2]
+                writer.write(b"+OK\r\n")
+            elif cmd == 'MGET':
+                writer.write(f"*{len(args) - 1}\r\n".encode())
+                for key in args[1:]:
+                    value = self.data.get(key)
+                    if value is None:
+                        writer.write(b"$-1\r\n")
+                    else:
+                        writer.write(f"${len(value)}\r\n".encode() + value + b"\r\n")
+            elif cmd == 'DEL':
+                removed = sum(1 for k in args[1:] if self.data.pop(k, None) is not None)
+                writer.write(f":{removed}\r\n".encode())
+            else:
+                writer.write(b"-ERR unknown command\r\n")
+            await writer.drain()
+        writer.close()
+
+
+@pytest.fixture
+async def redis_url():
+    pytest.importorskip('redis')
+    server = RedisStandIn()
+    port = await server.start()
+    yield f"redis://127.0.0.1:{port}/0", server
+    await server.stop()
+
+
+async def check_roundtrip(storage):
+    profile = UserProfile(id='29:1', name='Jesus Lara', email='jlara@example.com')
+    await storage.write({
+        "msteams/users/29:1": {"UserProfile": profile},
+        "msteams/conversations/a:1": {"DialogState": {"step": 2}},
+    })
+    data = await storage.read(
+        ["msteams/users/29:1", "msteams/conversations/a:1", "missing"]
+    )
+    assert set(data) == {"msteams/users/29:1", "msteams/conversations/a:1"}
+    user = data["msteams/users/29:1"]["UserProfile"]
+    assert isinstance(user, UserProfile)
+    assert user.email == 'jlara@example.com'
+    assert data["msteams/conversations/a:1"] == {"DialogState": {"step": 2}}
+    await storage.delete(["msteams/users/29:1"])
+    assert await storage.read(["msteams/users/29:1"]) == {}
+
+
+async def test_sqlite_storage(tmp_path):
+    storage = get_storage('sqlite', path=tmp_path / 'state.db', namespace='test')
+    assert isinstance(storage, SQLiteStorage)
+    await storage.open()
+    await check_roundtrip(storage)
+    await storage.close()
+
+
+async def test_redis_storage(redis_url):
+    url, server = redis_url
+    storage = get_storage('redis', url=url, namespace='test')
+    await storage.open()
+    await check_roundtrip(storage)
+    # multi-key reads are a single MGET, writes a single pipeline.
+    assert server.commands.count('MGET') == 2
+    assert all(key.startswith(b'test:') for key in server.data)
+    await storage.close()
+
+
+async def test_bounded_memory_storage():
+    storage = get_storage('memory', max_entries=2, ttl=0)
+    await check_roundtrip(storage)
+    for idx in range(3):
+        await storage.write({f"key{idx}": {"value": idx}})
+    # least recently used entry was evicted.
+    assert await storage.read(["key0"]) == {}
+    stats = storage.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] >= 1
+    assert stats["bytes"] > 0
+
+
+class SlowStorage(MemoryStorage):
+    """Memory storage counting the writes, each taking `latency` seconds."""
+
+    def __init__(self, latency: float = 0):
+        super().__init__()
+        self.latency = latency
+        self.writes: list = []
+
+    async def write(self, changes):
+        self.writes.append(sorted(changes))
+        await asyncio.sleep(self.latency)
+        await super().write(changes)
+
+
+async def test_write_behind_coalesces_writes():
+    backend = SlowStorage()
+    storage = WriteBehindStorage(backend, delay=0.05)
+    await storage.write({"a": {"value": 1}})
+    await storage.write({"a": {"value": 2}, "b": {"value": 1}})
+    # read-your-writes before the flush.
+    assert (await storage.read(["a"]))["a"]["value"] == 2
+    assert backend.writes == []
+    await asyncio.sleep(0.1)
+    assert backend.writes == [["a", "b"]]
+    assert (await backend.read(["a"]))["a"]["value"] == 2
+    assert storage.stats()["write_behind"]["coalesced"] == 1
+    await storage.close()
+
+
+async def test_write_behind_flushes_writes_buffered_during_a_flush():
+    backend = SlowStorage(latency=0.2)
+    storage = WriteBehindStorage(backend, delay=0.05)
+    await storage.write({"a": {"value": 1}})
+    await asyncio.sleep(0.1)
+    # "a" is being written: "b" waits for the next flush.
+    await storage.write({"b": {"value": 1}})
+    await asyncio.sleep(0.5)
+    assert backend.writes == [["a"], ["b"]]
+    assert storage.stats()["write_behind"]["pending"] == 0
+    assert set(await backend.read(["a", "b"])) == {"a", "b"}
+    await storage.close()
+
+
+def _turn(user: str) -> TurnContext:
+    return TurnContext(TestAdapter(), Activity(
+        type='message',
+        channel_id='msteams',
+        from_property=ChannelAccount(id=user),
+        conversation=ConversationAccount(id=f"a:{user}"),
+        recipient=ChannelAccount(id='bot'),
+    ))
+
+
+async def test_tracked_state_writes_only_changes():
+    backend = SlowStorage()
+    user_state = TrackedUserState(backend)
+    conversation_state = TrackedConversationState(backend)
+    profile = user_state.create_property("UserProfile")
+
+    turn = _turn("29:1")
+    await user_state.load(turn)
+    await conversation_state.load(turn)
+    (await profile.get(turn, UserProfile)).name = 'Jesus'
+    await user_state.save_changes(turn)
+    # the conversation state was not touched.
+    await conversation_state.save_changes(turn)
+    assert backend.writes == [["msteams/users/29:1"]]
+    # saving again without changes does not write.
+    await user_state.save_changes(turn)
+    assert len(backend.writes) == 1
+
+    # next turn: the property is read but not changed.
+    turn = _turn("29:1")
+    await user_state.load(turn)
+    assert (await profile.get(turn, UserProfile)).name == 'Jesus'
+    await user_state.save_changes(turn)
+    assert len(backend.writes) == 1
+    (await profile.get(turn, UserProfile)).email = 'jlara@example.com'
+    await user_state.save_changes(turn)
+    assert len(backend.writes) == 2
+    # clearing the state is always written.
+    await user_state.clear_state(turn)
+    await user_state.save_changes(turn)
+    assert len(backend.writes) == 3
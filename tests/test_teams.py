@@ -0,0 +1,133 @@
+import asyncio
+from botbuilder.core import TurnContext
+from botbuilder.core.adapters import TestAdapter
+from botbuilder.core.teams import TeamsInfo
+from botbuilder.schema import Activity, ChannelAccount, ConversationAccount
+from botbuilder.schema.teams import ChannelInfo, TeamDetails, TeamsChannelAccount
+from azure_teambots.teams import MemberCache, TeamCache
+
+
+class TeamsStandIn:
+    """Teams connector lookups, counting the calls."""
+
+    def __init__(self, latency: float = 0.01):
+        self.latency = latency
+        self.calls: list = []
+        self.missing: set = set()
+
+    async def get_member(self, turn_context, member_id):
+        self.calls.append(('member', member_id))
+        await asyncio.sleep(self.latency)
+        if member_id in self.missing:
+            raise KeyError(member_id)
+        return TeamsChannelAccount(id=member_id, name=f"User {member_id}")
+
+    async def get_team_details(self, turn_context, team_id):
+        self.calls.append(('details', team_id))
+        await asyncio.sleep(self.latency)
+        return TeamDetails(id=team_id, name="Team", channel_count=2)
+
+    async def get_team_channels(self, turn_context, team_id):
+        self.calls.append(('channels', team_id))
+        await asyncio.sleep(self.latency)
+        return [ChannelInfo(id="general", name="General"), ChannelInfo(id="dev", name="Dev")]
+
+
+def teams(monkeypatch) -> TeamsStandIn:
+    stand_in = TeamsStandIn()
+    for name in ('get_member', 'get_team_details', 'get_team_channels'):
+        monkeypatch.setattr(TeamsInfo, name, getattr(stand_in, name))
+    return stand_in
+
+
+def turn(channel_data: dict = None) -> TurnContext:
+    activity = Activity(
+        type='message',
+        channel_id='msteams',
+        from_property=ChannelAccount(id='29:user', aad_object_id='aad-user'),
+        recipient=ChannelAccount(id='28:bot'),
+        conversation=ConversationAccount(id='19:general', tenant_id='tenant'),
+        channel_data=channel_data or {"team": {"id": "team"}, "channel": {"id": "general"}},
+    )
+    return TurnContext(TestAdapter(), activity)
+
+
+def event(event_type: str, team: dict, channel: dict = None) -> Activity:
+    channel_data = {"eventType": event_type, "team": team}
+    if channel:
+        channel_data['channel'] = channel
+    return Activity(type='conversationUpdate', channel_data=channel_data)
+
+
+async def test_members_single_flight_and_ttl(monkeypatch):
+    stand_in = teams(monkeypatch)
+    cache = MemberCache(ttl=0.1)
+    context = turn()
+    members = await asyncio.gather(*(cache.get_member(context) for _ in range(5)))
+    assert {member.id for member in members} == {'29:user'}
+    assert stand_in.calls == [('member', '29:user')]
+    # keyed by tenant and AAD object id.
+    assert cache.key(context, '29:user') == ('tenant', 'aad-user')
+    await cache.get_member(context)
+    assert len(stand_in.calls) == 1
+    await asyncio.sleep(0.15)
+    await cache.get_member(context)
+    assert len(stand_in.calls) == 2
+    cache.invalidate(context, '29:user')
+    await cache.get_member(context)
+    assert len(stand_in.calls) == 3
+
+
+async def test_failed_member_lookups_are_cached_briefly(monkeypatch):
+    stand_in = teams(monkeypatch)
+    stand_in.missing.add('29:gone')
+    cache = MemberCache(negative_ttl=0.1)
+    context = turn()
+    assert await cache.get_member(context, '29:gone') is None
+    assert await cache.get_member(context, '29:gone') is None
+    assert len(stand_in.calls) == 1
+    await asyncio.sleep(0.15)
+    assert await cache.get_member(context, '29:gone') is None
+    assert len(stand_in.calls) == 2
+    assert cache.stats()['failures'] == 2
+
+
+async def test_team_events_update_the_cache(monkeypatch):
+    stand_in = teams(monkeypatch)
+    cache = TeamCache()
+    context = turn()
+    details, channels = await asyncio.gather(
+        cache.get_team_details(context),
+        cache.get_channels(context),
+    )
+    assert details.name == "Team"
+    assert set(channels) == {"general", "dev"}
+    assert (await cache.get_channel(context)).name == "General"
+    team = {"id": "team", "name": "Renamed"}
+    cache.update_from_activity(event('teamRenamed', team))
+    cache.update_from_activity(event('channelCreated', team, {"id": "ops", "name": "Ops"}))
+    cache.update_from_activity(event('channelRenamed', team, {"id": "dev", "name": "Engineering"}))
+    cache.update_from_activity(event('channelDeleted', team, {"id": "general"}))
+    details = await cache.get_team_details(context)
+    channels = await cache.get_channels(context)
+    assert details.name == "Renamed"
+    assert details.channel_count == 2
+    assert {key: value.name for key, value in channels.items()} == {
+        "dev": "Engineering", "ops": "Ops"
+    }
+    # no lookup after the first ones.
+    assert len(stand_in.calls) == 2
+    cache.update_from_activity(event('teamDeleted', team))
+    await cache.get_team_details(context)
+    assert len(stand_in.calls) == 3
+    assert cache.stats()['events'] == 5
+
+
+async def test_outside_of_a_team(monkeypatch):
+    stand_in = teams(monkeypatch)
+    cache = TeamCache()
+    context = turn(channel_data={"tenant": {"id": "tenant"}})
+    assert await cache.get_team_details(context) is None
+    assert await cache.get_channels(context) == {}
+    assert await cache.get_channel(context) is None
+    assert not stand_in.calls
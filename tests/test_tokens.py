@@ -0,0 +1,88 @@
+import asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from azure_teambots.graph.tokens import TokenProvider
+from azure_teambots.sessions import http_pool
+
+
+class TokenStandIn:
+    """Azure AD token endpoint issuing numbered tokens."""
+
+    def __init__(self, expires_in: int = 3600, latency: float = 0.01):
+        self.expires_in = expires_in
+        self.latency = latency
+        self.issued: int = 0
+        self.failing = False
+        self.app = web.Application()
+        self.app.router.add_post('/token', self.token)
+
+    async def token(self, request):
+        form = await request.post()
+        assert form['grant_type'] == 'client_credentials'
+        await asyncio.sleep(self.latency)
+        if self.failing:
+            return web.json_response({"error": "invalid_client"}, status=401)
+        self.issued += 1
+        return web.json_response(
+            {"access_token": f"token-{self.issued}", "expires_in": self.expires_in}
+        )
+
+
+async def provider(stand_in: TokenStandIn, **kwargs):
+    server = TestServer(stand_in.app)
+    await server.start_server()
+    return server, TokenProvider(
+        'tenant', 'client', 'secret', token_url=str(server.make_url('/token')), **kwargs
+    )
+
+
+async def test_concurrent_callers_share_one_refresh():
+    stand_in = TokenStandIn()
+    server, tokens = await provider(stand_in)
+    try:
+        results = await asyncio.gather(*(tokens.get_token() for _ in range(10)))
+        assert set(results) == {'token-1'}
+        assert stand_in.issued == 1
+        assert await tokens.get_token() == 'token-1'
+        assert stand_in.issued == 1
+        # after a 401 from Graph.
+        tokens.invalidate()
+        assert await tokens.get_token() == 'token-2'
+        assert tokens.stats()['refreshes'] == 2
+    finally:
+        await server.close()
+        await http_pool.close()
+
+
+async def test_refreshed_in_background_inside_the_margin():
+    stand_in = TokenStandIn(expires_in=60)
+    server, tokens = await provider(stand_in, refresh_margin=30)
+    try:
+        assert await tokens.get_token() == 'token-1'
+        assert await tokens.get_token() == 'token-1'
+        assert stand_in.issued == 1
+        # inside the refresh window: the current token is still returned.
+        tokens.refresh_margin = 120
+        results = await asyncio.gather(*(tokens.get_token() for _ in range(5)))
+        assert set(results) == {'token-1'}
+        await tokens._background
+        assert stand_in.issued == 2
+        tokens.refresh_margin = 30
+        assert await tokens.get_token() == 'token-2'
+    finally:
+        await server.close()
+        await http_pool.close()
+
+
+async def test_failed_refresh_keeps_the_valid_token():
+    stand_in = TokenStandIn()
+    server, tokens = await provider(stand_in)
+    try:
+        assert await tokens.refresh() == 'token-1'
+        stand_in.failing = True
+        assert await tokens.refresh() == 'token-1'
+        tokens.invalidate()
+        assert await tokens.get_token() is None
+    finally:
+        await server.close()
+        await http_pool.close()